@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Airplane, Airport, Seat, Booking, Ticket, Route, Flight, Segment, BoardingPass, Payment
+from .models import Airplane, Airport, Seat, Booking, Ticket, Route, Flight, Segment, BoardingPass, Payment, ExportJob, OutboxEvent, Job, JobSchedule, BookingCurve, BookingForecast, SearchActivity, FlightInventory
 
 admin.site.register(Airplane)
 admin.site.register(Airport)
@@ -10,4 +10,12 @@ admin.site.register(Route)
 admin.site.register(Flight)
 admin.site.register(Segment)
 admin.site.register(BoardingPass)
-admin.site.register(Payment)
\ No newline at end of file
+admin.site.register(Payment)
+admin.site.register(ExportJob)
+admin.site.register(OutboxEvent)
+admin.site.register(Job)
+admin.site.register(JobSchedule)
+admin.site.register(BookingCurve)
+admin.site.register(BookingForecast)
+admin.site.register(SearchActivity)
+admin.site.register(FlightInventory)
\ No newline at end of file
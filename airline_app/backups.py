@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import shutil
+
+import psycopg
+from django.conf import settings
+from django.db import connection
+
+BACKUP_SUFFIX = '.backup'
+MANIFEST_SUFFIX = '.manifest.json'
+REMOTE_FOLDER = '/airline_backups/'
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def local_backup_dir():
+    return os.path.join(settings.BASE_DIR, 'backups')
+
+
+def manifest_path(backup_path):
+    # Работает и для имени файла, и для полного пути
+    return backup_path[:-len(BACKUP_SUFFIX)] + MANIFEST_SUFFIX
+
+
+def pg_server_args():
+    db = settings.DATABASES['default']
+    return ['-h', db['HOST'], '-p', str(db['PORT']), '-U', db['USER']]
+
+
+def pg_args(dbname=None):
+    return [*pg_server_args(), '-d', dbname or settings.DATABASES['default']['NAME']]
+
+
+def pg_env():
+    env = os.environ.copy()
+    env['PGPASSWORD'] = settings.DATABASES['default']['PASSWORD']
+    return env
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def table_row_counts(cursor):
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p')
+        ORDER BY c.relname
+    """)
+    counts = {}
+    for (table,) in cursor.fetchall():
+        cursor.execute(f'SELECT count(*) FROM "{table}"')
+        counts[table] = cursor.fetchone()[0]
+    return counts
+
+
+def scratch_row_counts(dbname):
+    db = settings.DATABASES['default']
+    with psycopg.connect(host=db['HOST'], port=db['PORT'], user=db['USER'], password=db['PASSWORD'],
+                         dbname=dbname) as conn:
+        with conn.cursor() as cursor:
+            return table_row_counts(cursor)
+
+
+def write_manifest(backup_path, database, row_counts, created_at):
+    manifest = {
+        'file': os.path.basename(backup_path),
+        'database': database,
+        'created_at': created_at.isoformat(),
+        'format': 'custom',
+        'size': os.path.getsize(backup_path),
+        'sha256': file_sha256(backup_path),
+        'tables': row_counts,
+    }
+    path = manifest_path(backup_path)
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, ensure_ascii=False, indent=2)
+    return path
+
+
+def read_manifest(path):
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def exported_snapshot():
+    """Открывает REPEATABLE READ транзакцию и экспортирует её снимок для pg_dump --snapshot.
+
+    Вызывать внутри transaction.atomic(): подсчёт строк в той же транзакции
+    видит ровно те данные, что попадут в дамп.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+        cursor.execute('SELECT pg_export_snapshot()')
+        return cursor.fetchone()[0]
+
+
+class LocalBackupStorage:
+    """Каталог с бэкапами на диске (или смонтированном томе) — замена облачного хранилища."""
+
+    def __init__(self, root=None):
+        self.root = root or local_backup_dir()
+
+    def list(self, suffix=BACKUP_SUFFIX):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if name.endswith(suffix))
+
+    def fetch(self, name, dest_dir):
+        source = os.path.join(self.root, name)
+        if os.path.dirname(os.path.abspath(source)) == os.path.abspath(dest_dir):
+            return source
+        target = os.path.join(dest_dir, name)
+        shutil.copyfile(source, target)
+        return target
+
+
+class YandexDiskStorage:
+    def __init__(self, token, folder=REMOTE_FOLDER):
+        import yadisk
+        self.client = yadisk.YaDisk(token=token)
+        self.folder = folder
+
+    def list(self, suffix=BACKUP_SUFFIX):
+        return sorted(item.name for item in self.client.listdir(self.folder) if item.name.endswith(suffix))
+
+    def fetch(self, name, dest_dir):
+        target = os.path.join(dest_dir, name)
+        self.client.download(f"{self.folder}{name}", target)
+        return target
+
+
+def verified_backups(storage):
+    """Бэкапы с манифестом, от старых к новым: без него (старые бэкапы, сбой выгрузки) проверить нечего."""
+    manifests = set(storage.list(MANIFEST_SUFFIX))
+    return [name for name in storage.list() if manifest_path(name) in manifests]
+
+
+def backup_storage(source=None):
+    token = getattr(settings, 'YANDEX_DISK_TOKEN', None)
+    if source == 'yandex' or (source is None and token):
+        return YandexDiskStorage(token)
+    return LocalBackupStorage()
@@ -0,0 +1,93 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+
+from .models import BoardingPass, Segment
+from .seatmap import get_layout, seat_sort_key
+
+BACK_TO_FRONT = 'back_to_front'
+WINDOW_MIDDLE_AISLE = 'wma'
+STRATEGIES = (BACK_TO_FRONT, WINDOW_MIDDLE_AISLE)
+
+BOARDING_START = timedelta(minutes=40)
+GROUP_INTERVAL = timedelta(minutes=5)
+BACK_TO_FRONT_ZONES = 4
+# Бизнес и комфорт садятся первыми отдельной группой
+PRIORITY_CLASSES = (Segment.BUSINESS, Segment.COMFORT)
+
+
+def letter_positions(layout):
+    # Для каждой буквы: расстояние от борта (0 = у окна, больше = ближе к проходу) по рядам
+    letters_by_row = defaultdict(str)
+    for row, letters, _ in layout['rows']:
+        letters_by_row[row] += letters
+    positions = {}
+    for row, letters in letters_by_row.items():
+        letters = sorted(letters)
+        for i, letter in enumerate(letters):
+            positions[(row, letter)] = min(i, len(letters) - 1 - i)
+    return positions
+
+
+def boarding_group(seat_no, fare_conditions, strategy, positions, max_row):
+    if fare_conditions in PRIORITY_CLASSES:
+        return 1
+    row, letter = seat_sort_key(seat_no)
+    if strategy == WINDOW_MIDDLE_AISLE:
+        return 2 + positions.get((row, letter), 0)
+    zone_size = max(1, -(-max_row // BACK_TO_FRONT_ZONES))
+    return 2 + (max_row - row) // zone_size
+
+
+def plan_flight(passes, airplane_code, departure, strategy):
+    layout = get_layout(airplane_code)
+    positions = letter_positions(layout)
+    max_row = max((row for row, _, _ in layout['rows']), default=1)
+
+    keyed = []
+    for bp in passes:
+        group = boarding_group(bp.seat.seat_no, bp.seat.fare_conditions, strategy, positions, max_row)
+        row, letter = seat_sort_key(bp.seat.seat_no)
+        # Внутри группы: от хвоста к носу, затем по букве места
+        keyed.append(((group, -row, letter), group, bp))
+    keyed.sort(key=lambda item: item[0])
+
+    first_call = departure - BOARDING_START
+    for number, (_, group, bp) in enumerate(keyed, start=1):
+        bp.boarding_no = number
+        bp.boarding_group = group
+        bp.boarding_time = first_call + (group - 1) * GROUP_INTERVAL
+    return [bp for _, _, bp in keyed]
+
+
+def plan_boarding(flights, strategy=BACK_TO_FRONT, batch_size=1000):
+    """Назначает номера и группы посадки всем талонам рейсов одним bulk_update.
+
+    Возвращает количество обновлённых посадочных талонов.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown boarding strategy: {strategy}")
+
+    passes = (
+        BoardingPass.objects.filter(flight__in=flights)
+        .select_related('seat', 'flight__route')
+        .only('id', 'flight_id', 'boarding_no', 'boarding_group', 'boarding_time',
+              'seat__seat_no', 'seat__fare_conditions',
+              'flight__scheduled_departure', 'flight__route__airplane_id')
+    )
+    by_flight = defaultdict(list)
+    for bp in passes:
+        by_flight[bp.flight_id].append(bp)
+
+    planned = []
+    for flight_passes in by_flight.values():
+        flight = flight_passes[0].flight
+        planned.extend(plan_flight(flight_passes, flight.route.airplane_id, flight.scheduled_departure, strategy))
+
+    # Уникальность (flight, boarding_no) проверяется при COMMIT, поэтому перенумерация безопасна
+    with transaction.atomic():
+        BoardingPass.objects.bulk_update(
+            planned, ['boarding_no', 'boarding_group', 'boarding_time'], batch_size=batch_size
+        )
+    return len(planned)
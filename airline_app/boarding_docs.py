@@ -0,0 +1,182 @@
+import hashlib
+import re
+from zoneinfo import ZoneInfo
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from .models import BoardingPass
+from .workers import process_pool
+
+DOC_CACHE_TIMEOUT = 60 * 60 * 24
+# Меньше этого числа талонов рендерим в текущем процессе: запуск пула дороже
+POOL_THRESHOLD = 50
+POOL_WORKERS = 4
+POOL_CHUNKSIZE = 25
+
+COMPARTMENT_CODES = {'Business': 'J', 'Comfort': 'W', 'Economy': 'Y'}
+
+# Ширины полос/пробелов Code 128 для значений 0..105 и стоп-символа
+CODE128_PATTERNS = (
+    '212222 222122 222221 121223 121322 131222 122213 122312 132212 221213 221312 231212 '
+    '112232 122132 122231 113222 123122 123221 223211 221132 221231 213212 223112 312131 '
+    '311222 321122 321221 312212 322112 322211 212123 212321 232121 111323 131123 131321 '
+    '112313 132113 132311 211313 231113 231311 112133 112331 132131 113123 113321 133121 '
+    '313121 211331 231131 213113 213311 213131 311123 311321 331121 312113 312311 332111 '
+    '314111 221411 431111 111224 111422 121124 121421 141122 141221 112214 112412 122114 '
+    '122411 142112 142211 241211 221114 413111 241112 134111 111242 121142 121241 114212 '
+    '124112 124211 411212 421112 421211 212141 214121 412121 111143 111341 131141 114113 '
+    '114311 411113 411311 113141 114131 311141 411131 211412 211214 211232'
+).split()
+CODE128_START_B = 104
+CODE128_STOP = '2331112'
+
+
+def code128_svg(text, module=2, height=70):
+    values = [ord(ch) - 32 for ch in text if 32 <= ord(ch) < 128]
+    checksum = (CODE128_START_B + sum(i * v for i, v in enumerate(values, start=1))) % 103
+    patterns = [CODE128_PATTERNS[v] for v in [CODE128_START_B, *values, checksum]] + [CODE128_STOP]
+
+    x = 10 * module
+    bars = []
+    for pattern in patterns:
+        for i, width in enumerate(map(int, pattern)):
+            if i % 2 == 0:
+                bars.append(f'<rect x="{x}" y="0" width="{width * module}" height="{height}"/>')
+            x += width * module
+    width = x + 10 * module
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+            f'width="{width}" height="{height}" shape-rendering="crispEdges">'
+            f'<rect width="{width}" height="{height}" fill="#fff"/><g fill="#000">{"".join(bars)}</g></svg>')
+
+
+def _field(value, size, fill=' ', right=False):
+    value = str(value or '')[:size]
+    return value.rjust(size, fill) if right else value.ljust(size, fill)
+
+
+TRANSLIT = dict(zip(
+    'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ',
+    ['A', 'B', 'V', 'G', 'D', 'E', 'E', 'ZH', 'Z', 'I', 'I', 'K', 'L', 'M', 'N', 'O', 'P', 'R', 'S',
+     'T', 'U', 'F', 'KH', 'TS', 'CH', 'SH', 'SHCH', 'IE', 'Y', '', 'E', 'IU', 'IA'],
+))
+
+
+def bcbp_name(passenger_name):
+    # BCBP допускает только ASCII: кириллица транслитерируется (как в загранпаспорте)
+    name = ''.join(TRANSLIT.get(ch, ch) for ch in passenger_name.upper())
+    parts = name.split()
+    if len(parts) > 1:
+        return f"{parts[0]}/{' '.join(parts[1:])}"
+    return name
+
+
+def bcbp_payload(data):
+    """Обязательные поля IATA BCBP (формат M, один сегмент)."""
+    match = re.match(r'([A-Z0-9]{2})\D*(\d+)', data['route_no'])
+    carrier, number = (match.group(1), match.group(2)) if match else (data['route_no'][:2], '0')
+    seat = re.match(r'(\d+)(\D*)', data['seat_no'])
+    seat_no = f"{int(seat.group(1)):03d}{seat.group(2)}" if seat else data['seat_no']
+    return ''.join([
+        'M1',
+        _field(bcbp_name(data['passenger_name']), 20),
+        'E',
+        _field(data['book_ref'], 7),
+        _field(data['departure_code'], 3),
+        _field(data['arrival_code'], 3),
+        _field(carrier, 3),
+        _field(number[-4:].zfill(4), 5),
+        f"{data['departure_day_of_year']:03d}",
+        COMPARTMENT_CODES.get(data['fare_conditions'], 'Y'),
+        _field(seat_no, 4, '0', right=True),
+        _field(data['boarding_no'] or 0, 4, '0', right=True) + ' ',
+        '1',
+        '00',
+    ])
+
+
+def pass_data(bp):
+    flight = bp.flight
+    departure_airport = flight.route.departure_airport
+    arrival_airport = flight.route.arrival_airport
+    tz = ZoneInfo(departure_airport.timezone)
+    departure = flight.scheduled_departure.astimezone(tz)
+    boarding_time = bp.boarding_time.astimezone(tz) if bp.boarding_time else None
+    return {
+        'id': bp.pk,
+        'ticket_no': bp.ticket.ticket_no,
+        'passenger_name': bp.ticket.passenger_name,
+        'book_ref': bp.ticket.booking_id,
+        'flight_id': flight.flight_id,
+        'route_no': flight.route.route_no,
+        'departure_code': departure_airport.airport_code,
+        'departure_city': departure_airport.city_name,
+        'arrival_code': arrival_airport.airport_code,
+        'arrival_city': arrival_airport.city_name,
+        'departure': departure.strftime('%d.%m.%Y %H:%M'),
+        'departure_day_of_year': departure.timetuple().tm_yday,
+        'boarding_time': boarding_time.strftime('%H:%M') if boarding_time else '',
+        'seat_no': bp.seat.seat_no,
+        'fare_conditions': bp.seat.fare_conditions,
+        'boarding_no': bp.boarding_no,
+        'boarding_group': bp.boarding_group,
+    }
+
+
+def fingerprint(data):
+    return hashlib.sha1(repr(sorted(data.items())).encode()).hexdigest()[:16]
+
+
+def doc_cache_key(data):
+    return f"boarding_doc:{data['id']}:{fingerprint(data)}"
+
+
+def render_pass(data):
+    payload = bcbp_payload(data)
+    return render_to_string('boarding_pass_card.html', {
+        **data, 'payload': payload, 'barcode': code128_svg(payload),
+    })
+
+
+def boarding_passes_queryset():
+    return BoardingPass.objects.select_related(
+        'ticket', 'seat',
+        'flight__route__departure_airport', 'flight__route__arrival_airport',
+    )
+
+
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = process_pool(POOL_WORKERS)
+    return _pool
+
+
+def render_passes(passes):
+    """HTML-документы талонов в исходном порядке; кэш сбрасывается сам при смене места/посадки."""
+    items = [pass_data(bp) for bp in passes]
+    keys = [doc_cache_key(data) for data in items]
+    cached = cache.get_many(keys)
+
+    missing = [(key, data) for key, data in zip(keys, items) if key not in cached]
+    if missing:
+        datas = [data for _, data in missing]
+        if len(missing) >= POOL_THRESHOLD:
+            rendered = list(_get_pool().map(render_pass, datas, chunksize=POOL_CHUNKSIZE))
+        else:
+            rendered = [render_pass(data) for data in datas]
+        fresh = {key: doc for (key, _), doc in zip(missing, rendered)}
+        cache.set_many(fresh, DOC_CACHE_TIMEOUT)
+        cached.update(fresh)
+    return [cached[key] for key in keys]
+
+
+def render_ticket_passes(ticket_no):
+    return render_passes(boarding_passes_queryset().filter(ticket_id=ticket_no).order_by('flight__scheduled_departure'))
+
+
+def render_flight_manifest(flight_id):
+    return render_passes(boarding_passes_queryset().filter(flight_id=flight_id).order_by('boarding_no', 'seat__seat_no'))
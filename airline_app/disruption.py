@@ -0,0 +1,297 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+
+from .inventory import adjust_sold
+from .itinerary import BOARDING_BEFORE_DEPARTURE
+from .models import BoardingPass, Flight, OutboxEvent, Seat, Segment
+from .seatmap import occupancy_changed, seat_sort_key
+
+MIN_CONNECTION = timedelta(minutes=45)
+SEARCH_WINDOW = timedelta(hours=48)
+
+
+def expected_arrival(flight, delay=None):
+    if flight.actual_arrival:
+        return flight.actual_arrival
+    if flight.actual_departure:
+        return flight.actual_departure + (flight.scheduled_arrival - flight.scheduled_departure)
+    return flight.scheduled_arrival + (delay or timedelta())
+
+
+def disruption_impact(flight, delay=None):
+    """Затронутые сегменты рейса, стыковки, которые больше не успеть, и места, которых нет в новом самолёте.
+
+    Все выборки идут по индексам segments(flight_id), segments(ticket_no)
+    и boarding_passes(flight_id).
+    """
+    arrival = expected_arrival(flight, delay)
+    segments = list(Segment.objects.filter(flight=flight).select_related('ticket', 'flight__route'))
+
+    onward = {}
+    for segment in (
+        Segment.objects.filter(
+            ticket_id__in={segment.ticket_id for segment in segments},
+            flight__route__departure_airport_id=flight.route.arrival_airport_id,
+            flight__scheduled_departure__gt=flight.scheduled_departure,
+        )
+        .select_related('ticket', 'flight__route')
+        .order_by('flight__scheduled_departure')
+    ):
+        onward.setdefault(segment.ticket_id, segment)
+
+    broken = [
+        segment for segment in onward.values()
+        if flight.status == Flight.CANCELLED or segment.flight.scheduled_departure < arrival + MIN_CONNECTION
+    ]
+    invalid_passes = list(
+        BoardingPass.objects.filter(flight=flight)
+        .exclude(seat__airplane_id=flight.route.airplane_id)
+        .select_related('seat')
+    )
+    return {
+        'flight': flight,
+        'expected_arrival': arrival,
+        'segments': segments,
+        'onward': onward,
+        'broken_connections': broken,
+        'invalid_passes': invalid_passes,
+    }
+
+
+class Inventory:
+    """Свободные места на рейсах-кандидатах, упорядоченные по схеме салона."""
+
+    def __init__(self, flights):
+        self.flights = {flight.pk: flight for flight in flights}
+        self.occupied = defaultdict(set)
+        for flight_id, seat_id in BoardingPass.objects.filter(flight_id__in=self.flights).values_list('flight_id', 'seat_id'):
+            self.occupied[flight_id].add(seat_id)
+
+        self.seats = defaultdict(list)
+        airplanes = {flight.route.airplane_id for flight in flights}
+        for seat in Seat.objects.filter(airplane_id__in=airplanes):
+            self.seats[seat.airplane_id, seat.fare_conditions].append(seat)
+        for seats in self.seats.values():
+            seats.sort(key=lambda seat: seat_sort_key(seat.seat_no))
+
+    def free(self, flight, fare_conditions):
+        occupied = self.occupied[flight.pk]
+        return [seat for seat in self.seats[flight.route.airplane_id, fare_conditions] if seat.pk not in occupied]
+
+    def take(self, flight, seats):
+        self.occupied[flight.pk].update(seat.pk for seat in seats)
+
+    def release(self, flight_id, seat_id):
+        self.occupied[flight_id].discard(seat_id)
+
+
+def pick_block(free, size):
+    # Группа садится в один ряд, если там хватает мест, иначе — подряд идущими местами
+    if len(free) < size:
+        return None
+    rows = defaultdict(list)
+    for seat in free:
+        rows[seat_sort_key(seat.seat_no)[0]].append(seat)
+    for row_seats in rows.values():
+        if len(row_seats) >= size:
+            return row_seats[:size]
+    return free[:size]
+
+
+def group_requests(segments, passes, not_before, exclude=None):
+    groups = defaultdict(list)
+    for segment in segments:
+        groups[segment.ticket.booking_id, segment.flight_id, segment.fare_conditions].append(segment)
+    return [
+        {
+            'book_ref': book_ref,
+            'fare_conditions': fare_conditions,
+            'segments': group,
+            'passes': [passes.get((segment.ticket_id, segment.flight_id)) for segment in group],
+            'pair': (group[0].flight.route.departure_airport_id, group[0].flight.route.arrival_airport_id),
+            'not_before': not_before[book_ref] if isinstance(not_before, dict) else not_before,
+            'exclude': exclude,
+            'origin_flight_id': flight_id,
+        }
+        for (book_ref, flight_id, fare_conditions), group in groups.items()
+    ]
+
+
+def match(requests, inventory, candidates, ticket_flights):
+    """Жадное распределение групп по рейсам: класс сохраняется, группа не разделяется.
+
+    Сначала обслуживаются самые ранние и самые большие группы; каждая
+    получает первый по времени рейс нужной пары аэропортов, где хватает
+    мест её класса сразу на всех.
+    """
+    moves = []
+    unplaced = []
+    for request in sorted(requests, key=lambda r: (r['not_before'], -len(r['segments']))):
+        tickets = {segment.ticket_id for segment in request['segments']}
+        for flight in candidates.get(request['pair'], []):
+            if flight.pk == request['exclude'] or not (
+                request['not_before'] <= flight.scheduled_departure <= request['not_before'] + SEARCH_WINDOW
+            ):
+                continue
+            if flight.pk != request['origin_flight_id'] and any(flight.pk in ticket_flights[t] for t in tickets):
+                continue
+            block = pick_block(inventory.free(flight, request['fare_conditions']), len(request['segments']))
+            if block is None:
+                continue
+            inventory.take(flight, block)
+            for segment, boarding_pass, seat in zip(request['segments'], request['passes'], block):
+                if boarding_pass is not None:
+                    inventory.release(boarding_pass.flight_id, boarding_pass.seat_id)
+                ticket_flights[segment.ticket_id].discard(segment.flight_id)
+                ticket_flights[segment.ticket_id].add(flight.pk)
+                # Место в плане учитывается для вместимости, но закреплено только посадочным талоном:
+                # без него пассажир выберет место при регистрации
+                moves.append({'segment': segment, 'boarding_pass': boarding_pass, 'from_flight_id': segment.flight_id,
+                              'flight': flight, 'seat': seat if boarding_pass is not None else None})
+            break
+        else:
+            unplaced.append(request)
+    return moves, unplaced
+
+
+def lock_candidates(flight, pairs, start, end):
+    # Один запрос с ORDER BY flight_id: тот же канонический порядок блокировок, что и у бронирования
+    pair_filter = Q()
+    for departure, arrival in pairs:
+        pair_filter |= Q(route__departure_airport_id=departure, route__arrival_airport_id=arrival)
+    flights = (
+        Flight.objects.select_for_update(of=('self',))
+        .select_related('route')
+        .filter(Q(pk=flight.pk) | (pair_filter & Q(status__in=Flight.BOOKABLE_STATUSES, scheduled_departure__range=(start, end))))
+        .order_by('pk')
+    )
+    candidates = defaultdict(list)
+    for candidate in flights:
+        candidates[candidate.route.departure_airport_id, candidate.route.arrival_airport_id].append(candidate)
+    for same_pair in candidates.values():
+        same_pair.sort(key=lambda candidate: candidate.scheduled_departure)
+    return candidates
+
+
+def plan_reaccommodation(flight, delay=None):
+    """Вызывать в транзакции: рейсы-кандидаты блокируются до применения плана."""
+    impact = disruption_impact(flight, delay)
+    cancelled = flight.status == Flight.CANCELLED
+    onward = list(impact['onward'].values())
+
+    candidates = lock_candidates(
+        flight,
+        {(flight.route.departure_airport_id, flight.route.arrival_airport_id)}
+        | {(s.flight.route.departure_airport_id, s.flight.route.arrival_airport_id) for s in onward},
+        flight.scheduled_departure,
+        flight.scheduled_departure + 2 * SEARCH_WINDOW,
+    )
+    inventory = Inventory([c for same_pair in candidates.values() for c in same_pair])
+
+    ticket_flights = defaultdict(set)
+    all_segments = impact['segments'] + onward
+    for ticket_id, flight_id in Segment.objects.filter(
+        ticket_id__in={segment.ticket_id for segment in all_segments}
+    ).values_list('ticket_id', 'flight_id'):
+        ticket_flights[ticket_id].add(flight_id)
+    passes = {
+        (bp.ticket_id, bp.flight_id): bp
+        for bp in BoardingPass.objects.filter(
+            ticket_id__in=ticket_flights, flight_id__in={segment.flight_id for segment in all_segments}
+        )
+    }
+
+    # Этап 1: пассажиры отменённого рейса или места, которых нет в новом самолёте
+    if cancelled:
+        moving = impact['segments']
+    else:
+        invalid = {bp.ticket_id for bp in impact['invalid_passes']}
+        moving = [segment for segment in impact['segments'] if segment.ticket_id in invalid]
+    moves, unplaced = match(
+        group_requests(moving, passes, flight.scheduled_departure, exclude=flight.pk if cancelled else None),
+        inventory, candidates, ticket_flights,
+    )
+
+    # Этап 2: стыковки, которые не успеть с учётом задержки или нового рейса
+    arrival_by_ticket = {}
+    if not cancelled:
+        arrival_by_ticket = {segment.ticket_id: impact['expected_arrival'] for segment in impact['segments']}
+    for move in moves:
+        arrival_by_ticket[move['segment'].ticket_id] = move['flight'].scheduled_arrival
+    broken = [
+        segment for segment in onward
+        if segment.ticket_id in arrival_by_ticket
+        and segment.flight.scheduled_departure < arrival_by_ticket[segment.ticket_id] + MIN_CONNECTION
+    ]
+    # Группа остаётся вместе: ближайший допустимый вылет считается по самому позднему прилёту в брони
+    ready = defaultdict(lambda: flight.scheduled_departure)
+    for segment in broken:
+        ready[segment.ticket.booking_id] = max(ready[segment.ticket.booking_id],
+                                               arrival_by_ticket[segment.ticket_id] + MIN_CONNECTION)
+    onward_moves, onward_unplaced = match(
+        [
+            {**request, 'exclude': request['origin_flight_id']}
+            for request in group_requests(broken, passes, dict(ready))
+        ],
+        inventory, candidates, ticket_flights,
+    )
+
+    return {
+        'impact': impact,
+        'moves': moves + onward_moves,
+        'unplaced': unplaced + onward_unplaced,
+        'broken_connections': broken,
+    }
+
+
+def apply_moves(moves):
+    segments = []
+    passes = []
+    # Занятость и проданные места меняются и на рейсе, с которого пересаживают, и на том, куда
+    touched = {move['segment'].flight_id for move in moves} | {move['flight'].pk for move in moves}
+    sold = defaultdict(int)
+    for move in moves:
+        sold[move['segment'].flight_id, move['segment'].fare_conditions] -= 1
+        sold[move['flight'].pk, move['segment'].fare_conditions] += 1
+    for move in moves:
+        move['segment'].flight = move['flight']
+        segments.append(move['segment'])
+        boarding_pass = move['boarding_pass']
+        if boarding_pass is not None:
+            boarding_pass.flight = move['flight']
+            boarding_pass.seat = move['seat']
+            boarding_pass.boarding_time = move['flight'].scheduled_departure - BOARDING_BEFORE_DEPARTURE
+            boarding_pass.boarding_no = None
+            boarding_pass.boarding_group = None
+            passes.append(boarding_pass)
+
+    Segment.objects.bulk_update(segments, ['flight'], batch_size=1000)
+    adjust_sold(sold)
+    BoardingPass.objects.bulk_update(
+        passes, ['flight', 'seat', 'boarding_time', 'boarding_no', 'boarding_group'], batch_size=1000
+    )
+
+    by_booking = defaultdict(list)
+    for move in moves:
+        item = {'ticket_no': move['segment'].ticket_id, 'flight_id': move['flight'].pk}
+        if move['seat'] is not None:
+            item['seat_no'] = move['seat'].seat_no
+        by_booking[move['segment'].ticket.booking_id].append(item)
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(event_type='booking.reaccommodated', aggregate_type='booking', aggregate_id=book_ref,
+                    payload={'segments': items})
+        for book_ref, items in by_booking.items()
+    ])
+    transaction.on_commit(lambda: occupancy_changed(touched))
+
+
+def reaccommodate(flight, delay=None, apply=True):
+    """Строит план пересадки/перебронирования и применяет его одной пачкой."""
+    with transaction.atomic():
+        plan = plan_reaccommodation(flight, delay)
+        if apply and plan['moves']:
+            apply_moves(plan['moves'])
+    return plan
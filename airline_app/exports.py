@@ -0,0 +1,155 @@
+import csv
+import gzip
+import json
+import os
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import ExportJob, Flight, Booking, Payment
+
+CHUNK_SIZE = 5000
+PROGRESS_EVERY = 50000
+
+
+def _date_range(qs, lookup, filters):
+    if filters.get('date_from'):
+        qs = qs.filter(**{f'{lookup}__gte': date.fromisoformat(filters['date_from'])})
+    if filters.get('date_to'):
+        qs = qs.filter(**{f'{lookup}__lte': date.fromisoformat(filters['date_to'])})
+    return qs
+
+
+def flights_queryset(filters):
+    qs = _date_range(Flight.objects.all(), 'departure_local_date', filters)
+    if filters.get('status'):
+        qs = qs.filter(status=filters['status'])
+    return qs.order_by('flight_id')
+
+
+def bookings_queryset(filters):
+    qs = _date_range(Booking.objects.all(), 'book_date__date', filters)
+    if filters.get('is_paid') in ('0', '1'):
+        qs = qs.filter(is_paid=filters['is_paid'] == '1')
+    return qs.order_by('book_ref')
+
+
+def payments_queryset(filters):
+    qs = _date_range(Payment.objects.all(), 'payment_date__date', filters)
+    return qs.order_by('payment_id')
+
+
+# Набор данных -> (queryset, [(заголовок, поле)])
+DATASETS = {
+    'flights': (flights_queryset, [
+        ('flight_id', 'flight_id'),
+        ('route_no', 'route__route_no'),
+        ('departure_airport', 'route__departure_airport_id'),
+        ('arrival_airport', 'route__arrival_airport_id'),
+        ('scheduled_departure', 'scheduled_departure'),
+        ('scheduled_arrival', 'scheduled_arrival'),
+        ('departure_local_date', 'departure_local_date'),
+        ('status', 'status'),
+    ]),
+    'bookings': (bookings_queryset, [
+        ('book_ref', 'book_ref'),
+        ('book_date', 'book_date'),
+        ('total_amount', 'total_amount'),
+        ('is_paid', 'is_paid'),
+        ('username', 'user__username'),
+    ]),
+    'payments': (payments_queryset, [
+        ('payment_id', 'payment_id'),
+        ('book_ref', 'booking_id'),
+        ('amount', 'amount'),
+        ('payment_date', 'payment_date'),
+        ('payment_method', 'payment_method'),
+        ('status', 'status'),
+    ]),
+}
+
+
+def export_dir():
+    path = getattr(settings, 'EXPORT_ROOT', os.path.join(settings.BASE_DIR, 'exports'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _open(path, compress):
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def csv_row_writer(fh, headers):
+    writer = csv.writer(fh)
+    writer.writerow(headers)
+
+    def write_row(row):
+        writer.writerow([_format_value(value) for value in row])
+    return write_row
+
+
+def ndjson_row_writer(fh, headers):
+    def write_row(row):
+        record = dict(zip(headers, map(_format_value, row)))
+        fh.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+    return write_row
+
+
+ROW_WRITERS = {
+    'csv': csv_row_writer,
+    'ndjson': ndjson_row_writer,
+}
+
+
+def write_export(job):
+    build_queryset, columns = DATASETS[job.dataset]
+    headers = [header for header, _ in columns]
+    qs = build_queryset(job.filters).values_list(*[field for _, field in columns])
+
+    ExportJob.objects.filter(pk=job.pk).update(rows_total=qs.count())
+
+    path = os.path.join(export_dir(), job.filename)
+    tmp_path = path + '.part'
+    written = 0
+
+    with _open(tmp_path, job.compress) as fh:
+        write_row = ROW_WRITERS[job.file_format](fh, headers)
+
+        # iterator() на PostgreSQL читает через серверный курсор порциями по CHUNK_SIZE
+        for row in qs.iterator(chunk_size=CHUNK_SIZE):
+            write_row(row)
+            written += 1
+            if written % PROGRESS_EVERY == 0:
+                ExportJob.objects.filter(pk=job.pk).update(rows_written=written)
+
+    os.replace(tmp_path, path)
+    return path, written
+
+
+def run_export_job(job_id):
+    job = ExportJob.objects.get(pk=job_id)
+    try:
+        path, written = write_export(job)
+    except Exception as e:
+        ExportJob.objects.filter(pk=job_id).update(
+            status=ExportJob.FAILED, error=str(e), finished_at=timezone.now()
+        )
+    else:
+        ExportJob.objects.filter(pk=job_id).update(
+            status=ExportJob.DONE, file_path=path, rows_written=written, finished_at=timezone.now()
+        )
+    finally:
+        connections.close_all()
+    return job_id
@@ -0,0 +1,93 @@
+import calendar
+import hashlib
+from collections import defaultdict
+from datetime import date
+
+from django.core.cache import cache
+from django.db import connection
+
+from . import httpcache
+from .inventory import quote
+from .models import Flight
+
+FARE_CALENDAR_TIMEOUT = 60 * 60
+
+# Рейсы пары городов за месяц, открытые для продажи; места и цены — из квот (inventory)
+CANDIDATES_SQL = """
+    SELECT f.flight_id, f.departure_local_date
+    FROM flights f
+    JOIN routes r ON r.route_no = f.route_no
+    WHERE r.departure_airport_id = ANY(%(departure)s)
+      AND r.arrival_airport_id = ANY(%(arrival)s)
+      AND f.departure_local_date BETWEEN %(first_day)s AND %(last_day)s
+      AND f.status = ANY(%(statuses)s)
+      AND f.scheduled_departure > now()
+"""
+
+
+def month_bounds(month):
+    year, month_no = map(int, month.split('-'))
+    return date(year, month_no, 1), date(year, month_no, calendar.monthrange(year, month_no)[1])
+
+
+def cache_key(departure_codes, arrival_codes, month):
+    # Занятость мест версионируется по парам аэропортов: брони на других направлениях кэш не сбрасывают
+    versions = httpcache.data_versions(
+        httpcache.FLIGHTS, httpcache.SEATS, httpcache.INVENTORY,
+        *httpcache.route_scopes(httpcache.SEATS, departure_codes, arrival_codes),
+    )
+    return 'fare_calendar:{}:{}:{}:{}'.format(
+        ','.join(sorted(departure_codes)), ','.join(sorted(arrival_codes)), month,
+        hashlib.sha1('.'.join(map(str, versions)).encode()).hexdigest()[:16],
+    )
+
+
+def compute_fare_calendar(departure_codes, arrival_codes, month):
+    first_day, last_day = month_bounds(month)
+    with connection.cursor() as cursor:
+        cursor.execute(CANDIDATES_SQL, {
+            'departure': list(departure_codes),
+            'arrival': list(arrival_codes),
+            'first_day': first_day,
+            'last_day': last_day,
+            'statuses': list(Flight.BOOKABLE_STATUSES),
+        })
+        flight_days = dict(cursor.fetchall())
+
+    # Цена и остаток — те же, по которым продаёт book_itinerary: открытая корзина и разрешённая ёмкость
+    free_by_day = defaultdict(lambda: defaultdict(int))
+    cheapest_by_day = {}
+    open_flights = defaultdict(set)
+    for (flight_id, fare_conditions), item in quote(list(flight_days)).items():
+        if item['bucket'] is None:
+            continue
+        day = flight_days[flight_id]
+        free_by_day[day][fare_conditions] += item['available']
+        open_flights[day].add(flight_id)
+        if day not in cheapest_by_day or item['price'] < cheapest_by_day[day][0]:
+            cheapest_by_day[day] = (item['price'], fare_conditions)
+
+    days = []
+    for day_no in range(1, last_day.day + 1):
+        day = date(first_day.year, first_day.month, day_no)
+        classes = dict(free_by_day.get(day, {}))
+        price, cheapest = cheapest_by_day.get(day, (None, None))
+        days.append({
+            'date': day.isoformat(),
+            'min_price': price,
+            'fare_conditions': cheapest,
+            'free_seats': sum(classes.values()),
+            'free_by_class': classes,
+            'flights': len(open_flights.get(day, ())),
+        })
+    return days
+
+
+def fare_calendar(departure_codes, arrival_codes, month):
+    """Минимальная цена и места к продаже по дням месяца; кэш сбрасывается при продажах и пересчёте квот."""
+    key = cache_key(departure_codes, arrival_codes, month)
+    days = cache.get(key)
+    if days is None:
+        days = compute_fare_calendar(departure_codes, arrival_codes, month)
+        cache.set(key, days, FARE_CALENDAR_TIMEOUT)
+    return days
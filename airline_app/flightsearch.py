@@ -0,0 +1,103 @@
+"""Поиск рейсов по группам аэропортов и дате с кэшем результатов.
+
+Ключ кэша содержит версии FLIGHTS и AIRPORTS (см. httpcache): изменение расписания
+делает старые записи недостижимыми. Свободные места в ключ не входят — они берутся
+из кэша схемы мест рейса (seatmap.cached_seat_state).
+
+Поиски с обеими группами аэропортов и датой копятся в памяти процесса и раз в
+ACTIVITY_FLUSH_SECONDS сбрасываются в search_activity одним запросом; по этой
+статистике warmup выбирает направления для прогрева.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from . import httpcache
+from .models import Flight, SearchActivity
+
+SEARCH_CACHE_TIMEOUT = 60 * 30
+ACTIVITY_FLUSH_SECONDS = 60
+
+UPSERT_ACTIVITY_SQL = f"""
+    INSERT INTO {SearchActivity._meta.db_table} (departure, arrival, flight_date, day, hits)
+    SELECT * FROM unnest(%s::text[], %s::text[], %s::date[], %s::date[], %s::int[])
+    ON CONFLICT (departure, arrival, flight_date, day)
+    DO UPDATE SET hits = {SearchActivity._meta.db_table}.hits + EXCLUDED.hits
+"""
+
+
+def codes_key(codes):
+    return ','.join(sorted(codes))
+
+
+def search_queryset(departure_codes=None, arrival_codes=None, day=None):
+    """None — без фильтра; пустое множество аэропортов — пустой результат."""
+    flights = Flight.objects.select_related(
+        'route__departure_airport',
+        'route__arrival_airport',
+        'route__airplane'
+    ).filter(scheduled_departure__gte=timezone.now())
+    if departure_codes is not None:
+        flights = flights.filter(route__departure_airport__in=departure_codes)
+    if arrival_codes is not None:
+        flights = flights.filter(route__arrival_airport__in=arrival_codes)
+    if day is not None:
+        # Местная дата аэропорта вылета
+        flights = flights.filter(departure_local_date=day)
+    return flights.order_by('scheduled_departure')
+
+
+def search_cache_key(departure_codes, arrival_codes, day):
+    versions = httpcache.data_versions(httpcache.FLIGHTS, httpcache.AIRPORTS)
+    # Группы аэропортов с радиусом бывают длинными: в ключ идёт их хэш
+    codes = hashlib.sha1(f'{codes_key(departure_codes)}>{codes_key(arrival_codes)}'.encode()).hexdigest()[:16]
+    return 'flight_search:{}:{}:{}'.format(codes, day.isoformat(), '.'.join(map(str, versions)))
+
+
+def cached_search(departure_codes, arrival_codes, day):
+    """Рейсы между группами аэропортов на местную дату вылета, ещё не вылетевшие."""
+    if not departure_codes or not arrival_codes:
+        return []
+    key = search_cache_key(departure_codes, arrival_codes, day)
+    flights = cache.get(key)
+    if flights is None:
+        flights = list(search_queryset(departure_codes, arrival_codes, day))
+        cache.set(key, flights, SEARCH_CACHE_TIMEOUT)
+    now = timezone.now()
+    return [flight for flight in flights if flight.scheduled_departure >= now]
+
+
+_activity = Counter()
+_activity_lock = threading.Lock()
+_last_flush = [time.monotonic()]
+
+
+def record_search(departure_codes, arrival_codes, day):
+    if not departure_codes or not arrival_codes:
+        return
+    with _activity_lock:
+        _activity[codes_key(departure_codes), codes_key(arrival_codes), day] += 1
+        due = time.monotonic() - _last_flush[0] >= ACTIVITY_FLUSH_SECONDS
+    if due:
+        flush_activity()
+
+
+def flush_activity():
+    with _activity_lock:
+        pending = dict(_activity)
+        _activity.clear()
+        _last_flush[0] = time.monotonic()
+    if not pending:
+        return 0
+    today = timezone.localdate()
+    departures, arrivals, days = zip(*pending)
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT_ACTIVITY_SQL, [
+            list(departures), list(arrivals), list(days), [today] * len(pending), list(pending.values()),
+        ])
+    return len(pending)
@@ -0,0 +1,223 @@
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.db import connection
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import BookingCurve, BookingForecast, Flight, Seat, Segment
+
+# Кривая хранится по дням до вылета 0..HORIZON_DAYS; более ранние продажи попадают в последний день
+HORIZON_DAYS = 120
+HISTORY_DAYS = 365
+CURVE_MAX_AGE = timedelta(days=1)
+# Брони, записанные чуть раньше прошлого запуска, но закоммиченные позже него
+WATERMARK_MARGIN = timedelta(minutes=10)
+FETCH_SIZE = 50000
+CLASSES = [code for code, _ in Segment.FARE_CONDITIONS_CHOICES]
+CLOSED_STATUSES = (Flight.DEPARTED, Flight.ARRIVED)
+
+BOOKINGS_SQL = """
+    SELECT s.flight_id,
+           array_position(%s::text[], s.fare_conditions::text) - 1,
+           extract(epoch FROM f.scheduled_departure - b.book_date) / 86400.0
+    FROM segments s
+    JOIN flights f ON f.flight_id = s.flight_id
+    JOIN tickets t ON t.ticket_no = s.ticket_no
+    JOIN bookings b ON b.book_ref = t.booking_id
+    WHERE s.flight_id = ANY(%s)
+"""
+
+
+def stream_bookings(flight_ids):
+    """Продажи рейсов одним запросом через серверный курсор: (рейс, индекс класса, дней до вылета)."""
+    flights, classes, days = [], [], []
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(BOOKINGS_SQL, [CLASSES, list(flight_ids)])
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            chunk_flights, chunk_classes, chunk_days = zip(*rows)
+            flights.append(np.asarray(chunk_flights, dtype=np.int64))
+            classes.append(np.asarray(chunk_classes, dtype=np.int64))
+            days.append(np.asarray(chunk_days, dtype=np.float64))
+    if not flights:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float64)
+    return np.concatenate(flights), np.concatenate(classes), np.concatenate(days)
+
+
+def booked_by_day(flight_ids, rows):
+    """Матрица (рейс, класс, d): сколько мест было продано за d и более дней до вылета."""
+    position = {flight_id: i for i, flight_id in enumerate(flight_ids)}
+    flights, classes, days = rows
+    width = HORIZON_DAYS + 1
+    index = np.fromiter((position[flight_id] for flight_id in flights.tolist()), np.int64, len(flights))
+    bins = np.clip(np.floor(days), 0, HORIZON_DAYS).astype(np.int64)
+    counts = np.bincount(
+        (index * len(CLASSES) + classes) * width + bins, minlength=len(flight_ids) * len(CLASSES) * width,
+    ).reshape(len(flight_ids), len(CLASSES), width)
+    return counts[:, :, ::-1].cumsum(axis=2)[:, :, ::-1]
+
+
+def capacities(airplane_ids):
+    result = np.zeros((len(airplane_ids), len(CLASSES)), dtype=np.int64)
+    position = {airplane_id: i for i, airplane_id in enumerate(airplane_ids)}
+    for row in (
+        Seat.objects.filter(airplane_id__in=position)
+        .values('airplane_id', 'fare_conditions').annotate(seats=Count('id'))
+    ):
+        if row['fare_conditions'] in CLASSES:
+            result[position[row['airplane_id']], CLASSES.index(row['fare_conditions'])] = row['seats']
+    return result
+
+
+def flight_capacities(airplanes):
+    airplane_ids = sorted(set(airplanes))
+    by_airplane = capacities(airplane_ids)
+    position = {airplane_id: i for i, airplane_id in enumerate(airplane_ids)}
+    return by_airplane[[position[airplane_id] for airplane_id in airplanes]]
+
+
+def build_curves(now=None):
+    """Пересчитывает кривые бронирований маршрутов по рейсам, вылетевшим за HISTORY_DAYS."""
+    now = now or timezone.now()
+    history = list(
+        Flight.objects.filter(status__in=CLOSED_STATUSES, scheduled_departure__gte=now - timedelta(days=HISTORY_DAYS))
+        .values_list('flight_id', 'route_id', 'route__airplane_id')
+    )
+    if not history:
+        return 0
+    flight_ids, routes, airplanes = zip(*history)
+    booked = booked_by_day(flight_ids, stream_bookings(flight_ids))
+    capacity = flight_capacities(airplanes)
+
+    route_names = sorted(set(routes))
+    position = {name: i for i, name in enumerate(route_names)}
+    route_index = np.asarray([position[route] for route in routes])
+    # Рейсы группируются по (маршрут, класс); классы, которых нет в самолёте, не учитываются
+    group = (route_index[:, None] * len(CLASSES) + np.arange(len(CLASSES))[None, :]).ravel()
+    has_class = (capacity > 0).ravel()
+    share = (booked / np.maximum(capacity, 1)[:, :, None]).reshape(-1, HORIZON_DAYS + 1)
+
+    groups = len(route_names) * len(CLASSES)
+    flights = np.bincount(group[has_class], minlength=groups)
+    sums = np.zeros((groups, HORIZON_DAYS + 1))
+    np.add.at(sums, group[has_class], share[has_class])
+
+    curves = [
+        BookingCurve(
+            route_id=route_names[g // len(CLASSES)], fare_conditions=CLASSES[g % len(CLASSES)],
+            load=np.round(sums[g] / flights[g], 4).tolist(), flights=int(flights[g]), computed_at=now,
+        )
+        for g in np.flatnonzero(flights)
+    ]
+    BookingCurve.objects.bulk_create(
+        curves, update_conflicts=True, unique_fields=['route', 'fare_conditions'],
+        update_fields=['load', 'flights', 'computed_at'],
+    )
+    return len(curves)
+
+
+def load_curves():
+    """Кривые маршрутов и средняя кривая класса по всем маршрутам — для маршрутов без истории."""
+    curves = {}
+    totals = defaultdict(lambda: np.zeros(HORIZON_DAYS + 1))
+    counts = defaultdict(int)
+    for route_id, fare_conditions, load, flights in BookingCurve.objects.values_list(
+        'route_id', 'fare_conditions', 'load', 'flights'
+    ):
+        load = np.asarray(load, dtype=np.float64)
+        curves[route_id, fare_conditions] = load
+        totals[fare_conditions] += load * flights
+        counts[fare_conditions] += flights
+    fallback = {fare_conditions: totals[fare_conditions] / counts[fare_conditions] for fare_conditions in counts}
+    return curves, fallback
+
+
+def days_to_departure(departures, now):
+    return np.clip([(departure - now).days for departure in departures], 0, HORIZON_DAYS).astype(np.int64)
+
+
+def stale_flights(open_flights, now, full=False):
+    """Рейсы, прогноз которых нужно пересчитать: без прогноза, с новыми продажами или сменившимся днём."""
+    if full:
+        return list(open_flights)
+    stored = defaultdict(set)
+    for flight_id, days in BookingForecast.objects.filter(flight_id__in=open_flights).values_list(
+        'flight_id', 'days_to_departure'
+    ):
+        stored[flight_id].add(days)
+    watermark = BookingForecast.objects.aggregate(last=Max('computed_at'))['last']
+    fresh_sales = set()
+    if watermark:
+        fresh_sales = set(
+            Segment.objects.filter(flight_id__in=open_flights,
+                                   ticket__booking__book_date__gte=watermark - WATERMARK_MARGIN)
+            .values_list('flight_id', flat=True).distinct()
+        )
+    current = days_to_departure(open_flights.values(), now)
+    return [
+        flight_id for flight_id, days in zip(open_flights, current.tolist())
+        if flight_id in fresh_sales or stored.get(flight_id) != {days}
+    ]
+
+
+def forecast(flight_ids, routes, airplanes, departures, now, curves, fallback):
+    booked = booked_by_day(flight_ids, stream_bookings(flight_ids))[:, :, 0]
+    capacity = flight_capacities(airplanes)
+    days = days_to_departure(departures, now)
+
+    # Кривые (маршрут, класс, день); без истории — средняя по классу, без неё — нулевая
+    route_names = sorted(set(routes))
+    zero = np.zeros(HORIZON_DAYS + 1)
+    table = np.stack([
+        np.stack([curves.get((route_id, fare_conditions), fallback.get(fare_conditions, zero))
+                  for fare_conditions in CLASSES])
+        for route_id in route_names
+    ])
+    position = {name: i for i, name in enumerate(route_names)}
+    flight_curves = table[[position[route_id] for route_id in routes]]
+
+    # Доля мест, которую маршрут обычно добирает от текущего дня до вылета (аддитивный pickup)
+    now_share = np.take_along_axis(flight_curves, days[:, None, None], axis=2)[:, :, 0]
+    pickup = np.maximum(flight_curves[:, :, 0] - now_share, 0.0)
+    expected = np.minimum(booked + pickup * capacity, capacity)
+    return booked, capacity, days, np.maximum(expected, booked)
+
+
+def refresh_forecasts(full=False, now=None):
+    now = now or timezone.now()
+    latest_curve = BookingCurve.objects.aggregate(last=Max('computed_at'))['last']
+    curves_built = 0
+    if full or latest_curve is None or latest_curve < now - CURVE_MAX_AGE:
+        curves_built = build_curves(now)
+
+    open_flights = dict(
+        Flight.objects.filter(status__in=Flight.BOOKABLE_STATUSES, scheduled_departure__gt=now)
+        .values_list('flight_id', 'scheduled_departure')
+    )
+    stale = stale_flights(open_flights, now, full=full)
+    if not stale:
+        return {'curves': curves_built, 'flights': 0, 'open_flights': len(open_flights)}
+
+    rows = Flight.objects.filter(flight_id__in=stale).values_list(
+        'flight_id', 'route_id', 'route__airplane_id', 'scheduled_departure'
+    )
+    flight_ids, routes, airplanes, departures = zip(*rows)
+    curves, fallback = load_curves()
+    booked, capacity, days, expected = forecast(flight_ids, routes, airplanes, departures, now, curves, fallback)
+
+    forecasts = [
+        BookingForecast(
+            flight_id=flight_id, fare_conditions=fare_conditions, capacity=int(capacity[i, c]),
+            booked=int(booked[i, c]), forecast_booked=round(float(expected[i, c]), 1),
+            days_to_departure=int(days[i]), computed_at=now,
+        )
+        for i, flight_id in enumerate(flight_ids)
+        for c, fare_conditions in enumerate(CLASSES)
+        if capacity[i, c]
+    ]
+    BookingForecast.objects.bulk_create(
+        forecasts, batch_size=5000, update_conflicts=True, unique_fields=['flight', 'fare_conditions'],
+        update_fields=['capacity', 'booked', 'forecast_booked', 'days_to_departure', 'computed_at'],
+    )
+    return {'curves': curves_built, 'flights': len(flight_ids), 'open_flights': len(open_flights)}
@@ -0,0 +1,220 @@
+import json
+import os
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+
+from .models import Airport, Route
+
+EARTH_RADIUS_KM = 6371.0
+
+# Допустимое отклонение Route.duration от расстояния / крейсерской скорости
+DURATION_TOLERANCE = 0.35
+# Руление, взлёт и посадка, которые не зависят от расстояния
+GROUND_TIME = timedelta(minutes=30)
+# Версия формата метаданных кэша: файл другой версии пересобирается
+CACHE_FORMAT = 2
+
+
+def haversine_matrix(lat_a, lon_a, lat_b=None, lon_b=None):
+    """Расстояния по большому кругу (км) между всеми парами точек."""
+    if lat_b is None:
+        lat_b, lon_b = lat_a, lon_a
+    lat_a, lon_a, lat_b, lon_b = (np.radians(np.asarray(v, dtype=np.float64))
+                                  for v in (lat_a, lon_a, lat_b, lon_b))
+    dlat = lat_b[np.newaxis, :] - lat_a[:, np.newaxis]
+    dlon = lon_b[np.newaxis, :] - lon_a[:, np.newaxis]
+    h = (np.sin(dlat / 2) ** 2
+         + np.cos(lat_a)[:, np.newaxis] * np.cos(lat_b)[np.newaxis, :] * np.sin(dlon / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+class AirportGrid:
+    """Сеточный пространственный индекс аэропортов (ячейки cell_deg × cell_deg градусов)."""
+
+    def __init__(self, codes, lat, lon, cell_deg=1.0):
+        self.codes = list(codes)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.cell_deg = cell_deg
+        self.cells = {}
+        for i, key in enumerate(zip(self._row(self.lat), self._col(self.lon))):
+            self.cells.setdefault(key, []).append(i)
+
+    def _row(self, lat):
+        return np.floor((np.asarray(lat) + 90) / self.cell_deg).astype(int)
+
+    def _col(self, lon):
+        return np.floor((np.asarray(lon) + 180) / self.cell_deg).astype(int) % int(360 / self.cell_deg)
+
+    def within(self, lat, lon, radius_km):
+        lat_span = radius_km / 111.0
+        cos_lat = max(np.cos(np.radians(min(abs(lat) + lat_span, 90.0))), 1e-6)
+        lon_span = min(radius_km / (111.0 * cos_lat), 180.0)
+
+        rows = range(int(self._row(lat - lat_span)), int(self._row(min(lat + lat_span, 90.0))) + 1)
+        col_count = int(360 / self.cell_deg)
+        cols_needed = min(int(np.ceil(2 * lon_span / self.cell_deg)) + 1, col_count)
+        first_col = int(self._col(lon - lon_span))
+        cols = {(first_col + k) % col_count for k in range(cols_needed + 1)}
+
+        candidates = [i for r in rows for c in cols for i in self.cells.get((r, c), ())]
+        if not candidates:
+            return []
+        candidates = np.asarray(candidates)
+        distances = haversine_matrix([lat], [lon], self.lat[candidates], self.lon[candidates])[0]
+        found = np.flatnonzero(distances <= radius_km)
+        order = found[np.argsort(distances[found])]
+        return [(self.codes[candidates[i]], float(distances[i])) for i in order]
+
+
+class AirportDistances:
+    def __init__(self, codes, matrix, lat=None, lon=None):
+        self.codes = list(codes)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.matrix = matrix
+        self.lat = lat
+        self.lon = lon
+        self._grid = None
+
+    @property
+    def grid(self):
+        if self._grid is None:
+            self._grid = AirportGrid(self.codes, self.lat, self.lon)
+        return self._grid
+
+    def nearby(self, codes, radius_km):
+        """Аэропорты в радиусе radius_km от любого из codes: {код: расстояние}."""
+        result = {}
+        for code in codes:
+            if code not in self.index:
+                continue
+            i = self.index[code]
+            for other, distance in self.grid.within(self.lat[i], self.lon[i], radius_km):
+                if distance < result.get(other, float('inf')):
+                    result[other] = distance
+        return result
+
+    def __contains__(self, code):
+        return code in self.index
+
+    def distance(self, code_from, code_to):
+        return float(self.matrix[self.index[code_from], self.index[code_to]])
+
+    def distances(self, codes_from, codes_to):
+        rows = np.fromiter((self.index[c] for c in codes_from), dtype=np.intp)
+        cols = np.fromiter((self.index[c] for c in codes_to), dtype=np.intp)
+        return np.asarray(self.matrix[rows, cols], dtype=np.float64)
+
+
+def _cache_paths():
+    cache_dir = getattr(settings, 'GEO_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache'))
+    os.makedirs(cache_dir, exist_ok=True)
+    return (os.path.join(cache_dir, 'airport_distances.npy'),
+            os.path.join(cache_dir, 'airport_distances.json'))
+
+
+def build_distance_matrix():
+    airports = list(Airport.objects.order_by('airport_code')
+                    .values_list('airport_code', 'latitude', 'longitude'))
+    codes = [code for code, _, _ in airports]
+    lat = [lat for _, lat, _ in airports]
+    lon = [lon for _, _, lon in airports]
+    matrix = haversine_matrix(lat, lon).astype(np.float32)
+
+    matrix_path, codes_path = _cache_paths()
+    np.save(matrix_path + '.tmp.npy', matrix)
+    os.replace(matrix_path + '.tmp.npy', matrix_path)
+    with open(codes_path + '.tmp', 'w', encoding='utf-8') as fh:
+        json.dump({'version': CACHE_FORMAT, 'codes': codes, 'lat': lat, 'lon': lon}, fh)
+    os.replace(codes_path + '.tmp', codes_path)
+    return AirportDistances(codes, matrix, lat, lon)
+
+
+_loaded = {'stamp': None, 'distances': None}
+
+
+def distance_matrix():
+    """Матрица расстояний между аэропортами, отображённая с диска (mmap).
+
+    Пересчитывается, если кэш удалён (см. invalidate_distance_matrix).
+    """
+    matrix_path, codes_path = _cache_paths()
+    try:
+        stamp = os.stat(codes_path).st_mtime_ns
+    except FileNotFoundError:
+        stamp = None
+
+    meta = None
+    if stamp is not None and stamp != _loaded['stamp']:
+        with open(codes_path, encoding='utf-8') as fh:
+            meta = json.load(fh)
+        # Кэш старого формата (список кодов) или неизвестной версии строится заново
+        if not isinstance(meta, dict) or meta.get('version') != CACHE_FORMAT:
+            stamp = None
+
+    if stamp is None:
+        _loaded['distances'] = build_distance_matrix()
+        _loaded['stamp'] = os.stat(codes_path).st_mtime_ns
+    elif meta is not None:
+        _loaded['distances'] = AirportDistances(
+            meta['codes'], np.load(matrix_path, mmap_mode='r'), meta['lat'], meta['lon']
+        )
+        _loaded['stamp'] = stamp
+    return _loaded['distances']
+
+
+def invalidate_distance_matrix():
+    # Сначала отпускаем mmap: в Windows отображённый файл удалить нельзя.
+    # Метаданные удаляются первыми — без них distance_matrix() строит кэш заново
+    _loaded['stamp'] = _loaded['distances'] = None
+    for path in reversed(_cache_paths()):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def distance_km(code_from, code_to):
+    return distance_matrix().distance(code_from, code_to)
+
+
+def expected_duration(distance, speed):
+    return GROUND_TIME + timedelta(hours=distance / speed)
+
+
+def nearby_airports(codes, radius_km):
+    return distance_matrix().nearby(codes, radius_km)
+
+
+def check_routes(routes=None, tolerance=DURATION_TOLERANCE):
+    """Проверка маршрутов на дальность самолёта и правдоподобность длительности.
+
+    Возвращает список (route_no, тип проблемы, сообщение).
+    """
+    if routes is None:
+        routes = Route.objects.all()
+    rows = list(routes.values_list(
+        'route_no', 'departure_airport_id', 'arrival_airport_id',
+        'airplane__range', 'airplane__speed', 'duration',
+    ))
+    if not rows:
+        return []
+
+    route_nos, dep, arr, ranges, speeds, durations = zip(*rows)
+    distances = distance_matrix().distances(dep, arr)
+    ranges = np.asarray(ranges, dtype=np.float64)
+    speeds = np.asarray(speeds, dtype=np.float64)
+    hours = np.array([d.total_seconds() / 3600 for d in durations])
+    expected = GROUND_TIME.total_seconds() / 3600 + distances / np.where(speeds > 0, speeds, np.nan)
+
+    issues = []
+    for i in np.flatnonzero(distances > ranges):
+        issues.append((route_nos[i], 'range',
+                       f"{distances[i]:.0f} км больше дальности самолёта {ranges[i]:.0f} км"))
+    deviation = np.abs(hours - expected) / expected
+    for i in np.flatnonzero(~(deviation <= tolerance)):
+        issues.append((route_nos[i], 'duration',
+                       f"длительность {hours[i]:.2f} ч, ожидается около {expected[i]:.2f} ч"))
+    return issues
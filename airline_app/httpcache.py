@@ -0,0 +1,110 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+# Домены данных: счётчик версии увеличивается при любом изменении соответствующих таблиц
+FLIGHTS = 'flights'
+AIRPORTS = 'airports'
+SEATS = 'seats'
+# Квоты продаж и лимиты тарифных корзин (inventory.optimize_inventory)
+INVENTORY = 'inventory'
+
+DEFAULT_POLICIES = {
+    'flight_search': {'private': True, 'max_age': 0, 'must_revalidate': True},
+    'airport_autocomplete': {'public': True, 'max_age': 300},
+    'fare_calendar': {'public': True, 'max_age': 60},
+}
+
+
+def scoped(domain, *parts):
+    """Версия домена для части данных, например SEATS по паре аэропортов: bump(scoped(SEATS, 'SVO', 'AER'))."""
+    return ':'.join([domain, *map(str, parts)])
+
+
+def route_scopes(domain, departure_codes, arrival_codes):
+    return [scoped(domain, departure, arrival)
+            for departure in sorted(departure_codes) for arrival in sorted(arrival_codes)]
+
+
+def _version_key(domain):
+    return f'data_version:{domain}'
+
+
+def _seed():
+    # Не 1: после перезапуска или вытеснения из кэша старые ETag не должны снова совпасть
+    return time.time_ns()
+
+
+def data_versions(*domains):
+    keys = [_version_key(domain) for domain in domains]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, _seed(), None)
+        # Параллельный процесс мог записать свою версию раньше — берём ту, что в кэше
+        found.update(cache.get_many(missing))
+    return [found[key] for key in keys]
+
+
+def bump(*domains):
+    for domain in domains:
+        try:
+            cache.incr(_version_key(domain))
+        except ValueError:
+            cache.set(_version_key(domain), _seed(), None)
+
+
+def etags_enabled():
+    # Без общего кэша запись в одном процессе не меняет версии, по которым считают ETag другие
+    return getattr(settings, 'SHARED_CACHE', False)
+
+
+def versioned_etag(domains, per_user=False, time_bucket=None):
+    """domains — список доменов или функция request -> список (для версий, зависящих от параметров)."""
+    def etag_func(request, *args, **kwargs):
+        # Сообщения (messages) показываются один раз: такую страницу нельзя отдавать из кэша
+        if not etags_enabled() or len(messages.get_messages(request)):
+            return None
+        names = domains(request) if callable(domains) else domains
+        parts = [request.path, request.GET.urlencode(), *map(str, data_versions(*names))]
+        if per_user:
+            parts.append(str(request.user.pk or 'anon'))
+        if time_bucket:
+            parts.append(str(int(time.time() // time_bucket)))
+        return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:20]
+    return etag_func
+
+
+def cache_policy(name):
+    policy = {**DEFAULT_POLICIES.get(name, {}), **getattr(settings, 'HTTP_CACHE_POLICIES', {}).get(name, {})}
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+                patch_cache_control(response, **policy)
+                if policy.get('private'):
+                    patch_vary_headers(response, ['Cookie'])
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional(name, domains, per_user=False, time_bucket=None):
+    """ETag из счётчиков версий данных: при совпадении 304 без выполнения view и запросов к БД.
+
+    Только с общим кэшем (SHARED_CACHE); иначе ответ без ETag, остаётся Cache-Control.
+    """
+    def decorator(view):
+        return cache_policy(name)(
+            condition(etag_func=versioned_etag(domains, per_user, time_bucket))(view)
+        )
+    return decorator
@@ -0,0 +1,236 @@
+"""Управление квотами продаж: разрешённая ёмкость с перебронированием и вложенные тарифные корзины.
+
+Разрешённая ёмкость класса на рейсе — места салона, увеличенные на историческую
+долю неявки маршрута (не больше INVENTORY_MAX_OVERBOOKING). Корзины класса
+вложенные: более дорогая продаёт всё, что разрешено более дешёвой, и ещё сверх
+того. При прогнозе спроса выше ёмкости (forecasting) дешёвые корзины сжимаются.
+
+Лимиты пересчитываются пакетно (optimize_inventory) по всем открытым рейсам;
+при бронировании читается одна строка на перелёт, а sold увеличивается
+условным UPDATE с F-выражением.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from math import floor
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import httpcache
+from .forecasting import CLASSES, CLOSED_STATUSES, flight_capacities
+from .models import BookingForecast, Flight, FlightInventory, Segment
+from .pricing import FARE_BUCKETS, fare_price
+
+HISTORY_DAYS = 365
+# Меньше проданных мест в истории маршрута — берётся средняя неявка класса
+MIN_SEGMENTS = 200
+BATCH_SIZE = 5000
+
+NO_SHOW_SQL = """
+    SELECT f.route_no, s.fare_conditions, count(*), count(bp.id)
+    FROM segments s
+    JOIN flights f ON f.flight_id = s.flight_id
+    LEFT JOIN boarding_passes bp ON bp.flight_id = s.flight_id AND bp.ticket_no = s.ticket_no
+    WHERE f.status = ANY(%s) AND f.scheduled_departure >= %s
+    GROUP BY 1, 2
+"""
+
+
+def no_show_rates(now):
+    """Доля неявки по (маршрут, класс): проданные перелёты вылетевших рейсов без посадочного талона."""
+    by_route = {}
+    totals = defaultdict(lambda: [0, 0])
+    with connection.cursor() as cursor:
+        cursor.execute(NO_SHOW_SQL, [list(CLOSED_STATUSES), now - timedelta(days=HISTORY_DAYS)])
+        for route_id, fare_conditions, sold, flown in cursor.fetchall():
+            totals[fare_conditions][0] += sold
+            totals[fare_conditions][1] += flown
+            if sold >= MIN_SEGMENTS:
+                by_route[route_id, fare_conditions] = 1 - flown / sold
+    fallback = {fare_conditions: 1 - flown / sold for fare_conditions, (sold, flown) in totals.items() if sold}
+    return by_route, fallback
+
+
+def authorized_capacity(capacity, no_show_rate):
+    """Мест к продаже, чтобы явилось в среднем не больше, чем есть в салоне."""
+    max_share = getattr(settings, 'INVENTORY_MAX_OVERBOOKING', 0.1)
+    limit = floor(capacity / (1 - min(max(no_show_rate, 0.0), 0.5)))
+    return min(limit, floor(capacity * (1 + max_share)))
+
+
+def nested_limits(fare_conditions, authorized, demand_ratio=1.0):
+    """Лимиты корзин класса; demand_ratio — прогноз продаж к вылету / разрешённая ёмкость."""
+    squeeze = max(demand_ratio, 1.0)
+    limits = []
+    for i, (_, _, share) in enumerate(FARE_BUCKETS[fare_conditions]):
+        limit = authorized if i == 0 else floor(authorized * share / squeeze)
+        limits.append(min(limit, limits[-1]) if limits else limit)
+    return limits
+
+
+def sold_counts(flight_ids):
+    return {
+        (row['flight_id'], row['fare_conditions']): row['sold']
+        for row in Segment.objects.filter(flight_id__in=flight_ids)
+        .values('flight_id', 'fare_conditions').annotate(sold=Count('pk'))
+    }
+
+
+def build_inventory(rows, now, no_show=None, forecasts=None, sold=None):
+    """Строки квот для [(flight_id, route_id, airplane_id), ...]; sold — продано по (рейс, класс)."""
+    if not rows:
+        return []
+    flight_ids, routes, airplanes = zip(*rows)
+    capacity = flight_capacities(airplanes)
+    by_route, fallback = no_show or ({}, {})
+    forecasts = forecasts or {}
+    inventory = []
+    for i, (flight_id, route_id) in enumerate(zip(flight_ids, routes)):
+        for c, fare_conditions in enumerate(CLASSES):
+            seats = int(capacity[i, c])
+            if not seats:
+                continue
+            rate = by_route.get((route_id, fare_conditions), fallback.get(fare_conditions, 0.0))
+            authorized = authorized_capacity(seats, rate)
+            sold_now = (sold or {}).get((flight_id, fare_conditions), 0)
+            # Уже проданное не отзывается, даже если неявка в истории снизилась
+            authorized = max(authorized, sold_now)
+            expected = forecasts.get((flight_id, fare_conditions), 0.0)
+            inventory.append(FlightInventory(
+                flight_id=flight_id, fare_conditions=fare_conditions, capacity=seats, authorized=authorized,
+                sold=sold_now, bucket_limits=nested_limits(fare_conditions, authorized, expected / authorized),
+                no_show_rate=round(rate, 4), optimized_at=now,
+            ))
+    return inventory
+
+
+def optimize_inventory(recount=False, now=None):
+    """Пакетный пересчёт разрешённой ёмкости и лимитов корзин по всем открытым рейсам.
+
+    sold новых строк считается по сегментам; у существующих пересчитывается только
+    с recount=True — конкурентная бронь между подсчётом и записью при этом теряется,
+    поэтому сверку стоит запускать в тихое время.
+    """
+    now = now or timezone.now()
+    rows = list(
+        Flight.objects.filter(status__in=Flight.BOOKABLE_STATUSES, scheduled_departure__gt=now)
+        .values_list('flight_id', 'route_id', 'route__airplane_id')
+    )
+    if not rows:
+        return {'flights': 0, 'classes': 0, 'overbooked': 0}
+    flight_ids = [row[0] for row in rows]
+    forecasts = {
+        (flight_id, fare_conditions): forecast_booked
+        for flight_id, fare_conditions, forecast_booked in BookingForecast.objects.filter(flight_id__in=flight_ids)
+        .values_list('flight_id', 'fare_conditions', 'forecast_booked')
+    }
+    inventory = build_inventory(rows, now, no_show_rates(now), forecasts, sold_counts(flight_ids))
+    update_fields = ['capacity', 'authorized', 'bucket_limits', 'no_show_rate', 'optimized_at']
+    FlightInventory.objects.bulk_create(
+        inventory, batch_size=BATCH_SIZE, update_conflicts=True, unique_fields=['flight', 'fare_conditions'],
+        update_fields=update_fields + ['sold'] if recount else update_fields,
+    )
+    httpcache.bump(httpcache.INVENTORY)
+    return {
+        'flights': len(rows),
+        'classes': len(inventory),
+        'overbooked': sum(1 for row in inventory if row.authorized > row.capacity),
+    }
+
+
+def default_inventory(flight_ids):
+    """Квоты, которые ensure_inventory создал бы для рейсов без пакетного пересчёта (без записи в БД)."""
+    rows = Flight.objects.filter(pk__in=flight_ids).values_list('flight_id', 'route_id', 'route__airplane_id')
+    return build_inventory(list(rows), timezone.now(), sold=sold_counts(flight_ids))
+
+
+def ensure_inventory(flight_ids):
+    """Квоты рейсов, для которых ещё не было пакетного пересчёта: без перебронирования и прогноза."""
+    existing = set(FlightInventory.objects.filter(flight_id__in=flight_ids).values_list('flight_id', flat=True))
+    missing = [flight_id for flight_id in flight_ids if flight_id not in existing]
+    if missing:
+        FlightInventory.objects.bulk_create(default_inventory(missing), ignore_conflicts=True)
+
+
+def load_inventory(flight_ids, defaults=False):
+    """{(flight_id, класс): квота}; defaults=True — рейсам без квот подставляются квоты по умолчанию."""
+    rows = {
+        (row.flight_id, row.fare_conditions): row
+        for row in FlightInventory.objects.filter(flight_id__in=flight_ids)
+    }
+    if defaults:
+        missing = set(flight_ids) - {flight_id for flight_id, _ in rows}
+        if missing:
+            rows.update({(row.flight_id, row.fare_conditions): row for row in default_inventory(sorted(missing))})
+    return rows
+
+
+def bucket_code(row):
+    bucket = row.open_bucket()
+    return FARE_BUCKETS[row.fare_conditions][bucket][0] if bucket is not None else None
+
+
+def reserve(row):
+    """Продаёт одно место по самой дешёвой открытой корзине; код корзины или None, если класс закрыт."""
+    bucket = row.open_bucket()
+    if bucket is None:
+        return None
+    # Условие на sold в том же UPDATE: параллельная продажа не может пройти сверх лимита
+    updated = FlightInventory.objects.filter(pk=row.pk, sold__lt=row.bucket_limits[bucket]).update(sold=F('sold') + 1)
+    if not updated:
+        row.refresh_from_db(fields=['sold'])
+        return reserve(row)
+    row.sold += 1
+    return FARE_BUCKETS[row.fare_conditions][bucket][0]
+
+
+def adjust_sold(deltas):
+    """Счётчики после переноса или удаления сегментов: {(flight_id, fare_conditions): +-n}."""
+    for (flight_id, fare_conditions), delta in deltas.items():
+        if delta:
+            FlightInventory.objects.filter(flight_id=flight_id, fare_conditions=fare_conditions).update(
+                sold=Greatest(F('sold') + delta, 0)
+            )
+
+
+def class_prices(flight_ids):
+    """Цена перелётов по классам при текущих открытых корзинах; None — класс закрыт хотя бы на одном рейсе."""
+    quotes = quote(flight_ids)
+    prices = {}
+    for fare_conditions in CLASSES:
+        total = 0
+        for flight_id in flight_ids:
+            price = quotes.get((flight_id, fare_conditions), {'price': None})['price']
+            if price is None:
+                total = None
+                break
+            total += price
+        prices[fare_conditions] = total
+    return prices
+
+
+def quote(flight_ids):
+    """Текущая цена и остаток мест по классам: {(flight_id, класс): {'bucket', 'price', 'available'}}."""
+    quotes = {}
+    for key, row in load_inventory(flight_ids, defaults=True).items():
+        code = bucket_code(row)
+        quotes[key] = {
+            'bucket': code,
+            'price': fare_price(row.fare_conditions, bucket=code) if code is not None else None,
+            'available': row.available,
+        }
+    return quotes
+
+
+def flight_offers(flight_ids):
+    """{flight_id: (мест к продаже по всем классам, минимальная цена)} — с учётом перебронирования и корзин."""
+    offers = {}
+    for (flight_id, _), item in quote(flight_ids).items():
+        if item['bucket'] is None:
+            continue
+        seats, price = offers.get(flight_id, (0, None))
+        offers[flight_id] = (seats + item['available'], item['price'] if price is None else min(price, item['price']))
+    return offers
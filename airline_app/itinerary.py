@@ -0,0 +1,177 @@
+import random
+import string
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .inventory import ensure_inventory, load_inventory, reserve
+from .models import Booking, BoardingPass, Flight, OutboxEvent, Seat, Segment, Ticket
+from .pricing import fare_price
+from .seatmap import occupancy_changed
+
+BOARDING_BEFORE_DEPARTURE = timedelta(minutes=40)
+MAX_LEGS = 6
+
+
+class ItineraryError(Exception):
+    pass
+
+
+def new_book_ref():
+    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+
+
+def new_ticket_no():
+    return ''.join(random.choices(string.digits, k=13))
+
+
+def lock_flights(flight_ids):
+    # Блокировки берутся строго по возрастанию flight_id: две брони с общими рейсами
+    # ждут друг друга, но не могут захватить их в разном порядке и попасть в deadlock
+    flights = (
+        Flight.objects.select_for_update(of=('self',))
+        .select_related('route')
+        .filter(pk__in=flight_ids)
+        .order_by('pk')
+    )
+    return {flight.pk: flight for flight in flights}
+
+
+def check_legs(legs, flights):
+    if not legs:
+        raise ItineraryError("Не выбран ни один рейс")
+    if len(legs) > MAX_LEGS:
+        raise ItineraryError(f"В маршруте не больше {MAX_LEGS} перелётов")
+
+    previous = None
+    for leg in legs:
+        flight = flights.get(leg['flight_id'])
+        if flight is None:
+            raise ItineraryError(f"Рейс {leg['flight_id']} не найден")
+        if flight.status not in Flight.BOOKABLE_STATUSES or flight.scheduled_departure <= timezone.now():
+            raise ItineraryError(f"Рейс {flight.route_id} недоступен для бронирования")
+        if leg['fare_conditions'] not in dict(Seat.FARE_CONDITIONS):
+            raise ItineraryError(f"Неизвестный класс обслуживания {leg['fare_conditions']}")
+        if previous is not None and flight.scheduled_departure <= previous.scheduled_arrival:
+            raise ItineraryError(f"Рейс {flight.route_id} вылетает раньше прилёта предыдущего")
+        previous = flight
+
+
+def assign_seats(legs, flights):
+    occupied = defaultdict(set)
+    for flight_id, seat_id in BoardingPass.objects.filter(flight_id__in=flights).values_list('flight_id', 'seat_id'):
+        occupied[flight_id].add(seat_id)
+
+    seats = defaultdict(list)
+    airplanes = {flight.route.airplane_id for flight in flights.values()}
+    for seat in Seat.objects.filter(airplane_id__in=airplanes, fare_conditions__in={leg['fare_conditions'] for leg in legs}):
+        seats[seat.airplane_id, seat.fare_conditions].append(seat)
+
+    assigned = []
+    for leg in legs:
+        flight = flights[leg['flight_id']]
+        free = [seat for seat in seats[flight.route.airplane_id, leg['fare_conditions']]
+                if seat.pk not in occupied[flight.pk]]
+        seat_no = leg.get('seat_no')
+        if seat_no and seat_no != 'Auto':
+            seat = next((seat for seat in free if seat.seat_no == seat_no), None)
+            if seat is None:
+                raise ItineraryError(f"Место {seat_no} на рейсе {flight.route_id} недоступно для класса {leg['fare_conditions']}!")
+        else:
+            # Продажу уже разрешила квота (reserve): без свободного кресла место назначат на регистрации
+            seat = random.choice(free) if free else None
+        if seat is not None:
+            occupied[flight.pk].add(seat.pk)
+        assigned.append(seat)
+    return assigned
+
+
+def reserve_inventory(legs, flights):
+    """Списывает места из квот классов (см. inventory); коды тарифных корзин по перелётам."""
+    ensure_inventory(list(flights))
+    rows = load_inventory(list(flights))
+    buckets = []
+    for leg in legs:
+        flight = flights[leg['flight_id']]
+        row = rows.get((flight.pk, leg['fare_conditions']))
+        bucket = reserve(row) if row is not None else None
+        if bucket is None:
+            raise ItineraryError(f"Нет свободных мест класса {leg['fare_conditions']} на рейсе {flight.route_id}!")
+        buckets.append(bucket)
+    return buckets
+
+
+def book_itinerary(user, passenger_name, passenger_id, legs):
+    """Бронирует все перелёты маршрута одной транзакцией: либо всё, либо ничего.
+
+    legs — список словарей flight_id, fare_conditions, seat_no (необязательно)
+    и outbound (False для обратного направления). На каждое направление
+    создаётся отдельный билет, как в исходной схеме bookings.
+    """
+    with transaction.atomic():
+        flights = lock_flights(sorted({leg['flight_id'] for leg in legs}))
+        check_legs(legs, flights)
+        buckets = reserve_inventory(legs, flights)
+        seats = assign_seats(legs, flights)
+
+        prices = [fare_price(leg['fare_conditions'], bucket=bucket) for leg, bucket in zip(legs, buckets)]
+        booking = Booking.objects.create(
+            book_ref=new_book_ref(),
+            book_date=timezone.now(),
+            total_amount=sum(prices),
+            user=user,
+            is_paid=False,
+        )
+
+        tickets = {}
+        for leg in legs:
+            outbound = leg.get('outbound', True)
+            if outbound not in tickets:
+                tickets[outbound] = Ticket(
+                    ticket_no=new_ticket_no(),
+                    booking=booking,
+                    passenger_id=passenger_id,
+                    passenger_name=passenger_name,
+                    outbound=outbound,
+                )
+        Ticket.objects.bulk_create(tickets.values())
+
+        segments = []
+        passes = []
+        for leg, seat, price, bucket in zip(legs, seats, prices, buckets):
+            flight = flights[leg['flight_id']]
+            ticket = tickets[leg.get('outbound', True)]
+            segments.append(Segment(ticket=ticket, flight=flight, fare_conditions=leg['fare_conditions'],
+                                    fare_bucket=bucket, price=price))
+            if seat is None:
+                continue
+            # Уникальный индекс (flight, seat) — последняя линия защиты; номер посадки назначит plan_boarding
+            passes.append(BoardingPass(ticket=ticket, flight=flight, seat=seat,
+                                       boarding_time=flight.scheduled_departure - BOARDING_BEFORE_DEPARTURE))
+        Segment.objects.bulk_create(segments)
+        BoardingPass.objects.bulk_create(passes)
+
+        booked_legs = [
+            {
+                'flight_id': leg['flight_id'],
+                'ticket_no': tickets[leg.get('outbound', True)].ticket_no,
+                'seat_no': seat.seat_no if seat else None,
+                'fare_bucket': bucket,
+                'fare_conditions': leg['fare_conditions'],
+                'outbound': leg.get('outbound', True),
+            }
+            for leg, seat, bucket in zip(legs, seats, buckets)
+        ]
+        # Поля первого перелёта остаются на верхнем уровне для прежних подписчиков события
+        OutboxEvent.record('booking.created', 'booking', booking.book_ref, {
+            'user_id': user.pk if user else None,
+            **{key: booked_legs[0][key] for key in ('flight_id', 'ticket_no', 'seat_no', 'fare_conditions')},
+            'total_amount': str(booking.total_amount),
+            'legs': booked_legs,
+        })
+        # bulk_create не отправляет post_save: занятость мест рейсов сбрасываем вручную
+        transaction.on_commit(lambda: occupancy_changed(flights))
+
+    return booking
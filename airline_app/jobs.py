@@ -0,0 +1,235 @@
+import json
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, JobSchedule
+from .outbox import backoff
+
+TASKS = {}
+DEFAULT_TIMEOUT = 60 * 60
+
+# минута, час, день месяца, месяц, день недели (0 и 7 — воскресенье)
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def task(name=None, max_attempts=3, timeout=DEFAULT_TIMEOUT, priority=0):
+    """Регистрирует функцию как фоновую задачу; параметры задания передаются именованными аргументами."""
+    def decorator(func):
+        TASKS[name or func.__name__] = {
+            'func': func, 'max_attempts': max_attempts, 'timeout': timeout, 'priority': priority,
+        }
+        return func
+    return decorator
+
+
+def enqueue(task_name, args=None, run_at=None, priority=None, schedule=''):
+    if task_name not in TASKS:
+        raise ValueError(f"Неизвестная задача: {task_name}")
+    spec = TASKS[task_name]
+    return Job.objects.create(
+        task=task_name,
+        args=args or {},
+        run_at=run_at or timezone.now(),
+        priority=spec['priority'] if priority is None else priority,
+        max_attempts=spec['max_attempts'],
+        schedule=schedule,
+    )
+
+
+def parse_cron_field(spec, low, high):
+    values = set()
+    for part in spec.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/')
+            step = int(step)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = map(int, part.split('-'))
+        else:
+            start = int(part)
+            end = high if step != 1 else start
+        if step < 1 or start < low or end > high or start > end:
+            raise ValueError(f"Недопустимое значение cron: {spec}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def parse_cron(expr):
+    fields = expr.split()
+    if len(fields) != 5:
+        raise ValueError(f"Ожидается 5 полей cron: {expr}")
+    minutes, hours, days, months, weekdays = (
+        parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELDS)
+    )
+    if 7 in weekdays:
+        weekdays = (weekdays - {7}) | {0}
+    # Как в cron: если ограничены и день месяца, и день недели, достаточно совпадения любого
+    any_day = fields[2] == '*' or fields[4] == '*'
+    return minutes, hours, days, months, weekdays, any_day
+
+
+def next_run(expr, after=None):
+    minutes, hours, days, months, weekdays, any_day = parse_cron(expr)
+    # Расписание — в местном времени проекта (TIME_ZONE)
+    moment = timezone.localtime(after or timezone.now()).replace(tzinfo=None, second=0, microsecond=0)
+    moment += timedelta(minutes=1)
+    limit = moment + timedelta(days=366 * 5)
+
+    while moment < limit:
+        if moment.month not in months:
+            year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+            moment = datetime(year, month, 1)
+            continue
+        day_ok = moment.day in days
+        weekday_ok = (moment.weekday() + 1) % 7 in weekdays
+        if not ((day_ok and weekday_ok) if any_day else (day_ok or weekday_ok)):
+            moment = datetime(moment.year, moment.month, moment.day) + timedelta(days=1)
+            continue
+        if moment.hour not in hours:
+            moment = moment.replace(minute=0) + timedelta(hours=1)
+            continue
+        if moment.minute not in minutes:
+            moment += timedelta(minutes=1)
+            continue
+        return timezone.make_aware(moment)
+    raise ValueError(f"Расписание никогда не срабатывает: {expr}")
+
+
+def claim(worker_id, limit):
+    """Забирает до limit готовых заданий. FOR UPDATE SKIP LOCKED позволяет запускать обработчики на разных машинах."""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.PENDING, run_at__lte=now)
+            .order_by('-priority', 'run_at')[:limit]
+        )
+        for job in jobs:
+            job.status = Job.RUNNING
+            job.locked_by = worker_id
+            job.started_at = now
+            job.attempts += 1
+            job.lease_until = now + timedelta(seconds=TASKS.get(job.task, {}).get('timeout', DEFAULT_TIMEOUT))
+        Job.objects.bulk_update(jobs, ['status', 'locked_by', 'started_at', 'attempts', 'lease_until'])
+    return jobs
+
+
+def execute(task_name, args):
+    """Выполняется в потоке или дочернем процессе обработчика. Возвращает (результат, мс)."""
+    if task_name not in TASKS:
+        raise LookupError(f"Задача {task_name} не зарегистрирована в этом обработчике")
+    close_old_connections()
+    started = time.perf_counter()
+    try:
+        result = TASKS[task_name]['func'](**args)
+    finally:
+        close_old_connections()
+    try:
+        json.dumps(result)
+    except (TypeError, ValueError):
+        result = repr(result)
+    return result, int((time.perf_counter() - started) * 1000)
+
+
+def complete(job, result, duration_ms):
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=Job.DONE, finished_at=timezone.now(), duration_ms=duration_ms,
+        result=result, last_error='', lease_until=None,
+    )
+
+
+def fail(job, error):
+    now = timezone.now()
+    updates = {'last_error': str(error)[:2000], 'lease_until': None, 'locked_by': ''}
+    if job.attempts < job.max_attempts:
+        updates.update(status=Job.PENDING, run_at=now + backoff(job.attempts))
+    else:
+        updates.update(status=Job.FAILED, finished_at=now)
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(**updates)
+    return updates['status']
+
+
+def requeue_expired(now=None):
+    # Обработчик, взявший задание, пропал (упал процесс или машина) — аренда истекла
+    now = now or timezone.now()
+    expired = Job.objects.filter(status=Job.RUNNING, lease_until__lt=now)
+    failed = expired.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=now, last_error='Истекла аренда обработчика', lease_until=None,
+    )
+    retried = expired.update(
+        status=Job.PENDING, run_at=now, last_error='Истекла аренда обработчика', lease_until=None, locked_by='',
+    )
+    return retried, failed
+
+
+def sync_schedules(config=None):
+    """Переносит расписания из settings.JOB_SCHEDULES в таблицу, не сбрасывая следующий запуск без нужды."""
+    config = getattr(settings, 'JOB_SCHEDULES', {}) if config is None else config
+    for name, spec in config.items():
+        defaults = {'task': spec['task'], 'args': spec.get('args', {}), 'cron': spec['cron'],
+                    'enabled': spec.get('enabled', True)}
+        schedule, created = JobSchedule.objects.get_or_create(
+            name=name, defaults={**defaults, 'next_run_at': next_run(spec['cron'])},
+        )
+        if not created and any(getattr(schedule, key) != value for key, value in defaults.items()):
+            for key, value in defaults.items():
+                setattr(schedule, key, value)
+            schedule.next_run_at = next_run(schedule.cron)
+            schedule.save()
+
+
+def enqueue_due(now=None):
+    now = now or timezone.now()
+    enqueued = 0
+    with transaction.atomic():
+        for schedule in JobSchedule.objects.select_for_update(skip_locked=True).filter(enabled=True, next_run_at__lte=now):
+            # Пропущенные запуски схлопываются в один; не ставим новый, пока предыдущий не завершён
+            busy = Job.objects.filter(schedule=schedule.name, status__in=[Job.PENDING, Job.RUNNING]).exists()
+            if schedule.task in TASKS and not busy:
+                enqueue(schedule.task, schedule.args, schedule=schedule.name)
+                schedule.last_enqueued_at = now
+                enqueued += 1
+            schedule.next_run_at = next_run(schedule.cron, now)
+            schedule.save(update_fields=['next_run_at', 'last_enqueued_at'])
+    return enqueued
+
+
+JOB_METRICS_SQL = """
+    SELECT task,
+           count(*) FILTER (WHERE status = 'pending') AS pending,
+           count(*) FILTER (WHERE status = 'running') AS running,
+           count(*) FILTER (WHERE status = 'done') AS done,
+           count(*) FILTER (WHERE status = 'failed') AS failed,
+           avg(duration_ms) FILTER (WHERE status = 'done') AS avg_ms,
+           percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms) FILTER (WHERE status = 'done') AS p95_ms,
+           max(duration_ms) AS max_ms,
+           avg(extract(epoch FROM started_at - run_at) * 1000) FILTER (WHERE started_at IS NOT NULL) AS avg_wait_ms
+    FROM jobs
+    WHERE created_at >= %s
+    GROUP BY task
+    ORDER BY task
+"""
+
+
+def metrics(since=None):
+    since = since or timezone.now() - timedelta(days=1)
+    with connection.cursor() as cursor:
+        cursor.execute(JOB_METRICS_SQL, [since])
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+    return {
+        row[0]: {
+            column: round(float(value), 1) if value is not None and column.endswith('_ms') else value
+            for column, value in zip(columns[1:], row[1:])
+        }
+        for row in rows
+    }
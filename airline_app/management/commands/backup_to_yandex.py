@@ -3,8 +3,14 @@ import subprocess
 from datetime import datetime, timedelta
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
 import yadisk
 
+from airline_app.backups import (
+    exported_snapshot, manifest_path, pg_args, pg_env, table_row_counts, write_manifest,
+)
+
 
 class Command(BaseCommand):
     help = 'Создание бэкапа БД и отправка в Яндекс.Диск'
@@ -34,30 +40,28 @@ class Command(BaseCommand):
             filename = f'airline_db_{timestamp}.backup'
             filepath = os.path.join(backup_dir, filename)
 
-            cmd = [
-                'pg_dump',
-                '-h', db['HOST'],
-                '-U', db['USER'],
-                '-d', db['NAME'],
-                '-F', 'c',
-                '-f', filepath
-            ]
-
             self.stdout.write(f"Создаем бэкап: {filename}")
 
-            env = os.environ.copy()
-            env['PGPASSWORD'] = db['PASSWORD']
-
-            result = subprocess.run(
-                cmd,
-                env=env,
-                capture_output=True,
-                text=True
-            )
+            # pg_dump работает на экспортированном снимке: количество строк в манифесте
+            # считается в той же транзакции и точно совпадает с содержимым дампа
+            with transaction.atomic():
+                snapshot = exported_snapshot()
+                created_at = timezone.now()
+                cmd = ['pg_dump', *pg_args(), '--snapshot', snapshot, '-F', 'c', '-f', filepath]
+                result = subprocess.run(
+                    cmd,
+                    env=pg_env(),
+                    capture_output=True,
+                    text=True
+                )
+                if result.returncode == 0:
+                    with connection.cursor() as cursor:
+                        row_counts = table_row_counts(cursor)
 
             if result.returncode == 0:
+                write_manifest(filepath, db['NAME'], row_counts, created_at)
                 file_size = os.path.getsize(filepath) / 1024 / 1024  # в MB
-                self.stdout.write(f"Размер бэкапа: {file_size:.2f} MB")
+                self.stdout.write(f"Размер бэкапа: {file_size:.2f} MB, таблиц в манифесте: {len(row_counts)}")
                 return filepath
             else:
                 self.stdout.write(self.style.ERROR(f"Ошибка pg_dump: {result.stderr}"))
@@ -92,6 +96,8 @@ class Command(BaseCommand):
 
             self.stdout.write(f"Отправляем в Яндекс.Диск: {filename}")
             y.upload(filepath, remote_path)
+            # Манифест загружается после дампа: restore_backup не возьмёт недокачанную копию
+            y.upload(manifest_path(filepath), manifest_path(remote_path))
 
             self.stdout.write(self.style.SUCCESS(
                 f"Файл загружен в Яндекс.Диск: {remote_path}"
@@ -106,7 +112,7 @@ class Command(BaseCommand):
             cutoff_date = datetime.now() - timedelta(days=keep_days)
 
             for filename in os.listdir(backup_dir):
-                if filename.endswith('.backup'):
+                if filename.endswith(('.backup', '.manifest.json')):
                     filepath = os.path.join(backup_dir, filename)
                     file_time = datetime.fromtimestamp(os.path.getctime(filepath))
 
@@ -0,0 +1,84 @@
+import io
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный замер задержки и числа соединений с БД для дешёвого эндпоинта. '
+            'Запускайте с разными настройками, например DB_CONN_MAX_AGE=0, DB_CONN_MAX_AGE=60 и DB_POOL=1')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/api/airports/?term=mo')
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        db = settings.DATABASES['default']
+        mode = 'pool' if db.get('OPTIONS', {}).get('pool') else f"CONN_MAX_AGE={db['CONN_MAX_AGE']}"
+        self.stdout.write(f"Режим: {mode}, потоков: {options['threads']}, запросов: {options['requests']}")
+
+        # Обработчик как у WSGI-сервера: test.Client отключает close_old_connections,
+        # и соединения не закрывались бы и не возвращались в пул в конце запроса
+        handler = WSGIHandler()
+        url = urlsplit(options['url'])
+        latencies = []
+        connection_samples = []
+        stop = threading.Event()
+
+        def request(_):
+            environ = {'PATH_INFO': url.path, 'QUERY_STRING': url.query, 'HTTP_HOST': 'localhost',
+                       'wsgi.input': io.BytesIO()}
+            setup_testing_defaults(environ)
+            status = []
+            started = time.perf_counter()
+            response = handler(environ, lambda line, headers, exc_info=None: status.append(line))
+            try:
+                b''.join(response)
+            finally:
+                # close() отправляет request_finished, как сервер после отдачи ответа
+                response.close()
+            latencies.append(time.perf_counter() - started)
+            return int(status[0].split()[0])
+
+        def sample_connections():
+            while not stop.is_set():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()"
+                    )
+                    connection_samples.append(cursor.fetchone()[0])
+                time.sleep(0.1)
+            connection.close()
+
+        sampler = threading.Thread(target=sample_connections)
+        sampler.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            statuses = list(pool.map(request, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        sampler.join()
+        connections.close_all()
+
+        latencies.sort()
+        ms = [value * 1000 for value in latencies]
+        errors = sum(1 for status in statuses if status >= 400)
+        self.stdout.write(f"Пропускная способность: {len(ms) / elapsed:.0f} запросов/с, ошибок: {errors}")
+        self.stdout.write(
+            f"Задержка, мс: p50={statistics.median(ms):.1f} "
+            f"p95={ms[int(len(ms) * 0.95) - 1]:.1f} p99={ms[int(len(ms) * 0.99) - 1]:.1f} max={ms[-1]:.1f}"
+        )
+        if connection_samples:
+            self.stdout.write(
+                f"Соединений с БД: среднее {statistics.mean(connection_samples):.1f}, "
+                f"максимум {max(connection_samples)}"
+            )
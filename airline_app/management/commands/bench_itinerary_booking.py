@@ -0,0 +1,96 @@
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, IntegrityError
+from django.utils import timezone
+
+from airline_app.itinerary import ItineraryError, book_itinerary
+from airline_app.models import Booking, Flight, OutboxEvent
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный замер бронирования маршрутов из нескольких перелётов при конкуренции '
+            'за общие рейсы: пропускная способность, задержка, конфликты и deadlock')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pool', type=int, default=6, help='Сколько ближайших рейсов делят между собой брони')
+        parser.add_argument('--legs', type=int, default=2)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--bookings', type=int, default=500)
+        parser.add_argument('--fare-conditions', default='Economy')
+        parser.add_argument('--keep', action='store_true', help='Не удалять созданные брони')
+
+    def handle(self, *args, **options):
+        flights = list(
+            Flight.objects.filter(status__in=Flight.BOOKABLE_STATUSES, scheduled_departure__gt=timezone.now())
+            .order_by('scheduled_departure')[:options['pool']]
+        )
+        itineraries = self.itineraries(flights, options['legs'])
+        if not itineraries:
+            raise CommandError('Не найдено рейсов, из которых можно собрать маршрут')
+        self.stdout.write(f"Рейсов в пуле: {len(flights)}, вариантов маршрута: {len(itineraries)}, "
+                          f"потоков: {options['threads']}, броней: {options['bookings']}")
+
+        user = User.objects.filter(is_superuser=True).first()
+        created = []
+        latencies = []
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def book(i):
+            legs = random.choice(itineraries)
+            started = time.perf_counter()
+            outcome = 'ok'
+            try:
+                booking = book_itinerary(user, 'BENCH PASSENGER', f'BENCH{i:06d}', [
+                    {'flight_id': flight.flight_id, 'fare_conditions': options['fare_conditions']}
+                    for flight in legs
+                ])
+                created.append(booking.book_ref)
+            except ItineraryError:
+                outcome = 'no_seats'
+            except IntegrityError:
+                outcome = 'conflict'
+            except DatabaseError as e:
+                outcome = 'deadlock' if 'deadlock' in str(e) else 'db_error'
+            latencies.append(time.perf_counter() - started)
+            with lock:
+                outcomes[outcome] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            list(pool.map(book, range(options['bookings'])))
+        elapsed = time.perf_counter() - started
+
+        ms = sorted(value * 1000 for value in latencies)
+        self.stdout.write(f"Пропускная способность: {outcomes['ok'] / elapsed:.1f} броней/с")
+        self.stdout.write(
+            f"Задержка, мс: p50={statistics.median(ms):.1f} "
+            f"p95={ms[int(len(ms) * 0.95) - 1]:.1f} max={ms[-1]:.1f}"
+        )
+        self.stdout.write('Итоги: ' + ', '.join(f'{key}={value}' for key, value in sorted(outcomes.items())))
+
+        if created and not options['keep']:
+            Booking.objects.filter(book_ref__in=created).delete()
+            OutboxEvent.objects.filter(aggregate_type='booking', aggregate_id__in=created,
+                                       dispatched_at__isnull=True).delete()
+            self.stdout.write(f'Удалено тестовых броней: {len(created)}')
+
+        if outcomes['deadlock']:
+            self.stdout.write(self.style.ERROR(f"Обнаружены deadlock: {outcomes['deadlock']}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('Deadlock не обнаружено'))
+
+    def itineraries(self, flights, legs):
+        # Маршруты собираются так, чтобы каждый следующий рейс вылетал после прилёта предыдущего
+        chains = [[flight] for flight in flights]
+        for _ in range(legs - 1):
+            chains = [chain + [flight] for chain in chains for flight in flights
+                      if flight.scheduled_departure > chain[-1].scheduled_arrival]
+        return chains
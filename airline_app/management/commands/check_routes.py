@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from airline_app.geo import build_distance_matrix, check_routes
+
+
+class Command(BaseCommand):
+    help = 'Проверка маршрутов: дальность самолёта и длительность полёта по расстоянию'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Пересчитать матрицу расстояний')
+        parser.add_argument('--tolerance', type=float, default=None,
+                            help='Допустимое отклонение длительности (доля, по умолчанию 0.35)')
+        parser.add_argument('--strict', action='store_true',
+                            help='Завершиться с ошибкой, если найдены проблемы')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            distances = build_distance_matrix()
+            self.stdout.write(f"Матрица расстояний пересчитана: {len(distances.codes)} аэропортов")
+
+        kwargs = {}
+        if options['tolerance'] is not None:
+            kwargs['tolerance'] = options['tolerance']
+        issues = check_routes(**kwargs)
+
+        for route_no, kind, message in issues:
+            style = self.style.ERROR if kind == 'range' else self.style.WARNING
+            self.stdout.write(style(f"{route_no}: {message}"))
+
+        if not issues:
+            self.stdout.write(self.style.SUCCESS("Проблем с маршрутами не найдено"))
+        elif options['strict']:
+            raise CommandError(f"Найдено проблем: {len(issues)}")
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from airline_app.outbox import dispatch_batch, load_sinks
+
+
+class Command(BaseCommand):
+    help = 'Доставка событий из outbox во внешние приёмники пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=100, help='Событий в пачке')
+        parser.add_argument('--poll', type=float, default=1.0, help='Пауза, когда очередь пуста, сек')
+        parser.add_argument('--once', action='store_true', help='Разобрать очередь и завершиться')
+
+    def handle(self, *args, **options):
+        sinks = load_sinks()
+        total = failed_total = 0
+        while True:
+            sent, failed = dispatch_batch(sinks, options['batch'])
+            total += sent
+            failed_total += failed
+            if failed:
+                self.stdout.write(self.style.WARNING(f"Не доставлено {failed} событий, повтор позже"))
+            if not sent:
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
+
+        self.stdout.write(self.style.SUCCESS(f"Доставлено событий: {total}, ошибок доставки: {failed_total}"))
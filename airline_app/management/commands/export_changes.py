@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from airline_app.changefeed import ENTITIES, INITIAL_CURSOR, CursorError, ndjson_stream, parse_cursor
+
+
+class Command(BaseCommand):
+    help = ('Инкрементальная выгрузка изменений рейсов, бронирований, платежей и посадочных талонов '
+            'в NDJSON начиная с курсора. С --state-file курсор сохраняется между запусками')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help=f'Курсор xid:seq (по умолчанию {INITIAL_CURSOR} — всё с начала)')
+        parser.add_argument('--state-file', help='Файл, где хранится курсор последней выгрузки')
+        parser.add_argument('--output', help='Файл NDJSON (по умолчанию stdout)')
+        parser.add_argument('--entities', default=','.join(ENTITIES), help='Через запятую')
+        parser.add_argument('--limit', type=int, default=None, help='Не больше N изменений за запуск')
+        parser.add_argument('--batch', type=int, default=5000, help='Строк за один запрос к БД')
+
+    def handle(self, *args, **options):
+        entities = [e for e in options['entities'].split(',') if e]
+        unknown = set(entities) - set(ENTITIES)
+        if unknown:
+            raise CommandError(f"Неизвестные сущности: {', '.join(sorted(unknown))}")
+
+        since = options['since']
+        if since is None and options['state_file'] and os.path.exists(options['state_file']):
+            with open(options['state_file'], encoding='utf-8') as fh:
+                since = fh.read().strip()
+        try:
+            parse_cursor(since)
+        except CursorError as e:
+            raise CommandError(str(e))
+
+        out = open(options['output'], 'w', encoding='utf-8') if options['output'] else sys.stdout
+        summary = None
+        try:
+            for chunk in ndjson_stream(since, entities, options['limit'], options['batch']):
+                out.write(chunk)
+                summary = chunk
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        # Последняя строка потока — итог с курсором для следующего запуска
+        summary = json.loads(summary.splitlines()[-1])
+        if options['state_file']:
+            tmp = options['state_file'] + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                fh.write(summary['cursor'])
+            os.replace(tmp, options['state_file'])
+        self.stderr.write(self.style.SUCCESS(
+            f"Изменений: {summary['count']}, курсор: {summary['cursor']}"
+            + (' (есть ещё, запустите повторно)' if summary['has_more'] else '')
+        ))
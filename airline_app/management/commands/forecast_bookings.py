@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from airline_app.forecasting import refresh_forecasts
+
+
+class Command(BaseCommand):
+    help = ('Кривые бронирований маршрутов по классам и прогноз загрузки открытых рейсов. '
+            'По умолчанию пересчитываются только рейсы с новыми продажами')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Пересчитать кривые и прогнозы всех открытых рейсов')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = refresh_forecasts(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Кривых пересчитано: {stats['curves']}, прогнозов рейсов: {stats['flights']} "
+            f"из {stats['open_flights']} открытых за {time.perf_counter() - started:.1f} с"
+        ))
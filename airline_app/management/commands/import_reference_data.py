@@ -0,0 +1,282 @@
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from airline_app import httpcache
+from airline_app.geo import invalidate_distance_matrix
+from airline_app.models import Airplane, Airport, Seat, Route
+from airline_app.seatmap import invalidate_layout
+
+# Уровни зависимостей по внешним ключам: таблицы одного уровня грузятся параллельно
+LEVELS = [
+    [Airport, Airplane],
+    [Seat, Route],
+]
+
+CONFLICT_TARGETS = {
+    Seat: ('airplane_id', 'seat_no'),
+}
+
+EXTENSIONS = ('.csv', '.csv.gz', '.json', '.ndjson', '.ndjson.gz')
+CHUNK_ROWS = 2000
+PROGRESS_EVERY = 100000
+
+
+def column_aliases(model):
+    # Имя поля, attname, колонка и имя ключа целевой таблицы (airplane_code) -> колонка
+    aliases = {}
+    for field in model._meta.concrete_fields:
+        if field.generated:
+            continue  # генерируемые колонки (city_ru и т.п.) PostgreSQL заполняет сам
+        aliases[field.name] = aliases[field.attname] = aliases[field.column] = field.column
+        if field.is_relation:
+            aliases.setdefault(field.target_field.name, field.column)
+    return aliases
+
+
+def array_columns(model):
+    return {field.column for field in model._meta.concrete_fields if field.get_internal_type() == 'ArrayField'}
+
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_records(path):
+    """(заголовки, итератор строк-списков) из CSV, JSON-массива или NDJSON."""
+    fh = _open_text(path)
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.csv'):
+        reader = csv.reader(fh)
+        return next(reader), reader
+
+    if name.endswith('.ndjson'):
+        records = (json.loads(line) for line in fh if line.strip())
+    else:
+        records = iter(json.load(fh))
+    first = next(records, None)
+    if first is None:
+        return [], iter(())
+    headers = list(first)
+
+    def rows():
+        yield [first.get(h) for h in headers]
+        for record in records:
+            yield [record.get(h) for h in headers]
+    return headers, rows()
+
+
+def to_copy_value(value, is_array):
+    if value is None:
+        return None
+    if is_array and isinstance(value, list):
+        return '{' + ','.join(str(v) for v in value) + '}'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def csv_chunks(rows, array_flags, counter):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([to_copy_value(v, flag) for v, flag in zip(row, array_flags)])
+        counter[0] += 1
+        if counter[0] % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class ChunkStream(io.RawIOBase):
+    """Файлоподобная обёртка над генератором строк для copy_expert (psycopg2)."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.pending = chunk.encode('utf-8')
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+def copy_from_chunks(cursor, sql, chunks):
+    if hasattr(cursor, 'copy_expert'):
+        cursor.copy_expert(sql, io.BufferedReader(ChunkStream(chunks)))
+    else:
+        with cursor.copy(sql) as copy:
+            for chunk in chunks:
+                copy.write(chunk)
+
+
+class Command(BaseCommand):
+    help = 'Быстрая загрузка справочников (аэропорты, самолёты, места, маршруты) через COPY'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Каталог с файлами <таблица>.csv / .json / .ndjson (можно .gz)')
+        parser.add_argument('--upsert', action='store_true', help='Обновлять существующие строки')
+        parser.add_argument('--workers', type=int, default=2, help='Параллельная загрузка таблиц одного уровня')
+        parser.add_argument('--keep-indexes', action='store_true',
+                            help='Не удалять вторичные индексы на время загрузки')
+
+    def handle(self, *args, **options):
+        directory = options['path']
+        if not os.path.isdir(directory):
+            raise CommandError(f"Каталог не найден: {directory}")
+
+        plan = [[(model, self.find_file(directory, model._meta.db_table)) for model in level]
+                for level in LEVELS]
+        plan = [[(model, path) for model, path in level if path] for level in plan]
+        if not any(plan):
+            raise CommandError("Не найдено ни одного файла для загрузки")
+
+        tables = [model._meta.db_table for level in plan for model, _ in level]
+        dropped = [] if options['keep_indexes'] else self.drop_secondary_indexes(tables)
+
+        started = time.perf_counter()
+        try:
+            for level in plan:
+                with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                    futures = [pool.submit(self.load_table, model, path, options['upsert'])
+                               for model, path in level]
+                    for future in futures:
+                        future.result()
+        finally:
+            self.recreate_indexes(dropped)
+
+        with connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute(f'ANALYZE "{table}"')
+        self.invalidate_caches(tables)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Загрузка завершена за {time.perf_counter() - started:.1f} с"
+        ))
+
+    def invalidate_caches(self, tables):
+        # COPY не вызывает сигналы моделей, поэтому кэши сбрасываются вручную
+        httpcache.bump(httpcache.AIRPORTS, httpcache.FLIGHTS, httpcache.SEATS)
+        if Airport._meta.db_table in tables:
+            invalidate_distance_matrix()
+        if Seat._meta.db_table in tables:
+            for airplane_code in Airplane.objects.values_list('airplane_code', flat=True):
+                invalidate_layout(airplane_code)
+
+    def find_file(self, directory, table):
+        for extension in EXTENSIONS:
+            path = os.path.join(directory, table + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def drop_secondary_indexes(self, tables):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT i.indexname, i.indexdef
+                FROM pg_indexes i
+                WHERE i.schemaname = current_schema()
+                  AND i.tablename = ANY(%s)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM pg_constraint c
+                      WHERE c.conindid = (quote_ident(i.schemaname) || '.' || quote_ident(i.indexname))::regclass
+                  )
+            """, [tables])
+            indexes = cursor.fetchall()
+            for name, _ in indexes:
+                cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+        if indexes:
+            self.stdout.write(f"Вторичные индексы отключены на время загрузки: {len(indexes)}")
+        return indexes
+
+    def recreate_indexes(self, indexes):
+        if not indexes:
+            return
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            for _, definition in indexes:
+                cursor.execute(definition)
+        self.stdout.write(f"Индексы пересозданы: {len(indexes)} за {time.perf_counter() - started:.1f} с")
+
+    def load_table(self, model, path, upsert):
+        table = model._meta.db_table
+        aliases = column_aliases(model)
+        arrays = array_columns(model)
+        headers, rows = read_records(path)
+
+        try:
+            columns = [aliases[h] for h in headers]
+        except KeyError as e:
+            raise CommandError(f"{os.path.basename(path)}: неизвестная колонка {e}")
+        column_list = ', '.join(f'"{c}"' for c in columns)
+        counter = [0]
+        chunks = csv_chunks(rows, [c in arrays for c in columns], counter)
+
+        self.stdout.write(f"{table}: загрузка из {os.path.basename(path)}")
+        started = time.perf_counter()
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                target = table
+                if upsert:
+                    target = f'_import_{table}'
+                    cursor.execute(
+                        f'CREATE TEMP TABLE "{target}" (LIKE "{table}" INCLUDING DEFAULTS) ON COMMIT DROP'
+                    )
+                    pk = model._meta.pk.column
+                    if pk not in columns:
+                        # Ключ без колонки в файле (seats.id) выдаст основная таблица при вставке
+                        cursor.execute(f'ALTER TABLE "{target}" ALTER COLUMN "{pk}" DROP NOT NULL')
+                copy_from_chunks(
+                    cursor,
+                    f'COPY "{target}" ({column_list}) FROM STDIN WITH (FORMAT csv)',
+                    self.with_progress(table, chunks, counter),
+                )
+                if upsert:
+                    self.merge(cursor, model, table, target, columns)
+        finally:
+            connections['default'].close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{table}: {counter[0]} строк за {elapsed:.1f} с ({counter[0] / max(elapsed, 1e-6):.0f} строк/с)"
+        ))
+
+    def with_progress(self, table, chunks, counter):
+        reported = 0
+        for chunk in chunks:
+            yield chunk
+            if counter[0] - reported >= PROGRESS_EVERY:
+                reported = counter[0]
+                self.stdout.write(f"{table}: {reported} строк...")
+
+    def merge(self, cursor, model, table, staging, columns):
+        conflict = CONFLICT_TARGETS.get(model, (model._meta.pk.column,))
+        column_list = ', '.join(f'"{c}"' for c in columns)
+        # Первичный ключ существующей строки не меняется: на него ссылаются другие таблицы
+        keep = set(conflict) | {model._meta.pk.column}
+        updates = ', '.join(f'"{c}" = EXCLUDED."{c}"' for c in columns if c not in keep)
+        action = f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'
+        cursor.execute(
+            f'INSERT INTO "{table}" ({column_list}) SELECT {column_list} FROM "{staging}" '
+            f'ON CONFLICT ({", ".join(conflict)}) {action}'
+        )
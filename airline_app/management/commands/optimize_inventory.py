@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from airline_app.inventory import optimize_inventory
+
+
+class Command(BaseCommand):
+    help = ('Разрешённая ёмкость с перебронированием по исторической неявке и лимиты '
+            'тарифных корзин для всех открытых рейсов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true',
+                            help='Пересчитать проданные места по сегментам (запускать, когда нет продаж)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = optimize_inventory(recount=options['recount'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Рейсов: {stats['flights']}, квот классов: {stats['classes']}, "
+            f"с перебронированием: {stats['overbooked']} за {time.perf_counter() - started:.1f} с"
+        ))
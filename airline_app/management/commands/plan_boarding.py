@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from airline_app.boarding import BACK_TO_FRONT, STRATEGIES, plan_boarding
+from airline_app.models import Flight
+
+
+class Command(BaseCommand):
+    help = 'Назначение номеров и групп посадки для рейсов, у которых закрывается регистрация'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flight', type=int, action='append', dest='flights',
+                            help='ID рейса (можно несколько раз); по умолчанию — рейсы в окне закрытия регистрации')
+        parser.add_argument('--minutes-ahead', type=int, default=60,
+                            help='Окно до вылета, в котором регистрация считается закрытой')
+        parser.add_argument('--strategy', choices=STRATEGIES, default=BACK_TO_FRONT)
+        parser.add_argument('--chunk', type=int, default=500, help='Рейсов за одну пачку')
+
+    def handle(self, *args, **options):
+        if options['flights']:
+            flights = Flight.objects.filter(pk__in=options['flights'])
+        else:
+            now = timezone.now()
+            flights = Flight.objects.filter(
+                scheduled_departure__range=(now, now + timedelta(minutes=options['minutes_ahead'])),
+                status__in=[Flight.SCHEDULED, Flight.ON_TIME, Flight.DELAYED],
+            )
+
+        flight_ids = list(flights.order_by('pk').values_list('pk', flat=True))
+        updated = 0
+        for start in range(0, len(flight_ids), options['chunk']):
+            updated += plan_boarding(flight_ids[start:start + options['chunk']], options['strategy'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Рейсов: {len(flight_ids)}, посадочных талонов обновлено: {updated}"
+        ))
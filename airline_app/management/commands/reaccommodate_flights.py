@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from airline_app.disruption import reaccommodate
+from airline_app.models import Flight
+
+
+class Command(BaseCommand):
+    help = ('Анализ последствий отмены/задержки рейса или замены самолёта на маршруте и пакетная '
+            'пересадка пассажиров. Без --apply только показывает план')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flight', type=int, action='append', dest='flights', default=[],
+                            help='ID рейса (можно несколько раз)')
+        parser.add_argument('--route', help='Все будущие рейсы маршрута (после замены самолёта)')
+        parser.add_argument('--delay', type=int, default=None, help='Ожидаемая задержка, минут')
+        parser.add_argument('--apply', action='store_true', help='Применить план')
+
+    def handle(self, *args, **options):
+        flights = Flight.objects.select_related('route')
+        if options['route']:
+            flights = flights.filter(route_id=options['route'], scheduled_departure__gt=timezone.now())
+        elif options['flights']:
+            flights = flights.filter(pk__in=options['flights'])
+        else:
+            raise CommandError('Укажите --flight или --route')
+
+        delay = timedelta(minutes=options['delay']) if options['delay'] else None
+        total_moves = total_unplaced = 0
+        for flight in flights.order_by('scheduled_departure'):
+            plan = reaccommodate(flight, delay=delay, apply=options['apply'])
+            impact = plan['impact']
+            self.stdout.write(
+                f"Рейс {flight.pk} {flight.route_id} ({flight.get_status_display()}): "
+                f"сегментов {len(impact['segments'])}, стыковок под угрозой {len(impact['broken_connections'])}, "
+                f"мест не из схемы самолёта {len(impact['invalid_passes'])}"
+            )
+            for move in plan['moves']:
+                seat = f"место {move['seat'].seat_no}" if move['seat'] is not None else 'место при регистрации'
+                self.stdout.write(
+                    f"  {move['segment'].ticket_id}: рейс {move['from_flight_id']} → {move['flight'].pk} "
+                    f"({move['flight'].scheduled_departure:%d.%m %H:%M}), {seat}"
+                )
+            for request in plan['unplaced']:
+                self.stdout.write(self.style.WARNING(
+                    f"  бронь {request['book_ref']}: {len(request['segments'])} пасс. класса "
+                    f"{request['fare_conditions']} — нет подходящего рейса, нужна ручная обработка"
+                ))
+            total_moves += len(plan['moves'])
+            total_unplaced += len(plan['unplaced'])
+
+        message = f"Перемещений: {total_moves}, групп без решения: {total_unplaced}"
+        if options['apply']:
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stdout.write(message + ' (пробный прогон, добавьте --apply)')
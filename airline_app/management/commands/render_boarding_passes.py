@@ -0,0 +1,32 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+
+from airline_app.boarding_docs import render_flight_manifest
+from airline_app.models import Flight
+
+
+class Command(BaseCommand):
+    help = 'Печатный комплект посадочных талонов рейса (HTML) для выхода на посадку'
+
+    def add_arguments(self, parser):
+        parser.add_argument('flight_ids', nargs='+', type=int)
+        parser.add_argument('--out', default='boarding_passes', help='Каталог для файлов')
+
+    def handle(self, *args, **options):
+        os.makedirs(options['out'], exist_ok=True)
+        for flight_id in options['flight_ids']:
+            flight = Flight.objects.select_related('route').filter(pk=flight_id).first()
+            if flight is None:
+                raise CommandError(f"Рейс {flight_id} не найден")
+
+            docs = render_flight_manifest(flight_id)
+            html = render_to_string('boarding_passes.html', {
+                'title': f'Посадочные талоны рейса {flight.route.route_no} ({flight.scheduled_departure:%d.%m.%Y})',
+                'docs': docs,
+            })
+            path = os.path.join(options['out'], f'flight_{flight_id}.html')
+            with open(path, 'w', encoding='utf-8') as fh:
+                fh.write(html)
+            self.stdout.write(self.style.SUCCESS(f"{path}: талонов {len(docs)}"))
@@ -0,0 +1,101 @@
+import os
+import subprocess
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from airline_app.backups import (
+    backup_storage, file_sha256, manifest_path, pg_args, pg_env, pg_server_args, read_manifest,
+    scratch_row_counts, verified_backups,
+)
+
+
+class Command(BaseCommand):
+    help = ('Учебное восстановление: скачивает бэкап, проверяет контрольную сумму, параллельно '
+            'восстанавливает его в отдельную базу через pg_restore -j и сверяет число строк с манифестом')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backup', help='Имя файла .backup (по умолчанию — последний с манифестом)')
+        parser.add_argument('--source', choices=['local', 'yandex'],
+                            help='Откуда брать бэкап (по умолчанию Яндекс.Диск, если задан токен)')
+        parser.add_argument('--jobs', type=int, default=os.cpu_count() or 4, help='Параллельность pg_restore')
+        parser.add_argument('--target-db', help='База для восстановления (по умолчанию <имя базы>_restore)')
+        parser.add_argument('--keep', action='store_true', help='Не удалять базу после проверки')
+
+    def handle(self, *args, **options):
+        db_name = settings.DATABASES['default']['NAME']
+        target = options['target_db'] or f'{db_name}_restore'
+        if target == db_name:
+            raise CommandError('Нельзя восстанавливать поверх рабочей базы')
+
+        storage = backup_storage(options['source'])
+        verified = verified_backups(storage)
+        name = options['backup']
+        if name is None:
+            if not verified:
+                raise CommandError('Бэкапы с манифестом не найдены')
+            name = verified[-1]
+        elif name not in verified:
+            raise CommandError(f'Бэкап {name} не найден или у него нет манифеста')
+
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory() as workdir:
+            self.stdout.write(f"Загружаем {name}...")
+            path = storage.fetch(name, workdir)
+            manifest = read_manifest(storage.fetch(manifest_path(name), workdir))
+            fetched = time.perf_counter()
+
+            if os.path.getsize(path) != manifest['size'] or file_sha256(path) != manifest['sha256']:
+                raise CommandError(f'Контрольная сумма {name} не совпадает с манифестом')
+            verified = time.perf_counter()
+            self.stdout.write(f"Контрольная сумма совпадает (SHA-256 {manifest['sha256'][:16]}…)")
+
+            self.pg('dropdb', '--if-exists', target)
+            self.pg('createdb', target)
+            try:
+                self.stdout.write(f"pg_restore -j {options['jobs']} → {target}")
+                self.pg('pg_restore', '-j', str(options['jobs']), '--no-owner', '--exit-on-error',
+                        *pg_args(target), path, maintenance=False)
+                restored = time.perf_counter()
+
+                actual = scratch_row_counts(target)
+                mismatches = [
+                    (table, expected, actual.get(table))
+                    for table, expected in manifest['tables'].items()
+                    if actual.get(table) != expected
+                ]
+                checked = time.perf_counter()
+            finally:
+                if not options['keep']:
+                    self.pg('dropdb', '--if-exists', target)
+
+        size_mb = manifest['size'] / 1024 / 1024
+        rows = sum(manifest['tables'].values())
+        restore_seconds = restored - verified
+        self.stdout.write(
+            f"Загрузка: {fetched - started:.1f} с, проверка суммы: {verified - fetched:.1f} с, "
+            f"pg_restore: {restore_seconds:.1f} с, сверка строк: {checked - restored:.1f} с"
+        )
+        self.stdout.write(
+            f"Пропускная способность восстановления: {size_mb / restore_seconds:.1f} MB/с, "
+            f"{rows / restore_seconds:.0f} строк/с ({size_mb:.1f} MB, {rows} строк)"
+        )
+        self.stdout.write(f"Время восстановления (RTO) от загрузки до проверки: {checked - started:.1f} с")
+
+        for table, expected, found in mismatches:
+            self.stdout.write(self.style.ERROR(f"  {table}: в манифесте {expected}, восстановлено {found}"))
+        if mismatches:
+            raise CommandError(f'Расхождения в {len(mismatches)} таблицах')
+        self.stdout.write(self.style.SUCCESS(
+            f"Бэкап от {manifest['created_at']} восстановлен и проверен: {len(manifest['tables'])} таблиц"
+        ))
+
+    def pg(self, program, *args, maintenance=True):
+        # dropdb/createdb подключаются к служебной базе postgres
+        if maintenance:
+            args = [*pg_server_args(), '--maintenance-db', 'postgres', *args]
+        result = subprocess.run([program, *args], env=pg_env(), capture_output=True, text=True)
+        if result.returncode != 0:
+            raise CommandError(f'Ошибка {program}: {result.stderr.strip()}')
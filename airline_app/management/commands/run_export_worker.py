@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.utils import timezone
+
+from airline_app.exports import run_export_job
+from airline_app.models import ExportJob
+from airline_app.workers import process_pool
+
+
+class Command(BaseCommand):
+    help = 'Фоновый обработчик заданий экспорта (пул процессов)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Количество процессов')
+        parser.add_argument('--poll', type=float, default=2.0, help='Интервал опроса очереди, сек')
+        parser.add_argument('--once', action='store_true', help='Обработать очередь и завершиться')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        self.running = {}
+
+        with process_pool(workers) as pool:
+            self.stdout.write(f"Обработчик экспорта запущен, процессов: {workers}")
+            while True:
+                for job in self.claim_jobs(workers - len(self.running)):
+                    self.stdout.write(f"Задание #{job.pk}: {job.dataset}.{job.file_format}")
+                    future = pool.submit(run_export_job, job.pk)
+                    self.running[future] = job.pk
+                    future.add_done_callback(self.on_done)
+
+                if options['once'] and not self.running and not self.has_pending():
+                    break
+                time.sleep(options['poll'])
+
+        self.stdout.write(self.style.SUCCESS("Обработчик экспорта остановлен"))
+
+    def claim_jobs(self, limit):
+        if limit <= 0:
+            return []
+        with transaction.atomic():
+            jobs = list(
+                ExportJob.objects.select_for_update(skip_locked=True)
+                .filter(status=ExportJob.PENDING)
+                .order_by('created_at')[:limit]
+            )
+            ExportJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=ExportJob.RUNNING, started_at=timezone.now()
+            )
+        return jobs
+
+    def has_pending(self):
+        return ExportJob.objects.filter(status=ExportJob.PENDING).exists()
+
+    def on_done(self, future):
+        job_id = self.running.pop(future)
+        error = future.exception()
+        if error is not None:
+            # Процесс упал до того, как успел записать статус сам
+            ExportJob.objects.filter(pk=job_id).update(
+                status=ExportJob.FAILED, error=str(error), finished_at=timezone.now()
+            )
+            connections.close_all()
+            self.stdout.write(self.style.ERROR(f"Задание #{job_id}: {error}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Задание #{job_id} завершено"))
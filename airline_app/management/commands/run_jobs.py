@@ -0,0 +1,87 @@
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from airline_app import jobs
+from airline_app.workers import process_pool
+
+
+class Command(BaseCommand):
+    help = ('Обработчик фоновых задач из таблицы jobs: расписания, повторы, метрики. '
+            'Можно запускать несколько экземпляров на разных машинах')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Размер пула потоков')
+        parser.add_argument('--processes', type=int, default=0,
+                            help='Пул процессов вместо потоков (для тяжёлых задач на CPU)')
+        parser.add_argument('--poll', type=float, default=1.0, help='Интервал опроса очереди, сек')
+        parser.add_argument('--no-scheduler', action='store_true', help='Не ставить задачи по расписанию')
+        parser.add_argument('--once', action='store_true', help='Обработать очередь и завершиться')
+        parser.add_argument('--stats', action='store_true', help='Показать метрики задач за сутки и выйти')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            return self.print_stats()
+
+        size = options['processes'] or options['threads']
+        pool = process_pool(size) if options['processes'] else ThreadPoolExecutor(max_workers=size)
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        scheduler = not options['no_scheduler']
+        if scheduler:
+            jobs.sync_schedules()
+
+        kind = 'процессов' if options['processes'] else 'потоков'
+        self.stdout.write(f"Обработчик {worker_id} запущен, {kind}: {size}")
+        running = {}
+        try:
+            while True:
+                if scheduler:
+                    jobs.enqueue_due()
+                jobs.requeue_expired()
+
+                claimed = jobs.claim(worker_id, size - len(running))
+                for job in claimed:
+                    running[pool.submit(jobs.execute, job.task, job.args)] = job
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+                done, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.finish(running.pop(future), future)
+        except KeyboardInterrupt:
+            self.stdout.write("Остановка: ждём завершения выполняемых задач...")
+        finally:
+            for future in list(running):
+                try:
+                    future.result()
+                except Exception:
+                    pass
+                self.finish(running.pop(future), future)
+            pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f"Обработчик {worker_id} остановлен"))
+
+    def finish(self, job, future):
+        error = future.exception()
+        if error is None:
+            result, duration_ms = future.result()
+            jobs.complete(job, result, duration_ms)
+            self.stdout.write(self.style.SUCCESS(f"#{job.pk} {job.task}: готово за {duration_ms} мс"))
+        else:
+            status = jobs.fail(job, error)
+            style = self.style.WARNING if status == job.PENDING else self.style.ERROR
+            self.stdout.write(style(f"#{job.pk} {job.task} (попытка {job.attempts}/{job.max_attempts}): {error}"))
+
+    def print_stats(self):
+        for task_name, row in jobs.metrics().items():
+            self.stdout.write(
+                f"{task_name}: в очереди {row['pending']}, выполняется {row['running']}, "
+                f"готово {row['done']}, ошибок {row['failed']}, "
+                f"среднее {row['avg_ms']} мс, p95 {row['p95_ms']} мс, ожидание {row['avg_wait_ms']} мс"
+            )
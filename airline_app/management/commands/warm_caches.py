@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from airline_app.warmup import hot_targets, warm_caches
+
+
+class Command(BaseCommand):
+    help = ('Прогрев кэшей поиска, схем мест и календаря цен для самых востребованных направлений '
+            '(по статистике поиска и бронированиям за неделю)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=None, help='Сколько направлений прогревать (WARMUP_TOP_N)')
+        parser.add_argument('--threads', type=int, default=None, help='Потоков прогрева (WARMUP_THREADS)')
+        parser.add_argument('--list', action='store_true', help='Только показать направления, без прогрева')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for departure, arrival, day in hot_targets(options['top'] or 50):
+                self.stdout.write(f"{','.join(departure)} → {','.join(arrival)} {day.isoformat()}")
+            return
+
+        if not getattr(settings, 'SHARED_CACHE', False):
+            self.stdout.write(self.style.WARNING(
+                'Кэш не общий (CACHE_URL): прогрев заполнит только память этой команды, веб-воркерам он не поможет'
+            ))
+        stats = warm_caches(top_n=options['top'], threads=options['threads'])
+        if stats['skipped']:
+            self.stdout.write(self.style.WARNING('Прогрев уже выполняется в другом процессе'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Прогрето направлений: {stats['targets']}, рейсов: {stats['flights']}, "
+            f"аэропортов в индексе: {stats['airports']} за {stats['seconds']} с"
+        ))
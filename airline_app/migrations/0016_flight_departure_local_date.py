@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline_app', '0015_alter_payment_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='departure_local_date',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Дата вылета (местная)'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE flights f
+                SET departure_local_date = (f.scheduled_departure AT TIME ZONE a.timezone)::date
+                FROM routes r
+                JOIN airports_data a ON a.airport_code = r.departure_airport_id
+                WHERE r.route_no = f.route_no
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['route', 'departure_local_date'], name='flights_route_local_date_idx'),
+        ),
+    ]
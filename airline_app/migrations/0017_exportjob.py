@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline_app', '0016_flight_departure_local_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dataset', models.CharField(choices=[('flights', 'Рейсы'), ('bookings', 'Бронирования'), ('payments', 'Платежи')], max_length=20, verbose_name='Набор данных')),
+                ('file_format', models.CharField(choices=[('csv', 'CSV'), ('ndjson', 'NDJSON')], default='csv', max_length=10, verbose_name='Формат')),
+                ('compress', models.BooleanField(default=False, verbose_name='Сжатие gzip')),
+                ('filters', models.JSONField(blank=True, default=dict, verbose_name='Фильтры')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('rows_total', models.BigIntegerField(blank=True, null=True, verbose_name='Всего строк')),
+                ('rows_written', models.BigIntegerField(default=0, verbose_name='Записано строк')),
+                ('file_path', models.CharField(blank=True, max_length=255, verbose_name='Файл')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начало')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Окончание')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Задание экспорта',
+                'verbose_name_plural': 'Задания экспорта',
+                'db_table': 'export_jobs',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='export_jobs_status_idx')],
+            },
+        ),
+    ]
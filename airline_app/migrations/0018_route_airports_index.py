@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline_app', '0017_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='route',
+            index=models.Index(fields=['departure_airport', 'arrival_airport'], name='routes_dep_arr_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline_app', '0018_route_airports_index'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='boardingpass',
+            constraint=models.UniqueConstraint(fields=('flight', 'seat'), name='boarding_passes_flight_seat_uniq'),
+        ),
+    ]
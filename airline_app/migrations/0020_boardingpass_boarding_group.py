@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:54
+
+import django.db.models.constraints
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline_app', '0019_boardingpass_flight_seat_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boardingpass',
+            name='boarding_group',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        # Старые случайные номера посадки могли совпадать: сбрасываем дубликаты до пересчёта планировщиком
+        migrations.RunSQL(
+            sql="""
+                UPDATE boarding_passes SET boarding_no = NULL
+                WHERE (flight_id, boarding_no) IN (
+                    SELECT flight_id, boarding_no FROM boarding_passes
+                    WHERE boarding_no IS NOT NULL
+                    GROUP BY flight_id, boarding_no HAVING count(*) > 1
+                )
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='boardingpass',
+            constraint=models.UniqueConstraint(deferrable=django.db.models.constraints.Deferrable['DEFERRED'], fields=('flight', 'boarding_no'), name='boarding_passes_flight_no_uniq'),
+        ),
+    ]
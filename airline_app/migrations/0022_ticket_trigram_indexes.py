@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:01
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY не блокирует запись в tickets, но не работает внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ('airline_app', '0021_outboxevent'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='ticket',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['passenger_name'], name='tickets_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='ticket',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['passenger_id'], name='tickets_doc_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='ticket',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['ticket_no'], name='tickets_no_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='ticket',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['booking'], name='tickets_book_ref_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline_app', '0022_ticket_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Название')),
+                ('task', models.CharField(max_length=100, verbose_name='Задача')),
+                ('args', models.JSONField(blank=True, default=dict, verbose_name='Параметры')),
+                ('cron', models.CharField(max_length=100, verbose_name='Расписание (cron)')),
+                ('enabled', models.BooleanField(default=True, verbose_name='Включено')),
+                ('next_run_at', models.DateTimeField(blank=True, null=True, verbose_name='Следующий запуск')),
+                ('last_enqueued_at', models.DateTimeField(blank=True, null=True, verbose_name='Последняя постановка')),
+            ],
+            options={
+                'verbose_name': 'Расписание задачи',
+                'verbose_name_plural': 'Расписания задач',
+                'db_table': 'job_schedules',
+            },
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=100, verbose_name='Задача')),
+                ('args', models.JSONField(blank=True, default=dict, verbose_name='Параметры')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('priority', models.SmallIntegerField(default=0, verbose_name='Приоритет')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Запуск не раньше')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='Максимум попыток')),
+                ('schedule', models.CharField(blank=True, max_length=100, verbose_name='Расписание')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='Обработчик')),
+                ('lease_until', models.DateTimeField(blank=True, null=True, verbose_name='Аренда до')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начало')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Окончание')),
+                ('duration_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Длительность, мс')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Результат')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+            ],
+            options={
+                'verbose_name': 'Фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'db_table': 'jobs',
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['-priority', 'run_at'], name='jobs_pending_idx'), models.Index(condition=models.Q(('status', 'running')), fields=['lease_until'], name='jobs_running_idx'), models.Index(fields=['task', 'finished_at'], name='jobs_task_finished_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:13
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline_app', '0023_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingCurve',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fare_conditions', models.CharField(choices=[('Economy', 'Economy'), ('Comfort', 'Comfort'), ('Business', 'Business')], max_length=10, verbose_name='Класс')),
+                ('load', django.contrib.postgres.fields.ArrayField(base_field=models.FloatField(), size=None, verbose_name='Кривая загрузки')),
+                ('flights', models.PositiveIntegerField(verbose_name='Рейсов в выборке')),
+                ('computed_at', models.DateTimeField(verbose_name='Рассчитано')),
+                ('route', models.ForeignKey(db_column='route_no', on_delete=django.db.models.deletion.CASCADE, to='airline_app.route', verbose_name='Маршрут')),
+            ],
+            options={
+                'verbose_name': 'Кривая бронирований',
+                'verbose_name_plural': 'Кривые бронирований',
+                'db_table': 'booking_curves',
+                'unique_together': {('route', 'fare_conditions')},
+            },
+        ),
+        migrations.CreateModel(
+            name='BookingForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fare_conditions', models.CharField(choices=[('Economy', 'Economy'), ('Comfort', 'Comfort'), ('Business', 'Business')], max_length=10, verbose_name='Класс')),
+                ('capacity', models.PositiveSmallIntegerField(verbose_name='Мест')),
+                ('booked', models.PositiveSmallIntegerField(verbose_name='Продано')),
+                ('forecast_booked', models.FloatField(verbose_name='Прогноз продаж к вылету')),
+                ('days_to_departure', models.PositiveSmallIntegerField(verbose_name='Дней до вылета')),
+                ('computed_at', models.DateTimeField(verbose_name='Рассчитано')),
+                ('flight', models.ForeignKey(db_column='flight_id', on_delete=django.db.models.deletion.CASCADE, to='airline_app.flight', verbose_name='Рейс')),
+            ],
+            options={
+                'verbose_name': 'Прогноз загрузки',
+                'verbose_name_plural': 'Прогнозы загрузки',
+                'db_table': 'booking_forecasts',
+                'indexes': [models.Index(fields=['computed_at'], name='booking_forecasts_computed_idx')],
+                'unique_together': {('flight', 'fare_conditions')},
+            },
+        ),
+    ]
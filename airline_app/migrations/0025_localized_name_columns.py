@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:15
+
+import django.contrib.postgres.indexes
+import django.db.models.fields.json
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline_app', '0024_booking_forecasts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airplane',
+            name='model_en',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.fields.json.KeyTextTransform('en', 'model'), output_field=models.TextField()),
+        ),
+        migrations.AddField(
+            model_name='airplane',
+            name='model_ru',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.fields.json.KeyTextTransform('ru', 'model'), output_field=models.TextField()),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='airport_name_en',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.fields.json.KeyTextTransform('en', 'airport_name'), output_field=models.TextField()),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='airport_name_ru',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.fields.json.KeyTextTransform('ru', 'airport_name'), output_field=models.TextField()),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='city_en',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.fields.json.KeyTextTransform('en', 'city'), output_field=models.TextField()),
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='city_ru',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.fields.json.KeyTextTransform('ru', 'city'), output_field=models.TextField()),
+        ),
+        migrations.AddIndex(
+            model_name='airport',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('city_ru'), name='gin_trgm_ops'), name='airports_city_ru_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='airport',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('city_en'), name='gin_trgm_ops'), name='airports_city_en_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='airport',
+            index=models.Index(fields=['city_ru', 'airport_code'], name='airports_city_ru_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='airport',
+            index=models.Index(fields=['city_en', 'airport_code'], name='airports_city_en_idx'),
+        ),
+    ]
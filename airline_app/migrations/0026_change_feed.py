@@ -0,0 +1,102 @@
+from django.db import migrations
+
+# Таблицы ленты изменений и их первичные ключи (см. airline_app.changefeed)
+TABLES = {
+    'flights': 'flight_id',
+    'bookings': 'book_ref',
+    'payments': 'payment_id',
+    'boarding_passes': 'id',
+}
+
+FUNCTIONS_SQL = [
+    "CREATE SEQUENCE change_seq",
+    """
+    CREATE TABLE change_deletions (
+        table_name text NOT NULL,
+        object_id text NOT NULL,
+        change_seq bigint NOT NULL DEFAULT nextval('change_seq'),
+        change_xid xid8 NOT NULL DEFAULT pg_current_xact_id(),
+        deleted_at timestamptz NOT NULL DEFAULT now()
+    )
+    """,
+    "CREATE INDEX change_deletions_change_idx ON change_deletions (change_xid, change_seq)",
+    # Номер изменения и транзакция ставятся на каждую вставку и на обновление, которое что-то поменяло
+    """
+    CREATE FUNCTION stamp_change() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND NEW IS NOT DISTINCT FROM OLD THEN
+            RETURN NEW;
+        END IF;
+        NEW.change_seq := nextval('change_seq');
+        NEW.change_xid := pg_current_xact_id();
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE FUNCTION record_deletion() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO change_deletions (table_name, object_id) VALUES (TG_TABLE_NAME, to_jsonb(OLD) ->> TG_ARGV[0]);
+        RETURN OLD;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+]
+
+DROP_FUNCTIONS_SQL = [
+    "DROP FUNCTION record_deletion()",
+    "DROP FUNCTION stamp_change()",
+    "DROP TABLE change_deletions",
+    "DROP SEQUENCE change_seq",
+]
+
+
+def table_sql(table, pk):
+    return [
+        # DEFAULT nextval() переписывает таблицу один раз и нумерует уже существующие строки
+        f"""
+        ALTER TABLE {table}
+            ADD COLUMN change_seq bigint NOT NULL DEFAULT nextval('change_seq'),
+            ADD COLUMN change_xid xid8 NOT NULL DEFAULT '0'
+        """,
+        f"""
+        CREATE TRIGGER {table}_change_stamp BEFORE INSERT OR UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION stamp_change()
+        """,
+        f"""
+        CREATE TRIGGER {table}_change_delete AFTER DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION record_deletion('{pk}')
+        """,
+    ]
+
+
+def drop_table_sql(table):
+    return [
+        f"DROP TRIGGER {table}_change_delete ON {table}",
+        f"DROP TRIGGER {table}_change_stamp ON {table}",
+        f"ALTER TABLE {table} DROP COLUMN change_xid, DROP COLUMN change_seq",
+    ]
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, а это невозможно внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ('airline_app', '0025_localized_name_columns'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=FUNCTIONS_SQL, reverse_sql=DROP_FUNCTIONS_SQL),
+        *[
+            migrations.RunSQL(sql=table_sql(table, pk), reverse_sql=drop_table_sql(table))
+            for table, pk in TABLES.items()
+        ],
+        *[
+            migrations.RunSQL(
+                sql=f'CREATE INDEX CONCURRENTLY {table}_change_idx ON {table} (change_xid, change_seq)',
+                reverse_sql=f'DROP INDEX CONCURRENTLY {table}_change_idx',
+            )
+            for table in TABLES
+        ],
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline_app', '0026_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('departure', models.TextField(verbose_name='Аэропорты вылета')),
+                ('arrival', models.TextField(verbose_name='Аэропорты прилёта')),
+                ('flight_date', models.DateField(verbose_name='Дата вылета')),
+                ('day', models.DateField(verbose_name='День поиска')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='Поисков')),
+            ],
+            options={
+                'verbose_name': 'Активность поиска',
+                'verbose_name_plural': 'Активность поиска',
+                'db_table': 'search_activity',
+                'indexes': [models.Index(fields=['day'], name='search_activity_day_idx')],
+                'unique_together': {('departure', 'arrival', 'flight_date', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:24
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('airline_app', '0027_search_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='segment',
+            name='fare_bucket',
+            field=models.CharField(blank=True, default='', max_length=2),
+        ),
+        migrations.CreateModel(
+            name='FlightInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fare_conditions', models.CharField(choices=[('Economy', 'Economy'), ('Comfort', 'Comfort'), ('Business', 'Business')], max_length=10, verbose_name='Класс')),
+                ('capacity', models.PositiveSmallIntegerField(verbose_name='Мест в салоне')),
+                ('authorized', models.PositiveSmallIntegerField(verbose_name='Разрешено к продаже')),
+                ('sold', models.PositiveIntegerField(default=0, verbose_name='Продано')),
+                ('bucket_limits', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveSmallIntegerField(), size=None, verbose_name='Лимиты корзин')),
+                ('no_show_rate', models.FloatField(default=0, verbose_name='Доля неявки')),
+                ('optimized_at', models.DateTimeField(verbose_name='Пересчитано')),
+                ('flight', models.ForeignKey(db_column='flight_id', on_delete=django.db.models.deletion.CASCADE, to='airline_app.flight', verbose_name='Рейс')),
+            ],
+            options={
+                'verbose_name': 'Квота продаж',
+                'verbose_name_plural': 'Квоты продаж',
+                'db_table': 'flight_inventory',
+                'unique_together': {('flight', 'fare_conditions')},
+            },
+        ),
+    ]
@@ -1,35 +1,109 @@
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
 from django.contrib.postgres.fields import DateTimeRangeField
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-
-class Airplane(models.Model):
+from django.db import transaction
+from django.db.models.fields.json import KT
+from django.db.models.functions import Upper
+from django.utils import timezone
+from zoneinfo import ZoneInfo
+
+# Языки названий в JSON-полях справочников; первый — язык интерфейса
+NAME_LANGUAGES = ('ru', 'en')
+
+
+def localized_column(field, language):
+    # Хранимая генерируемая колонка field->>'language': индексируется и не требует разбора JSON при поиске
+    return models.GeneratedField(expression=KT(f'{field}__{language}'), output_field=models.TextField(),
+                                 db_persist=True)
+
+
+class LocalizedNamesMixin:
+    def localized(self, field, language=None):
+        """Название на языке language (по умолчанию — язык интерфейса), иначе на любом доступном."""
+        languages = [language] if language else []
+        languages += [code for code in NAME_LANGUAGES if code != language]
+        for code in languages:
+            # Генерируемые колонки есть у загруженных из БД объектов; у новых — читаем JSON
+            value = self.__dict__.get(f'{field}_{code}')
+            if value is None:
+                value = (self.__dict__.get(field) or {}).get(code)
+            if value:
+                return value
+        return ''
+
+
+class Airplane(LocalizedNamesMixin, models.Model):
     airplane_code = models.CharField(max_length=3, primary_key=True)
     model = models.JSONField()
+    model_ru = localized_column('model', 'ru')
+    model_en = localized_column('model', 'en')
     range = models.PositiveIntegerField()
     speed = models.PositiveIntegerField()
 
     def __str__(self):
-        return f"{self.airplane_code} ({self.model.get('en', '')})"
+        return f"{self.airplane_code} ({self.localized('model', 'en')})"
+
+    @property
+    def model_name(self):
+        return self.localized('model', 'en') or self.airplane_code
 
     class Meta:
         db_table = 'airplanes_data'
 
-class Airport(models.Model):
+
+class AirportQuerySet(models.QuerySet):
+    def search(self, term, language=None):
+        """Код аэропорта или название города на одном языке (или на любом из NAME_LANGUAGES).
+
+        Поиск по подстроке идёт по триграммным индексам на UPPER(city_<язык>).
+        """
+        languages = [language] if language else NAME_LANGUAGES
+        condition = models.Q(airport_code__icontains=term)
+        for code in languages:
+            condition |= models.Q(**{f'city_{code}__icontains': term})
+        return self.filter(condition)
+
+    def order_by_city(self, language=NAME_LANGUAGES[0]):
+        return self.order_by(f'city_{language}', 'airport_code')
+
+
+class Airport(LocalizedNamesMixin, models.Model):
     airport_code = models.CharField(max_length=3, primary_key=True)
     airport_name = models.JSONField()
+    airport_name_ru = localized_column('airport_name', 'ru')
+    airport_name_en = localized_column('airport_name', 'en')
     city = models.JSONField()
+    city_ru = localized_column('city', 'ru')
+    city_en = localized_column('city', 'en')
     country = models.JSONField()
     longitude = models.FloatField()
     latitude = models.FloatField()
     timezone = models.CharField(max_length=64)
 
+    objects = AirportQuerySet.as_manager()
+
     def __str__(self):
-        return f"{self.airport_code} ({self.airport_name.get('en', '')})"
+        return f"{self.airport_code} ({self.localized('airport_name', 'en')})"
+
+    @property
+    def city_name(self):
+        return self.localized('city') or self.airport_code
+
+    @property
+    def name(self):
+        return self.localized('airport_name') or self.airport_code
 
     class Meta:
         db_table = 'airports_data'
+        indexes = [
+            GinIndex(OpClass(Upper('city_ru'), name='gin_trgm_ops'), name='airports_city_ru_trgm_idx'),
+            GinIndex(OpClass(Upper('city_en'), name='gin_trgm_ops'), name='airports_city_en_trgm_idx'),
+            models.Index(fields=['city_ru', 'airport_code'], name='airports_city_ru_idx'),
+            models.Index(fields=['city_en', 'airport_code'], name='airports_city_en_idx'),
+        ]
 
 class Seat(models.Model):
     FARE_CONDITIONS = [
@@ -71,6 +145,13 @@ class Ticket(models.Model):
 
     class Meta:
         db_table = 'tickets'
+        # Триграммные индексы для поиска менеджеров (airline_app.search)
+        indexes = [
+            GinIndex(fields=['passenger_name'], opclasses=['gin_trgm_ops'], name='tickets_name_trgm_idx'),
+            GinIndex(fields=['passenger_id'], opclasses=['gin_trgm_ops'], name='tickets_doc_trgm_idx'),
+            GinIndex(fields=['ticket_no'], opclasses=['gin_trgm_ops'], name='tickets_no_trgm_idx'),
+            GinIndex(fields=['booking'], opclasses=['gin_trgm_ops'], name='tickets_book_ref_trgm_idx'),
+        ]
 
     def __str__(self):
         return f"{self.ticket_no} - {self.passenger_name}"
@@ -93,10 +174,81 @@ class Route(models.Model):
 
     class Meta:
         db_table = 'routes'
+        indexes = [
+            models.Index(fields=['departure_airport', 'arrival_airport'], name='routes_dep_arr_idx'),
+        ]
 
     def __str__(self):
         return f"{self.route_no}: {self.departure_airport} → {self.arrival_airport}"
 
+    def clean(self):
+        from .geo import distance_km
+
+        if not (self.departure_airport_id and self.arrival_airport_id and self.airplane_id):
+            return
+        distance = distance_km(self.departure_airport_id, self.arrival_airport_id)
+        if distance > self.airplane.range:
+            raise ValidationError(
+                f"Distance {distance:.0f} km exceeds airplane range {self.airplane.range} km."
+            )
+
+class LocalDate(models.Func):
+    template = "((%(expressions)s)::date)"
+    arg_joiner = ' AT TIME ZONE '
+    output_field = models.DateField()
+
+
+def local_date(moment, tz_name):
+    return moment.astimezone(ZoneInfo(tz_name)).date()
+
+
+class FlightQuerySet(models.QuerySet):
+    def _departure_timezones(self, flights):
+        route_ids = {flight.route_id for flight in flights}
+        return dict(
+            Route.objects.filter(route_no__in=route_ids)
+            .values_list('route_no', 'departure_airport__timezone')
+        )
+
+    def _fill_departure_local_date(self, flights):
+        timezones = self._departure_timezones(flights)
+        for flight in flights:
+            flight.departure_local_date = local_date(flight.scheduled_departure, timezones[flight.route_id])
+
+    def _schedule_changed(self):
+        # Массовые операции не вызывают сигналы: сбрасываем версию данных для ETag сами
+        from .httpcache import FLIGHTS, bump
+        bump(FLIGHTS)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        self._fill_departure_local_date(objs)
+        created = super().bulk_create(objs, *args, **kwargs)
+        self._schedule_changed()
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        if 'scheduled_departure' in fields or 'route' in fields:
+            self._fill_departure_local_date(objs)
+            if 'departure_local_date' not in fields:
+                fields.append('departure_local_date')
+        updated = super().bulk_update(objs, fields, *args, **kwargs)
+        self._schedule_changed()
+        return updated
+
+    def refresh_departure_local_date(self):
+        timezone_name = Route.objects.filter(
+            route_no=models.OuterRef('route')
+        ).values('departure_airport__timezone')[:1]
+        updated = self.update(
+            departure_local_date=LocalDate('scheduled_departure', models.Subquery(timezone_name))
+        )
+        self._schedule_changed()
+        return updated
+
+
 class Flight(models.Model):
     SCHEDULED = 'Scheduled'
     ON_TIME = 'On Time'
@@ -105,6 +257,8 @@ class Flight(models.Model):
     DEPARTED = 'Departed'
     ARRIVED = 'Arrived'
     CANCELLED = 'Cancelled'
+    # Статусы, в которых рейс продаётся
+    BOOKABLE_STATUSES = (SCHEDULED, ON_TIME, DELAYED)
 
     STATUS_CHOICES = [
         (SCHEDULED, 'Запланирован'),
@@ -123,17 +277,59 @@ class Flight(models.Model):
     scheduled_arrival = models.DateTimeField()
     actual_departure = models.DateTimeField(null=True, blank=True)
     actual_arrival = models.DateTimeField(null=True, blank=True)
+    departure_local_date = models.DateField(null=True, blank=True, editable=False,
+                                            verbose_name="Дата вылета (местная)")
+
+    objects = FlightQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.route.route_no} - {self.scheduled_departure.date()}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'status' in field_names:
+            instance._loaded_status = values[field_names.index('status')]
+        if 'scheduled_departure' in field_names and 'route_id' in field_names:
+            instance._loaded_schedule = (values[field_names.index('scheduled_departure')],
+                                         values[field_names.index('route_id')])
+        return instance
+
+    def _local_date_stale(self, update_fields):
+        # Местная дата зависит только от вылета и маршрута: смена статуса не читает аэропорт
+        if update_fields is not None:
+            return bool({'scheduled_departure', 'route', 'route_id'} & set(update_fields))
+        return (self.departure_local_date is None
+                or getattr(self, '_loaded_schedule', None) != (self.scheduled_departure, self.route_id))
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self._local_date_stale(update_fields):
+            self.departure_local_date = local_date(
+                self.scheduled_departure, self.route.departure_airport.timezone
+            )
+            if update_fields is not None and 'departure_local_date' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'departure_local_date']
+
+        previous_status = getattr(self, '_loaded_status', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if previous_status is not None and previous_status != self.status:
+                OutboxEvent.record('flight.status_changed', 'flight', self.flight_id, {
+                    'route_no': self.route_id,
+                    'old_status': previous_status,
+                    'status': self.status,
+                    'scheduled_departure': self.scheduled_departure.isoformat(),
+                })
+        self._loaded_status = self.status
+        self._loaded_schedule = (self.scheduled_departure, self.route_id)
+
     @property
     def free_seats_count(self):
-        total_seats = Seat.objects.filter(airplane=self.route.airplane).count()
-
-        occupied_seats = BoardingPass.objects.filter(flight=self).count()
-
-        return total_seats - occupied_seats
+        # Раскладка самолёта и занятость рейса берутся из кэша схемы мест
+        from .seatmap import seat_map
+        data, _ = seat_map(self.flight_id)
+        return data['free'] if data else 0
 
     def clean(self):
         if self.scheduled_arrival <= self.scheduled_departure:
@@ -146,6 +342,9 @@ class Flight(models.Model):
 
     class Meta:
         db_table = 'flights'
+        indexes = [
+            models.Index(fields=['route', 'departure_local_date'], name='flights_route_local_date_idx'),
+        ]
 
 class Segment(models.Model):
     ECONOMY = 'Economy'
@@ -161,6 +360,8 @@ class Segment(models.Model):
     flight = models.ForeignKey(Flight, on_delete=models.CASCADE, db_column='flight_id')
     fare_conditions = models.CharField(max_length=10, choices=FARE_CONDITIONS_CHOICES)
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+    # Тарифная корзина, по которой продан перелёт (pricing.FARE_BUCKETS); пусто — продан до их появления
+    fare_bucket = models.CharField(max_length=2, blank=True, default='')
 
     class Meta:
         db_table = 'segments'
@@ -174,11 +375,17 @@ class BoardingPass(models.Model):
     flight = models.ForeignKey(Flight, on_delete=models.CASCADE, db_column='flight_id')
     seat = models.ForeignKey(Seat, on_delete=models.CASCADE)
     boarding_no = models.IntegerField(null=True, blank=True)
+    boarding_group = models.PositiveSmallIntegerField(null=True, blank=True)
     boarding_time = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = 'boarding_passes'
         unique_together = (('ticket', 'flight'),)
+        constraints = [
+            models.UniqueConstraint(fields=['flight', 'seat'], name='boarding_passes_flight_seat_uniq'),
+            models.UniqueConstraint(fields=['flight', 'boarding_no'], name='boarding_passes_flight_no_uniq',
+                                    deferrable=models.Deferrable.DEFERRED),
+        ]
         verbose_name_plural = "Boarding Passes"
 
     def __str__(self):
@@ -199,4 +406,270 @@ class Payment(models.Model):
         verbose_name_plural = 'Payment'
 
     def __str__(self):
-        return f"Payment {self.payment_id} for Booking {self.booking.book_ref}"
\ No newline at end of file
+        return f"Payment {self.payment_id} for Booking {self.booking.book_ref}"
+
+class ExportJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    DATASET_CHOICES = [
+        ('flights', 'Рейсы'),
+        ('bookings', 'Бронирования'),
+        ('payments', 'Платежи'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    ]
+
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE, verbose_name="Пользователь")
+    dataset = models.CharField(max_length=20, choices=DATASET_CHOICES, verbose_name="Набор данных")
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv', verbose_name="Формат")
+    compress = models.BooleanField(default=False, verbose_name="Сжатие gzip")
+    filters = models.JSONField(default=dict, blank=True, verbose_name="Фильтры")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name="Статус")
+    rows_total = models.BigIntegerField(null=True, blank=True, verbose_name="Всего строк")
+    rows_written = models.BigIntegerField(default=0, verbose_name="Записано строк")
+    file_path = models.CharField(max_length=255, blank=True, verbose_name="Файл")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Начало")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Окончание")
+
+    class Meta:
+        db_table = 'export_jobs'
+        verbose_name = 'Задание экспорта'
+        verbose_name_plural = 'Задания экспорта'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='export_jobs_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Export #{self.pk} {self.dataset}.{self.file_format} ({self.status})"
+
+    @property
+    def progress(self):
+        if self.status == self.DONE:
+            return 100
+        if not self.rows_total:
+            return 0
+        return min(100, int(self.rows_written * 100 / self.rows_total))
+
+    @property
+    def filename(self):
+        extension = self.file_format + ('.gz' if self.compress else '')
+        return f"{self.dataset}_{self.pk}.{extension}"
+
+
+class OutboxEvent(models.Model):
+    event_type = models.CharField(max_length=64, verbose_name="Событие")
+    aggregate_type = models.CharField(max_length=32, verbose_name="Тип объекта")
+    aggregate_id = models.CharField(max_length=64, verbose_name="ID объекта")
+    payload = models.JSONField(default=dict, verbose_name="Данные")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+    available_at = models.DateTimeField(default=timezone.now, verbose_name="Следующая попытка")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    dispatched_at = models.DateTimeField(null=True, blank=True, verbose_name="Доставлено")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+
+    class Meta:
+        db_table = 'outbox_events'
+        verbose_name = 'Событие outbox'
+        verbose_name_plural = 'События outbox'
+        indexes = [
+            models.Index(fields=['available_at', 'id'], name='outbox_pending_idx',
+                         condition=models.Q(dispatched_at__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.aggregate_type}:{self.aggregate_id}"
+
+    @classmethod
+    def record(cls, event_type, aggregate_type, aggregate_id, payload=None):
+        # Вызывать внутри транзакции доменного изменения: событие фиксируется вместе с ним
+        return cls.objects.create(
+            event_type=event_type,
+            aggregate_type=aggregate_type,
+            aggregate_id=str(aggregate_id),
+            payload=payload or {},
+        )
+
+class Job(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    task = models.CharField(max_length=100, verbose_name="Задача")
+    args = models.JSONField(default=dict, blank=True, verbose_name="Параметры")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name="Статус")
+    priority = models.SmallIntegerField(default=0, verbose_name="Приоритет")
+    run_at = models.DateTimeField(default=timezone.now, verbose_name="Запуск не раньше")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    max_attempts = models.PositiveSmallIntegerField(default=3, verbose_name="Максимум попыток")
+    schedule = models.CharField(max_length=100, blank=True, verbose_name="Расписание")
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name="Обработчик")
+    lease_until = models.DateTimeField(null=True, blank=True, verbose_name="Аренда до")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Начало")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Окончание")
+    duration_ms = models.PositiveIntegerField(null=True, blank=True, verbose_name="Длительность, мс")
+    result = models.JSONField(null=True, blank=True, verbose_name="Результат")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+
+    class Meta:
+        db_table = 'jobs'
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(fields=['-priority', 'run_at'], name='jobs_pending_idx',
+                         condition=models.Q(status='pending')),
+            models.Index(fields=['lease_until'], name='jobs_running_idx',
+                         condition=models.Q(status='running')),
+            models.Index(fields=['task', 'finished_at'], name='jobs_task_finished_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.pk} {self.task} ({self.status})"
+
+
+class JobSchedule(models.Model):
+    name = models.CharField(max_length=100, unique=True, verbose_name="Название")
+    task = models.CharField(max_length=100, verbose_name="Задача")
+    args = models.JSONField(default=dict, blank=True, verbose_name="Параметры")
+    cron = models.CharField(max_length=100, verbose_name="Расписание (cron)")
+    enabled = models.BooleanField(default=True, verbose_name="Включено")
+    next_run_at = models.DateTimeField(null=True, blank=True, verbose_name="Следующий запуск")
+    last_enqueued_at = models.DateTimeField(null=True, blank=True, verbose_name="Последняя постановка")
+
+    class Meta:
+        db_table = 'job_schedules'
+        verbose_name = 'Расписание задачи'
+        verbose_name_plural = 'Расписания задач'
+
+    def __str__(self):
+        return f"{self.name}: {self.task} [{self.cron}]"
+
+
+class BookingCurve(models.Model):
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, db_column='route_no', to_field='route_no',
+                              verbose_name="Маршрут")
+    fare_conditions = models.CharField(max_length=10, choices=Segment.FARE_CONDITIONS_CHOICES, verbose_name="Класс")
+    # load[d] — средняя доля проданных мест класса за d дней до вылета, d = 0..HORIZON_DAYS
+    load = ArrayField(models.FloatField(), verbose_name="Кривая загрузки")
+    flights = models.PositiveIntegerField(verbose_name="Рейсов в выборке")
+    computed_at = models.DateTimeField(verbose_name="Рассчитано")
+
+    class Meta:
+        db_table = 'booking_curves'
+        unique_together = (('route', 'fare_conditions'),)
+        verbose_name = 'Кривая бронирований'
+        verbose_name_plural = 'Кривые бронирований'
+
+    def __str__(self):
+        return f"{self.route_id} {self.fare_conditions} ({self.flights} рейсов)"
+
+
+class BookingForecast(models.Model):
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, db_column='flight_id', verbose_name="Рейс")
+    fare_conditions = models.CharField(max_length=10, choices=Segment.FARE_CONDITIONS_CHOICES, verbose_name="Класс")
+    capacity = models.PositiveSmallIntegerField(verbose_name="Мест")
+    booked = models.PositiveSmallIntegerField(verbose_name="Продано")
+    forecast_booked = models.FloatField(verbose_name="Прогноз продаж к вылету")
+    days_to_departure = models.PositiveSmallIntegerField(verbose_name="Дней до вылета")
+    computed_at = models.DateTimeField(verbose_name="Рассчитано")
+
+    class Meta:
+        db_table = 'booking_forecasts'
+        unique_together = (('flight', 'fare_conditions'),)
+        indexes = [
+            models.Index(fields=['computed_at'], name='booking_forecasts_computed_idx'),
+        ]
+        verbose_name = 'Прогноз загрузки'
+        verbose_name_plural = 'Прогнозы загрузки'
+
+    @property
+    def load_factor(self):
+        return self.forecast_booked / self.capacity if self.capacity else 0.0
+
+    def __str__(self):
+        return f"Рейс {self.flight_id} {self.fare_conditions}: {self.forecast_booked:.0f}/{self.capacity}"
+
+
+class SearchActivity(models.Model):
+    """Сколько раз за день искали рейсы между группами аэропортов на дату — для прогрева кэшей."""
+    departure = models.TextField(verbose_name="Аэропорты вылета")
+    arrival = models.TextField(verbose_name="Аэропорты прилёта")
+    flight_date = models.DateField(verbose_name="Дата вылета")
+    day = models.DateField(verbose_name="День поиска")
+    hits = models.PositiveIntegerField(default=0, verbose_name="Поисков")
+
+    class Meta:
+        db_table = 'search_activity'
+        unique_together = (('departure', 'arrival', 'flight_date', 'day'),)
+        indexes = [
+            models.Index(fields=['day'], name='search_activity_day_idx'),
+        ]
+        verbose_name = 'Активность поиска'
+        verbose_name_plural = 'Активность поиска'
+
+    def __str__(self):
+        return f"{self.departure} → {self.arrival} на {self.flight_date}: {self.hits}"
+
+
+class FlightInventory(models.Model):
+    """Разрешённая ёмкость и вложенные лимиты тарифных корзин класса на рейсе.
+
+    sold меняется только F-выражениями (см. inventory.reserve), поэтому проверка
+    доступности — чтение одной строки, без подсчёта сегментов.
+    """
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, db_column='flight_id', verbose_name="Рейс")
+    fare_conditions = models.CharField(max_length=10, choices=Segment.FARE_CONDITIONS_CHOICES, verbose_name="Класс")
+    capacity = models.PositiveSmallIntegerField(verbose_name="Мест в салоне")
+    authorized = models.PositiveSmallIntegerField(verbose_name="Разрешено к продаже")
+    sold = models.PositiveIntegerField(default=0, verbose_name="Продано")
+    # Лимиты продаж по корзинам класса в порядке pricing.FARE_BUCKETS (вложенные: не возрастают)
+    bucket_limits = ArrayField(models.PositiveSmallIntegerField(), verbose_name="Лимиты корзин")
+    no_show_rate = models.FloatField(default=0, verbose_name="Доля неявки")
+    optimized_at = models.DateTimeField(verbose_name="Пересчитано")
+
+    class Meta:
+        db_table = 'flight_inventory'
+        unique_together = (('flight', 'fare_conditions'),)
+        verbose_name = 'Квота продаж'
+        verbose_name_plural = 'Квоты продаж'
+
+    @property
+    def available(self):
+        return max(self.authorized - self.sold, 0)
+
+    @property
+    def overbooked(self):
+        return max(self.sold - self.capacity, 0)
+
+    def open_bucket(self):
+        """Индекс самой дешёвой корзины, где ещё есть места; None — класс закрыт."""
+        for i in range(len(self.bucket_limits) - 1, -1, -1):
+            if self.sold < self.bucket_limits[i]:
+                return i
+        return None
+
+    def __str__(self):
+        return f"Рейс {self.flight_id} {self.fare_conditions}: {self.sold}/{self.authorized} ({self.capacity} мест)"
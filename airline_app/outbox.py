@@ -0,0 +1,94 @@
+import json
+import os
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxEvent
+
+BACKOFF_BASE = timedelta(seconds=5)
+BACKOFF_MAX = timedelta(hours=1)
+
+
+def event_message(event):
+    return {
+        'id': event.pk,
+        'type': event.event_type,
+        'aggregate': {'type': event.aggregate_type, 'id': event.aggregate_id},
+        'payload': event.payload,
+        'created_at': event.created_at.isoformat(),
+    }
+
+
+class FileSink:
+    """Дописывает события в NDJSON-файл (локальная замена брокера/интеграции)."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(settings.BASE_DIR, 'outbox', 'events.ndjson')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def send(self, messages):
+        with open(self.path, 'a', encoding='utf-8') as fh:
+            for message in messages:
+                fh.write(json.dumps(message, ensure_ascii=False) + '\n')
+
+
+class WebhookSink:
+    """POST пачки событий на URL; любой ответ кроме 2xx считается ошибкой."""
+
+    def __init__(self, url, timeout=10, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+
+    def send(self, messages):
+        response = self.session.post(self.url, json={'events': messages}, timeout=self.timeout)
+        response.raise_for_status()
+
+
+def load_sinks():
+    config = getattr(settings, 'OUTBOX_SINKS', [{'BACKEND': 'airline_app.outbox.FileSink'}])
+    return [import_string(sink['BACKEND'])(**sink.get('OPTIONS', {})) for sink in config]
+
+
+def backoff(attempts):
+    return min(BACKOFF_BASE * (2 ** max(attempts - 1, 0)), BACKOFF_MAX)
+
+
+def dispatch_batch(sinks, batch_size=100):
+    """Отправляет одну пачку событий. Возвращает (доставлено, ошибок).
+
+    Строки блокируются FOR UPDATE SKIP LOCKED, поэтому несколько диспетчеров
+    разбирают очередь параллельно, не мешая друг другу.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(dispatched_at__isnull=True, available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        if not events:
+            return 0, 0
+
+        try:
+            messages = [event_message(event) for event in events]
+            for sink in sinks:
+                sink.send(messages)
+        except Exception as e:
+            for event in events:
+                event.attempts += 1
+                event.available_at = now + backoff(event.attempts)
+                event.last_error = str(e)[:2000]
+            OutboxEvent.objects.bulk_update(events, ['attempts', 'available_at', 'last_error'])
+            return 0, len(events)
+
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            dispatched_at=timezone.now(), last_error=''
+        )
+        return len(events), 0
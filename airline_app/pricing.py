@@ -0,0 +1,33 @@
+from .models import Segment
+
+BASE_PRICE = 5500
+
+FARE_FACTORS = {
+    Segment.ECONOMY: 1,
+    Segment.COMFORT: 1.5,
+    Segment.BUSINESS: 3,
+}
+
+# Вложенные тарифные корзины класса, от самой дорогой к самой дешёвой:
+# (код, множитель к цене класса, доля разрешённой ёмкости, до которой корзина открыта).
+# Верхняя корзина продаёт всю разрешённую ёмкость, нижние закрываются раньше (см. inventory)
+FARE_BUCKETS = {
+    Segment.ECONOMY: [('Y', 1.6, 1.0), ('B', 1.25, 0.85), ('M', 1.0, 0.6)],
+    Segment.COMFORT: [('W', 1.4, 1.0), ('P', 1.0, 0.7)],
+    Segment.BUSINESS: [('J', 1.3, 1.0), ('C', 1.0, 0.7)],
+}
+
+
+def bucket_factor(fare_conditions, bucket):
+    for code, factor, _ in FARE_BUCKETS.get(fare_conditions, []):
+        if code == bucket:
+            return factor
+    return 1
+
+
+def fare_price(fare_conditions, base_price=BASE_PRICE, bucket=None):
+    """Цена перелёта; без корзины — по самой дешёвой (цена «от»)."""
+    factor = FARE_FACTORS.get(fare_conditions, 1)
+    if bucket:
+        factor *= bucket_factor(fare_conditions, bucket)
+    return int(base_price * factor)
@@ -0,0 +1,260 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+from django.utils import timezone
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = '_profile'
+DEFAULT_INTERVAL = 0.005
+DEFAULT_MAX_FILES = 200
+MAX_SQL_LENGTH = 500
+
+_current = ContextVar('profiling_trace', default=None)
+
+
+def profile_dir():
+    return getattr(settings, 'PROFILING_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+
+
+class Sampler(threading.Thread):
+    """Статистический профиль: раз в interval снимает стек потока, обрабатывающего запрос."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profiling-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.finished = threading.Event()
+
+    def run(self):
+        while not self.finished.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.finished.set()
+        self.join()
+
+
+def short_path(filename):
+    base = str(settings.BASE_DIR)
+    if filename.startswith(base):
+        return os.path.relpath(filename, base)
+    parts = filename.replace('\\', '/').split('/site-packages/')
+    return parts[-1]
+
+
+class Trace:
+    def __init__(self, request, reason):
+        self.id = uuid.uuid4().hex[:12]
+        self.reason = reason
+        self.method = request.method
+        self.path = request.get_full_path()
+        self.started_at = timezone.now()
+        self.started = time.perf_counter()
+        self.spans = []
+        self.view = None
+        self.sampler = Sampler(threading.get_ident(), getattr(settings, 'PROFILING_INTERVAL', DEFAULT_INTERVAL))
+
+    def offset_ms(self, moment):
+        return round((moment - self.started) * 1000, 3)
+
+    def add_span(self, kind, name, started):
+        self.spans.append({
+            'kind': kind, 'name': name,
+            'start_ms': self.offset_ms(started),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        })
+
+    @contextmanager
+    def span(self, kind, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(kind, name, started)
+
+    def close_view(self):
+        # Вид заканчивается вместе с get_response: ответные фазы нижележащих middleware входят в него
+        if self.view is not None:
+            self.add_span('view', *self.view)
+
+    def sql(self, execute, sql, params, many, context):
+        # Параметры запросов не сохраняются: в них персональные данные пассажиров
+        with self.span('sql', sql[:MAX_SQL_LENGTH] + (' [many]' if many else '')):
+            return execute(sql, params, many, context)
+
+    def result(self, response):
+        duration = (time.perf_counter() - self.started) * 1000
+        sql = [span for span in self.spans if span['kind'] == 'sql']
+        return {
+            'id': self.id,
+            'reason': self.reason,
+            'method': self.method,
+            'path': self.path,
+            'status': response.status_code,
+            'started_at': self.started_at.isoformat(),
+            'duration_ms': round(duration, 1),
+            'sql_count': len(sql),
+            'sql_ms': round(sum(span['duration_ms'] for span in sql), 1),
+            'interval_ms': self.sampler.interval * 1000,
+            'samples': sum(self.sampler.stacks.values()),
+            'spans': sorted(self.spans, key=lambda span: span['start_ms']),
+            'stacks': dict(self.sampler.stacks.most_common()),
+        }
+
+
+def profile_reason(request):
+    """Причина профилирования запроса или None. Флаг от не-сотрудника игнорируется."""
+    if not getattr(settings, 'PROFILING_ENABLED', True):
+        return None
+    if request.META.get(PROFILE_HEADER) or PROFILE_PARAM in request.GET:
+        # request.user вычисляется лениво — только когда флаг действительно передан
+        return 'staff' if request.user.is_staff else None
+    rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+    if rate and random.random() < rate:
+        return 'sampled'
+    return None
+
+
+def save(record):
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    name = f"{record['started_at'][:19].replace(':', '').replace('-', '')}_{record['id']}.json"
+    with open(os.path.join(directory, name), 'w', encoding='utf-8') as fh:
+        json.dump(record, fh, ensure_ascii=False)
+    rotate(directory)
+
+
+def rotate(directory):
+    files = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+    for name in files[:-getattr(settings, 'PROFILING_MAX_FILES', DEFAULT_MAX_FILES)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass  # удалил параллельный процесс
+
+
+def list_profiles():
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        record = _read(os.path.join(directory, name))
+        if record:
+            del record['stacks'], record['spans']
+            profiles.append(record)
+    return profiles
+
+
+def load(profile_id):
+    directory = profile_dir()
+    if not os.path.isdir(directory) or not profile_id.isalnum():
+        return None
+    for name in os.listdir(directory):
+        if name.endswith(f'_{profile_id}.json'):
+            return _read(os.path.join(directory, name))
+    return None
+
+
+def _read(path):
+    # Файл мог удалить rotate() в соседнем процессе или он ещё дописывается
+    try:
+        with open(path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def top_functions(stacks, limit=30):
+    """(функция, собственные сэмплы, сэмплы с вложенными вызовами), по убыванию третьего."""
+    own = Counter()
+    total = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for frame in set(frames):
+            total[frame] += count
+    return sorted(((name, own[name], total[name]) for name in total), key=lambda row: (-row[2], -row[1]))[:limit]
+
+
+def folded_stacks(stacks):
+    # Формат flamegraph.pl / speedscope
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks.items())
+
+
+class ProfilingMiddleware:
+    """Профилирование запроса по флагу сотрудника (X-Profile: 1 или ?_profile=1) или выборке трафика.
+
+    Когда профилирование не запрошено, стоит одной проверки заголовка и параметра.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reason = profile_reason(request)
+        if reason is None:
+            return self.get_response(request)
+
+        trace = Trace(request, reason)
+        token = _current.set(trace)
+        trace.sampler.start()
+        try:
+            with connections['default'].execute_wrapper(trace.sql):
+                response = self.get_response(request)
+        finally:
+            trace.sampler.stop()
+            _current.reset(token)
+        trace.close_view()
+        save(trace.result(response))
+        response['X-Profile-Id'] = trace.id
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        trace = _current.get()
+        if trace is not None:
+            trace.view = (getattr(view_func, '__qualname__', repr(view_func)), time.perf_counter())
+
+
+class ProfiledTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        trace = _current.get()
+        if trace is None:
+            return self.template.render(context, request)
+        with trace.span('template', self.template.origin.template_name):
+            return self.template.render(context, request)
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django, отмечающий время отрисовки шаблонов в профиле запроса."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name))
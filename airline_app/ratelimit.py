@@ -0,0 +1,100 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse, HttpResponse
+
+METRICS_KEY = 'ratelimit:metrics:{scope}:{outcome}'
+
+
+def _cache():
+    return caches[getattr(settings, 'RATELIMIT_CACHE', 'default')]
+
+
+def budgets_for(scope):
+    # Бюджеты задаются только в settings.RATELIMIT_BUDGETS: (ёмкость корзины, пополнение токенов в секунду)
+    return getattr(settings, 'RATELIMIT_BUDGETS', {}).get(scope, {})
+
+
+def client_ip(request):
+    if getattr(settings, 'RATELIMIT_TRUST_X_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def take_token(key, capacity, rate, now=None):
+    """Списывает токен из корзины. Возвращает 0, если запрос разрешён, иначе секунды до нового токена.
+
+    Состояние (токены, время) хранится в кэше; гонка между процессами может
+    пропустить лишний запрос, но не заблокирует легитимный трафик.
+    """
+    now = time.time() if now is None else now
+    cache = _cache()
+    tokens, updated = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        cache.set(key, (tokens - 1, now), timeout=math.ceil(capacity / rate) + 1)
+        return 0
+    cache.set(key, (tokens, now), timeout=math.ceil(capacity / rate) + 1)
+    return (1 - tokens) / rate
+
+
+def _count(scope, outcome):
+    cache = _cache()
+    key = METRICS_KEY.format(scope=scope, outcome=outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def metrics(scopes=None):
+    cache = _cache()
+    scopes = scopes or set(getattr(settings, 'RATELIMIT_BUDGETS', {}))
+    return {
+        scope: {outcome: cache.get(METRICS_KEY.format(scope=scope, outcome=outcome), 0)
+                for outcome in ('allowed', 'limited')}
+        for scope in scopes
+    }
+
+
+def check(request, scope):
+    if not getattr(settings, 'RATELIMIT_ENABLED', True):
+        return 0
+    budgets = budgets_for(scope)
+    identities = []
+    # IP — всегда: иначе смена аккаунтов с одного адреса обходила бы лимит
+    if 'ip' in budgets:
+        identities.append(('ip', client_ip(request)))
+    if request.user.is_authenticated and 'user' in budgets:
+        identities.append(('user', f'u{request.user.pk}'))
+
+    wait = 0
+    for kind, identity in identities:
+        capacity, rate = budgets[kind]
+        wait = max(wait, take_token(f'ratelimit:{scope}:{identity}', capacity, rate))
+    return wait
+
+
+def rate_limited(scope):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            wait = check(request, scope)
+            if wait:
+                _count(scope, 'limited')
+                retry_after = str(max(1, math.ceil(wait)))
+                if request.path.startswith('/api/'):
+                    response = JsonResponse({'error': 'Слишком много запросов'}, status=429)
+                else:
+                    response = HttpResponse('Слишком много запросов. Повторите попытку позже.', status=429)
+                response['Retry-After'] = retry_after
+                return response
+            _count(scope, 'allowed')
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+
+MANAGERS_GROUP = 'Managers'
+CLIENTS_GROUP = 'Clients'
+
+ROLE_CACHE_TIMEOUT = 60 * 60
+VERSION_KEY = 'roles:version'
+
+
+def _cache_enabled():
+    # Роль из кэша одного процесса могла бы пережить снятие из группы в другом (см. SHARED_CACHE)
+    return getattr(settings, 'SHARED_CACHE', False)
+
+
+def _version():
+    return cache.get_or_set(VERSION_KEY, 1, None)
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+
+
+def _user_key(user_id):
+    return f'roles:{_version()}:user:{user_id}'
+
+
+def user_group_names(user):
+    if not user.is_authenticated:
+        return frozenset()
+
+    # Кэш на объекте пользователя живёт ровно один запрос (request.user)
+    names = getattr(user, '_group_names', None)
+    if names is None:
+        if not _cache_enabled():
+            names = frozenset(user.groups.values_list('name', flat=True))
+        else:
+            key = _user_key(user.pk)
+            names = cache.get(key)
+            if names is None:
+                names = frozenset(user.groups.values_list('name', flat=True))
+                cache.set(key, names, ROLE_CACHE_TIMEOUT)
+        user._group_names = names
+    return names
+
+
+def invalidate_user(user_id):
+    if _cache_enabled():
+        cache.delete(_user_key(user_id))
+
+
+def is_manager(user):
+    return MANAGERS_GROUP in user_group_names(user)
+
+
+def is_manager_or_staff(user):
+    return user.is_staff or is_manager(user)
+
+
+def group_id(name):
+    if not _cache_enabled():
+        return Group.objects.get(name=name).pk
+    key = f'roles:{_version()}:group:{name}'
+    pk = cache.get(key)
+    if pk is None:
+        pk = Group.objects.get(name=name).pk
+        cache.set(key, pk, ROLE_CACHE_TIMEOUT)
+    return pk
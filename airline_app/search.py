@@ -0,0 +1,83 @@
+import re
+
+from django.contrib.postgres.aggregates import JSONBAgg
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Greatest, JSONObject
+
+from .models import Ticket
+
+MIN_QUERY_LENGTH = 3
+SEARCH_LIMIT = 50
+
+
+def normalize_query(query):
+    # Регистр не меняется: в номерах документов бывают строчные буквы
+    return re.sub(r'\s+', ' ', query or '').strip()
+
+
+def search_queryset(query, limit=SEARCH_LIMIT):
+    """Поиск билетов для менеджеров по ФИО, документу, номеру билета или брони.
+
+    Все условия обслуживаются GIN-индексами pg_trgm (миграция 0022): `%>` для
+    нечёткого совпадения имени с опечатками и LIKE '%...%' для номеров.
+    Сегменты и рейсы собираются в тот же запрос через JSONB_AGG.
+    """
+    # Номера билетов и брони хранятся в верхнем регистре; документ ищется как введён и в верхнем
+    # регистре — оба LIKE используют trigram-индекс, в отличие от icontains (UPPER(колонка))
+    code = query.upper()
+    documents = [query] if query == code else [query, code]
+    exact = Q(ticket_no=code) | Q(booking_id=code) | Q(passenger_id__in=documents)
+    partial = Q(ticket_no__contains=code) | Q(booking__book_ref__contains=code)
+    for document in documents:
+        partial |= Q(passenger_id__contains=document)
+
+    return (
+        Ticket.objects
+        .filter(partial | Q(passenger_name__trigram_word_similar=query))
+        .select_related('booking')
+        .annotate(
+            rank=Greatest(
+                Case(
+                    When(exact, then=Value(1.0)),
+                    When(partial, then=Value(0.8)),
+                    default=Value(0.0),
+                    output_field=FloatField(),
+                ),
+                TrigramWordSimilarity(query, 'passenger_name'),
+            ),
+            segments=JSONBAgg(
+                JSONObject(
+                    flight_id=F('segment__flight__flight_id'),
+                    route_no=F('segment__flight__route_id'),
+                    status=F('segment__flight__status'),
+                    scheduled_departure=F('segment__flight__scheduled_departure'),
+                    fare_conditions=F('segment__fare_conditions'),
+                    price=F('segment__price'),
+                ),
+                filter=Q(segment__isnull=False),
+                order_by='segment__flight__scheduled_departure',
+                default=Value([]),
+            ),
+        )
+        .order_by('-rank', 'passenger_name', 'ticket_no')[:limit]
+    )
+
+
+def search_tickets(query, limit=SEARCH_LIMIT):
+    query = normalize_query(query)
+    if len(query) < MIN_QUERY_LENGTH:
+        return []
+    return [
+        {
+            'ticket_no': ticket.ticket_no,
+            'book_ref': ticket.booking_id,
+            'book_date': ticket.booking.book_date.isoformat(),
+            'is_paid': ticket.booking.is_paid,
+            'passenger_name': ticket.passenger_name,
+            'passenger_id': ticket.passenger_id,
+            'rank': round(ticket.rank, 3),
+            'segments': ticket.segments,
+        }
+        for ticket in search_queryset(query, limit)
+    ]
@@ -0,0 +1,138 @@
+import base64
+import hashlib
+import json
+import re
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.cache import cache
+
+from . import httpcache
+from .models import Flight, Seat
+
+LAYOUT_CACHE_TIMEOUT = 60 * 60 * 24
+# Занятость рейса сбрасывается сигналом при выдаче посадочного; таймаут страхует от bulk-операций
+SEAT_STATE_CACHE_TIMEOUT = 60 * 15
+CLASS_CODES = {'Economy': 'E', 'Comfort': 'C', 'Business': 'B'}
+
+
+def layout_cache_key(airplane_code):
+    return f'seat_layout:{airplane_code}'
+
+
+def seat_state_cache_key(flight_id):
+    return f'seat_state:{flight_id}'
+
+
+def seat_sort_key(seat_no):
+    match = re.match(r'(\d+)(\D*)', seat_no)
+    if not match:
+        return (0, seat_no)
+    return (int(match.group(1)), match.group(2))
+
+
+def build_layout(airplane_code):
+    seats = sorted(
+        Seat.objects.filter(airplane_id=airplane_code).values_list('id', 'seat_no', 'fare_conditions'),
+        key=lambda seat: seat_sort_key(seat[1]),
+    )
+
+    # Ряды сжимаются в [номер ряда, буквы мест, класс]: 400 мест ~ несколько сотен байт
+    rows = []
+    index = {}
+    seat_numbers = []
+    for i, (seat_id, seat_no, fare_conditions) in enumerate(seats):
+        row, letter = seat_sort_key(seat_no)
+        code = CLASS_CODES.get(fare_conditions, fare_conditions[:1])
+        if rows and rows[-1][0] == row and rows[-1][2] == code:
+            rows[-1][1] += letter
+        else:
+            rows.append([row, letter, code])
+        index[seat_id] = i
+        seat_numbers.append(seat_no)
+
+    version = hashlib.sha1(json.dumps(rows).encode()).hexdigest()[:12]
+    return {'rows': rows, 'index': index, 'seat_numbers': seat_numbers, 'version': version}
+
+
+def get_layout(airplane_code):
+    key = layout_cache_key(airplane_code)
+    layout = cache.get(key)
+    if layout is None:
+        layout = build_layout(airplane_code)
+        cache.set(key, layout, LAYOUT_CACHE_TIMEOUT)
+    return layout
+
+
+def invalidate_layout(airplane_code):
+    cache.delete(layout_cache_key(airplane_code))
+
+
+def occupancy_bitmap(layout, occupied_seat_ids):
+    # Бит i (младший бит первым) = место i из раскладки занято
+    bitmap = bytearray((len(layout['seat_numbers']) + 7) // 8)
+    for seat_id in occupied_seat_ids:
+        i = layout['index'].get(seat_id)
+        if i is not None:
+            bitmap[i >> 3] |= 1 << (i & 7)
+    return bytes(bitmap)
+
+
+def flight_seat_state(flight_id):
+    """Самолёт рейса и занятые места одним запросом. None, если рейса нет."""
+    row = (
+        Flight.objects.filter(pk=flight_id)
+        .values_list('route__airplane_id', ArrayAgg('boardingpass__seat_id', default=[]))
+        .first()
+    )
+    if row is None:
+        return None
+    airplane_code, occupied = row
+    return airplane_code, [seat_id for seat_id in occupied if seat_id is not None]
+
+
+def cached_seat_state(flight_id):
+    # Сброс из occupancy_changed дошёл бы только до процесса, принявшего бронь (см. SHARED_CACHE)
+    if not getattr(settings, 'SHARED_CACHE', False):
+        return flight_seat_state(flight_id)
+    key = seat_state_cache_key(flight_id)
+    state = cache.get(key)
+    if state is None:
+        state = flight_seat_state(flight_id)
+        if state is not None:
+            cache.set(key, state, SEAT_STATE_CACHE_TIMEOUT)
+    return state
+
+
+def occupancy_changed(flight_ids):
+    """Сброс занятости рейсов в кэше и версий SEATS их пар аэропортов; вызывается после COMMIT.
+
+    Общая версия SEATS не меняется: бронь на одном направлении не сбрасывает
+    ETag и кэш календаря цен остальных.
+    """
+    flight_ids = set(flight_ids)
+    cache.delete_many([seat_state_cache_key(flight_id) for flight_id in flight_ids])
+    pairs = set(
+        Flight.objects.filter(pk__in=flight_ids)
+        .values_list('route__departure_airport_id', 'route__arrival_airport_id')
+    )
+    httpcache.bump(*[httpcache.scoped(httpcache.SEATS, departure, arrival) for departure, arrival in pairs])
+
+
+def seat_map(flight_id):
+    state = cached_seat_state(flight_id)
+    if state is None:
+        return None, None
+    airplane_code, occupied = state
+    layout = get_layout(airplane_code)
+    bitmap = occupancy_bitmap(layout, occupied)
+    etag = hashlib.sha1(layout['version'].encode() + bitmap).hexdigest()[:16]
+    data = {
+        'flight_id': flight_id,
+        'airplane': airplane_code,
+        'classes': {code: name for name, code in CLASS_CODES.items()},
+        'rows': layout['rows'],
+        'occupied': base64.b64encode(bitmap).decode(),
+        'free': len(layout['seat_numbers']) - len(occupied),
+    }
+    return data, f'"{etag}"'
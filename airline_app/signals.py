@@ -0,0 +1,69 @@
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import Airport, Seat, Flight, Route, BoardingPass, Segment
+from . import httpcache, roles
+
+
+@receiver([post_save, post_delete], sender=Airport)
+def airports_changed(sender, **kwargs):
+    from .geo import invalidate_distance_matrix
+    invalidate_distance_matrix()
+    httpcache.bump(httpcache.AIRPORTS, httpcache.FLIGHTS)
+
+
+@receiver([post_save, post_delete], sender=Seat)
+def seats_changed(sender, instance, **kwargs):
+    from .seatmap import invalidate_layout
+    invalidate_layout(instance.airplane_id)
+    httpcache.bump(httpcache.SEATS)
+
+
+@receiver([post_save, post_delete], sender=Flight)
+@receiver([post_save, post_delete], sender=Route)
+def schedule_changed(sender, **kwargs):
+    httpcache.bump(httpcache.FLIGHTS)
+
+
+@receiver([post_save, post_delete], sender=BoardingPass)
+@receiver([post_save, post_delete], sender=Segment)
+def seat_occupancy_changed(sender, instance, **kwargs):
+    from .seatmap import occupancy_changed
+    # До COMMIT параллельный запрос перечитал бы в кэш ещё старую занятость
+    flight_id = instance.flight_id
+    transaction.on_commit(lambda: occupancy_changed([flight_id]))
+
+
+@receiver(post_save, sender=Segment)
+def segment_saved(sender, instance, created, **kwargs):
+    # Брони через book_itinerary списывают квоту сами (bulk_create без сигналов); здесь — админка и скрипты
+    if created:
+        from .inventory import adjust_sold
+        adjust_sold({(instance.flight_id, instance.fare_conditions): 1})
+
+
+@receiver(post_delete, sender=Segment)
+def segment_deleted(sender, instance, **kwargs):
+    from .inventory import adjust_sold
+    adjust_sold({(instance.flight_id, instance.fare_conditions): -1})
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        roles.invalidate_user(instance.pk)
+        instance.__dict__.pop('_group_names', None)
+    elif pk_set:
+        for user_id in pk_set:
+            roles.invalidate_user(user_id)
+    else:
+        roles.bump_version()
+
+
+@receiver([post_save, post_delete], sender=Group)
+def group_changed(sender, **kwargs):
+    roles.bump_version()
@@ -0,0 +1,88 @@
+import io
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.utils import timezone
+
+from .boarding import BACK_TO_FRONT
+from .changefeed import purge_deletions
+from .exports import run_export_job
+from .forecasting import refresh_forecasts
+from .geo import build_distance_matrix
+from .inventory import optimize_inventory as run_inventory_optimization
+from .jobs import task
+from .models import ExportJob, Job
+from .warmup import warm_caches as run_warmup
+
+
+def run_command(name, *args, **options):
+    out = io.StringIO()
+    call_command(name, *args, stdout=out, stderr=out, **options)
+    return out.getvalue()[-2000:]
+
+
+@task(timeout=2 * 60 * 60, max_attempts=2)
+def backup_to_yandex():
+    return run_command('backup_to_yandex')
+
+
+@task(timeout=4 * 60 * 60, max_attempts=1)
+def restore_drill(jobs=None):
+    options = {'jobs': jobs} if jobs else {}
+    return run_command('restore_backup', **options)
+
+
+@task(timeout=10 * 60)
+def plan_boarding(minutes_ahead=60, strategy=BACK_TO_FRONT):
+    return run_command('plan_boarding', minutes_ahead=minutes_ahead, strategy=strategy)
+
+
+@task(timeout=10 * 60)
+def dispatch_outbox(batch=100):
+    return run_command('dispatch_outbox', batch=batch, once=True)
+
+
+@task(timeout=6 * 60 * 60, priority=5)
+def run_export(job_id):
+    # Задание экспорта мог уже забрать run_export_worker: берём только из очереди
+    claimed = ExportJob.objects.filter(pk=job_id, status=ExportJob.PENDING).update(
+        status=ExportJob.RUNNING, started_at=timezone.now()
+    )
+    if claimed:
+        run_export_job(job_id)
+    return {'export_job': job_id, 'claimed': bool(claimed)}
+
+
+@task(timeout=30 * 60)
+def refresh_distance_matrix():
+    return {'airports': len(build_distance_matrix().codes)}
+
+
+@task(timeout=60 * 60)
+def refresh_booking_forecasts(full=False):
+    return refresh_forecasts(full=full)
+
+
+@task(timeout=60 * 60)
+def optimize_inventory(recount=False):
+    return run_inventory_optimization(recount=recount)
+
+
+@task(timeout=15 * 60, max_attempts=1)
+def warm_caches(top_n=None):
+    return run_warmup(top_n=top_n)
+
+
+@task()
+def purge_jobs(days=None):
+    days = days or getattr(settings, 'JOB_RETENTION_DAYS', 14)
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED], finished_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()
+    return {'deleted': deleted}
+
+
+@task()
+def purge_change_deletions(days=None):
+    return {'deleted': purge_deletions(days or getattr(settings, 'CHANGEFEED_DELETIONS_RETENTION_DAYS', 30))}
@@ -1,3 +1,513 @@
-from django.test import TestCase
+import base64
+import io
+import os
+import tempfile
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, models as db_models
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils import timezone
+
+from . import boarding, disruption, httpcache, itinerary, models, seatmap
+from .backups import LocalBackupStorage, verified_backups
+from .boarding_docs import bcbp_name, bcbp_payload
+from .inventory import authorized_capacity, nested_limits, reserve
+from .itinerary import ItineraryError, book_itinerary
+from .jobs import next_run, parse_cron
+from .models import BoardingPass, Booking, Flight, FlightInventory, OutboxEvent, Route, Seat, Segment, Ticket
+from .search import normalize_query, search_queryset
+from .workers import process_pool
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+def apps_ready():
+    from django.apps import apps
+    return apps.ready
+
+
+@override_settings(TIME_ZONE='UTC')
+class NextRunTests(SimpleTestCase):
+    def test_range(self):
+        self.assertEqual(next_run('0 9-17 * * *', utc(2026, 1, 5, 12, 30)), utc(2026, 1, 5, 13, 0))
+        self.assertEqual(next_run('0 9-17 * * *', utc(2026, 1, 5, 17, 30)), utc(2026, 1, 6, 9, 0))
+
+    def test_step(self):
+        self.assertEqual(next_run('*/15 * * * *', utc(2026, 1, 5, 10, 7)), utc(2026, 1, 5, 10, 15))
+        # Шаг от начального значения идёт до конца диапазона поля
+        self.assertEqual(next_run('5/20 * * * *', utc(2026, 1, 5, 10, 46)), utc(2026, 1, 5, 11, 5))
+        self.assertEqual(next_run('0 8-18/4 * * *', utc(2026, 1, 5, 12, 1)), utc(2026, 1, 5, 16, 0))
+
+    def test_strictly_after(self):
+        self.assertEqual(next_run('30 10 * * *', utc(2026, 1, 5, 10, 30)), utc(2026, 1, 6, 10, 30))
+
+    def test_day_of_month_or_day_of_week(self):
+        # Заданы оба поля — достаточно совпадения любого: 13-е число или воскресенье
+        self.assertEqual(next_run('0 0 13 * 0', utc(2026, 10, 12, 0, 0)), utc(2026, 10, 13, 0, 0))
+        self.assertEqual(next_run('0 0 13 * 0', utc(2026, 10, 13, 0, 0)), utc(2026, 10, 18, 0, 0))
+
+    def test_day_of_week_only(self):
+        # День месяца '*' — только понедельники; 7 тоже означает воскресенье
+        self.assertEqual(next_run('0 0 * * 1', utc(2026, 10, 13, 0, 0)), utc(2026, 10, 19, 0, 0))
+        self.assertEqual(next_run('0 0 * * 7', utc(2026, 10, 13, 0, 0)), utc(2026, 10, 18, 0, 0))
+
+    def test_month_rollover(self):
+        self.assertEqual(next_run('0 0 1 * *', utc(2026, 12, 31, 23, 59)), utc(2027, 1, 1, 0, 0))
+        self.assertEqual(next_run('0 0 31 * *', utc(2026, 4, 1, 0, 0)), utc(2026, 5, 31, 0, 0))
+        self.assertEqual(next_run('0 0 29 2 *', utc(2026, 3, 1, 0, 0)), utc(2028, 2, 29, 0, 0))
+
+    def test_local_time(self):
+        with self.settings(TIME_ZONE='Europe/Moscow'):
+            self.assertEqual(next_run('0 3 * * *', utc(2026, 1, 5, 1, 0)), utc(2026, 1, 6, 0, 0))
+
+    def test_invalid(self):
+        for expr in ('60 * * * *', '0 0 * *', '0 0 * * 8', '*/0 * * * *', '0 17-9 * * *'):
+            with self.subTest(expr=expr), self.assertRaises(ValueError):
+                parse_cron(expr)
+        with self.assertRaises(ValueError):
+            next_run('0 0 30 2 *', utc(2026, 1, 1))
+
+
+@override_settings(INVENTORY_MAX_OVERBOOKING=0.1)
+class InventoryTests(SimpleTestCase):
+    def row(self, sold, limits, fare_conditions='Economy'):
+        return FlightInventory(pk=1, fare_conditions=fare_conditions, capacity=100,
+                               authorized=limits[0], sold=sold, bucket_limits=limits)
+
+    def test_authorized_capacity(self):
+        self.assertEqual(authorized_capacity(100, 0), 100)
+        self.assertEqual(authorized_capacity(100, 0.02), 102)
+        # Перебронирование ограничено INVENTORY_MAX_OVERBOOKING
+        self.assertEqual(authorized_capacity(100, 0.08), 108)
+        self.assertEqual(authorized_capacity(100, 0.3), 110)
+
+    def test_nested_limits(self):
+        self.assertEqual(nested_limits('Economy', 108), [108, 91, 64])
+        self.assertEqual(nested_limits('Business', 12), [12, 8])
+        # Прогноз спроса выше ёмкости сжимает дешёвые корзины, верхняя продаёт всё разрешённое
+        self.assertEqual(nested_limits('Economy', 108, demand_ratio=1.3), [108, 70, 49])
+        self.assertEqual(nested_limits('Economy', 108, demand_ratio=0.5), [108, 91, 64])
+
+    def test_open_bucket(self):
+        self.assertEqual(self.row(0, [108, 91, 64]).open_bucket(), 2)
+        # Закрытая дешёвая корзина уступает следующей по цене
+        self.assertEqual(self.row(64, [108, 91, 64]).open_bucket(), 1)
+        self.assertEqual(self.row(91, [108, 91, 64]).open_bucket(), 0)
+        self.assertIsNone(self.row(108, [108, 91, 64]).open_bucket())
+
+    def test_reserve_sells_above_capacity(self):
+        # Разрешено 108 при 100 местах: 101-е место продаётся по верхней корзине
+        row = self.row(100, [108, 91, 64])
+        with mock.patch.object(FlightInventory.objects, 'filter') as filter_:
+            filter_.return_value.update.return_value = 1
+            self.assertEqual(reserve(row), 'Y')
+        filter_.assert_called_once_with(pk=1, sold__lt=108)
+        self.assertEqual(row.sold, 101)
+        self.assertEqual(row.overbooked, 1)
+
+    def test_reserve_falls_through_after_race(self):
+        row = self.row(63, [108, 91, 64])
+
+        def refresh(fields):
+            row.sold = 64
+
+        with mock.patch.object(FlightInventory.objects, 'filter') as filter_, \
+                mock.patch.object(row, 'refresh_from_db', side_effect=refresh):
+            filter_.return_value.update.side_effect = [0, 1]
+            self.assertEqual(reserve(row), 'B')
+        self.assertEqual(filter_.call_args_list, [mock.call(pk=1, sold__lt=64), mock.call(pk=1, sold__lt=91)])
+        self.assertEqual(row.sold, 65)
+
+    def test_reserve_sold_out(self):
+        row = self.row(108, [108, 91, 64])
+        with mock.patch.object(FlightInventory.objects, 'filter') as filter_:
+            self.assertIsNone(reserve(row))
+        filter_.assert_not_called()
+
+
+class ProcessPoolTests(SimpleTestCase):
+    def test_spawned_worker_sets_up_django(self):
+        # initializer распаковывается в дочернем процессе до django.setup()
+        with process_pool(1) as pool:
+            self.assertTrue(pool.submit(apps_ready).result(timeout=60))
+
+
+class HttpCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def etag(self):
+        return httpcache.versioned_etag([httpcache.AIRPORTS])(RequestFactory().get('/airports/?q=MO'))
+
+    def test_versions_survive_cache_loss(self):
+        before = httpcache.data_versions(httpcache.AIRPORTS)
+        self.assertNotEqual(before, [1])
+        cache.clear()
+        # Сброшенный счётчик не возвращается к прежнему значению
+        self.assertNotEqual(httpcache.data_versions(httpcache.AIRPORTS), before)
+
+    def test_bump_changes_etag(self):
+        with self.settings(SHARED_CACHE=True):
+            before = self.etag()
+            self.assertEqual(self.etag(), before)
+            httpcache.bump(httpcache.AIRPORTS)
+            self.assertNotEqual(self.etag(), before)
+
+    def test_no_etag_without_shared_cache(self):
+        with self.settings(SHARED_CACHE=False):
+            self.assertIsNone(self.etag())
+
+
+class SeatStateCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_with_shared_cache(self):
+        with self.settings(SHARED_CACHE=True), \
+                mock.patch.object(seatmap, 'flight_seat_state', return_value=('773', [1, 2])) as load:
+            self.assertEqual(seatmap.cached_seat_state(1), ('773', [1, 2]))
+            self.assertEqual(seatmap.cached_seat_state(1), ('773', [1, 2]))
+        load.assert_called_once_with(1)
+
+    def test_read_from_db_without_shared_cache(self):
+        # Занятость из locmem другого процесса могла бы устареть
+        with self.settings(SHARED_CACHE=False), \
+                mock.patch.object(seatmap, 'flight_seat_state', return_value=('773', [1])) as load:
+            seatmap.cached_seat_state(1)
+            seatmap.cached_seat_state(1)
+        self.assertEqual(load.call_count, 2)
+
+
+class ReaccommodationTests(SimpleTestCase):
+    def setUp(self):
+        departure = utc(2026, 10, 20, 10, 0)
+        self.flight = SimpleNamespace(pk=20, scheduled_departure=departure,
+                                      route=SimpleNamespace(airplane_id='773'))
+        self.seats = [SimpleNamespace(pk=i, seat_no=f'1{letter}') for i, letter in enumerate('ABC', 1)]
+        self.inventory = disruption.Inventory.__new__(disruption.Inventory)
+        self.inventory.occupied = defaultdict(set)
+        self.inventory.seats = {('773', 'Economy'): self.seats}
+        self.segments = [
+            SimpleNamespace(ticket_id=f'T{i}', flight_id=10, fare_conditions='Economy',
+                            ticket=SimpleNamespace(booking_id='ABC123'))
+            for i in (1, 2)
+        ]
+        self.boarding_pass = SimpleNamespace(flight_id=10, seat_id=99)
+
+    def plan(self):
+        request = {
+            'book_ref': 'ABC123', 'fare_conditions': 'Economy', 'segments': self.segments,
+            'passes': [self.boarding_pass, None], 'pair': ('SVO', 'AER'),
+            'not_before': self.flight.scheduled_departure - timedelta(hours=1),
+            'exclude': None, 'origin_flight_id': 10,
+        }
+        ticket_flights = defaultdict(set, {'T1': {10}, 'T2': {10}})
+        return disruption.match([request], self.inventory, {('SVO', 'AER'): [self.flight]}, ticket_flights)
+
+    def test_seat_only_for_boarding_pass(self):
+        moves, unplaced = self.plan()
+        self.assertEqual(unplaced, [])
+        self.assertEqual([move['seat'] for move in moves], [self.seats[0], None])
+        # Группа занимает места под вместимость целиком
+        self.assertEqual(self.inventory.occupied[20], {1, 2})
+
+    def test_payload_without_unheld_seat(self):
+        moves, _ = self.plan()
+        with mock.patch.object(disruption.Segment.objects, 'bulk_update'), \
+                mock.patch.object(disruption.BoardingPass.objects, 'bulk_update') as update_passes, \
+                mock.patch.object(disruption.OutboxEvent.objects, 'bulk_create') as create_events, \
+                mock.patch.object(disruption, 'adjust_sold'), \
+                mock.patch.object(disruption.transaction, 'on_commit'):
+            disruption.apply_moves(moves)
+        self.assertEqual(update_passes.call_args[0][0], [self.boarding_pass])
+        self.assertEqual(self.boarding_pass.seat, self.seats[0])
+        [event] = create_events.call_args[0][0]
+        self.assertEqual(event.payload, {'segments': [
+            {'ticket_no': 'T1', 'flight_id': 20, 'seat_no': '1A'},
+            {'ticket_no': 'T2', 'flight_id': 20},
+        ]})
+
+
+class BookItineraryTests(SimpleTestCase):
+    """Бронирование маршрута без БД: блокировки, квоты и запись заменены моками."""
+
+    def setUp(self):
+        departure = timezone.now() + timedelta(days=1)
+        self.flights = {
+            1: self.flight(1, departure),
+            2: self.flight(2, departure + timedelta(hours=4)),
+        }
+        self.seats = [Seat(id=i, airplane_id='773', seat_no=f'1{letter}', fare_conditions='Economy')
+                      for i, letter in enumerate('AB', 1)]
+        self.inventory = {
+            (flight_id, 'Economy'): FlightInventory(pk=flight_id, flight_id=flight_id, fare_conditions='Economy',
+                                                    capacity=2, authorized=2, sold=0, bucket_limits=[2, 2, 1])
+            for flight_id in self.flights
+        }
+        self.occupied = []
+
+        self.atomic = self.patch(itinerary.transaction, 'atomic')
+        self.atomic.return_value.__exit__.return_value = False
+        self.on_commit = self.patch(itinerary.transaction, 'on_commit')
+        self.patch(itinerary, 'lock_flights', side_effect=lambda ids: {pk: self.flights[pk] for pk in ids})
+        self.ensure_inventory = self.patch(itinerary, 'ensure_inventory')
+        self.patch(itinerary, 'load_inventory', side_effect=lambda ids: self.inventory)
+        self.patch(FlightInventory.objects, 'filter').return_value.update.return_value = 1
+        self.patch(BoardingPass.objects, 'filter').return_value.values_list.side_effect = lambda *a: self.occupied
+        self.patch(Seat.objects, 'filter', side_effect=lambda **kw: self.seats)
+        self.create_booking = self.patch(Booking.objects, 'create', side_effect=lambda **kw: Booking(**kw))
+        self.patch(Ticket.objects, 'bulk_create')
+        self.create_segments = self.patch(Segment.objects, 'bulk_create')
+        self.create_passes = self.patch(BoardingPass.objects, 'bulk_create')
+        self.record = self.patch(OutboxEvent, 'record')
+
+    def patch(self, target, attribute, **kwargs):
+        patcher = mock.patch.object(target, attribute, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def flight(self, flight_id, departure):
+        return Flight(flight_id=flight_id, route=Route(route_no=f'PG{flight_id:04d}', airplane_id='773'),
+                      status=Flight.SCHEDULED, scheduled_departure=departure,
+                      scheduled_arrival=departure + timedelta(hours=2))
+
+    def legs(self, *flight_ids, seat_no=None):
+        return [{'flight_id': flight_id, 'fare_conditions': 'Economy', 'seat_no': seat_no} for flight_id in flight_ids]
+
+    def assertRolledBack(self, error):
+        self.assertIs(self.atomic.return_value.__exit__.call_args[0][0], error)
+        self.on_commit.assert_not_called()
+        self.record.assert_not_called()
+
+    def test_books_connection(self):
+        booking = book_itinerary(None, 'IVAN IVANOV', '1234 567890', self.legs(1, 2))
+        segments = self.create_segments.call_args[0][0]
+        self.assertEqual([(segment.flight_id, segment.fare_bucket) for segment in segments], [(1, 'M'), (2, 'M')])
+        self.assertEqual(len(self.create_passes.call_args[0][0]), 2)
+        self.assertEqual(booking.total_amount, sum(segment.price for segment in segments))
+        self.on_commit.assert_called_once()
+
+    def test_not_enough_seats(self):
+        self.inventory[2, 'Economy'].sold = 2
+        with self.assertRaisesMessage(ItineraryError, 'Нет свободных мест класса Economy на рейсе PG0002'):
+            book_itinerary(None, 'IVAN IVANOV', '1234 567890', self.legs(1, 2))
+        # Место на первом перелёте уже списано: его вернёт откат транзакции
+        self.assertRolledBack(ItineraryError)
+        self.create_booking.assert_not_called()
+
+    def test_chosen_seat_taken(self):
+        self.occupied = [(1, 1)]
+        with self.assertRaisesMessage(ItineraryError, 'Место 1A на рейсе PG0001 недоступно'):
+            book_itinerary(None, 'IVAN IVANOV', '1234 567890', self.legs(1, seat_no='1A'))
+        self.assertRolledBack(ItineraryError)
+
+    def test_seat_taken_concurrently(self):
+        # Параллельная бронь заняла кресло после чтения занятости: срабатывает уникальный индекс
+        self.create_passes.side_effect = IntegrityError('boarding_passes_flight_id_seat_id_key')
+        with self.assertRaises(IntegrityError):
+            book_itinerary(None, 'IVAN IVANOV', '1234 567890', self.legs(1))
+        self.assertRolledBack(IntegrityError)
+
+    def test_legs_in_time_order(self):
+        with self.assertRaisesMessage(ItineraryError, 'Рейс PG0001 вылетает раньше прилёта предыдущего'):
+            book_itinerary(None, 'IVAN IVANOV', '1234 567890', self.legs(2, 1))
+        self.ensure_inventory.assert_not_called()
+
+    def test_overlapping_legs(self):
+        self.flights[2].scheduled_departure = self.flights[1].scheduled_arrival
+        with self.assertRaises(ItineraryError):
+            book_itinerary(None, 'IVAN IVANOV', '1234 567890', self.legs(1, 2))
+        self.ensure_inventory.assert_not_called()
+
+
+class SeatMapEncodingTests(SimpleTestCase):
+    def layout(self, seats):
+        with mock.patch.object(Seat.objects, 'filter') as filter_:
+            filter_.return_value.values_list.return_value = seats
+            return seatmap.build_layout('773')
+
+    def test_layout_rows(self):
+        layout = self.layout([(3, '2A', 'Economy'), (1, '1A', 'Business'), (5, '10A', 'Economy'),
+                              (2, '1C', 'Business'), (4, '2C', 'Economy')])
+        # Ряды по номеру, а не по строке: 10 после 2
+        self.assertEqual(layout['rows'], [[1, 'AC', 'B'], [2, 'AC', 'E'], [10, 'A', 'E']])
+        self.assertEqual(layout['seat_numbers'], ['1A', '1C', '2A', '2C', '10A'])
+        self.assertEqual(layout['index'], {1: 0, 2: 1, 3: 2, 4: 3, 5: 4})
+
+    def test_occupancy_bitmap(self):
+        layout = {'index': {seat_id: seat_id - 1 for seat_id in range(1, 11)}, 'seat_numbers': [''] * 10}
+        # Младший бит первым; место не из раскладки пропускается
+        self.assertEqual(seatmap.occupancy_bitmap(layout, [1, 4, 10, 99]), bytes([0b00001001, 0b00000010]))
+        self.assertEqual(seatmap.occupancy_bitmap(layout, []), bytes(2))
+
+    def test_seat_map(self):
+        layout = self.layout([(1, '1A', 'Economy'), (2, '1B', 'Economy'), (3, '1C', 'Economy')])
+        with mock.patch.object(seatmap, 'get_layout', return_value=layout), \
+                mock.patch.object(seatmap, 'cached_seat_state', return_value=('773', [2])) as state:
+            data, etag = seatmap.seat_map(7)
+            state.return_value = ('773', [2, 3])
+            _, changed = seatmap.seat_map(7)
+        self.assertEqual(base64.b64decode(data['occupied']), bytes([0b010]))
+        self.assertEqual(data['free'], 2)
+        self.assertNotEqual(etag, changed)
+
+
+class BoardingPlannerTests(SimpleTestCase):
+    layout = {'rows': [[1, 'AC', 'B'], [2, 'ABCDEF', 'E'], [20, 'ABCDEF', 'E']]}
+
+    def boarding_pass(self, seat_no, fare_conditions='Economy'):
+        return SimpleNamespace(seat=SimpleNamespace(seat_no=seat_no, fare_conditions=fare_conditions))
+
+    def test_letter_positions(self):
+        positions = boarding.letter_positions(self.layout)
+        self.assertEqual([positions[2, letter] for letter in 'ABCDEF'], [0, 1, 2, 2, 1, 0])
+        self.assertEqual(positions[1, 'C'], 0)
+
+    def test_back_to_front_zones(self):
+        # 20 рядов на 4 зоны по 5 рядов, бизнес всегда первым
+        groups = [boarding.boarding_group(seat_no, 'Economy', boarding.BACK_TO_FRONT, {}, 20)
+                  for seat_no in ('20A', '16A', '15A', '1A')]
+        self.assertEqual(groups, [2, 2, 3, 5])
+        self.assertEqual(boarding.boarding_group('1A', 'Business', boarding.BACK_TO_FRONT, {}, 20), 1)
+
+    def test_window_middle_aisle(self):
+        positions = boarding.letter_positions(self.layout)
+        groups = [boarding.boarding_group(f'2{letter}', 'Economy', boarding.WINDOW_MIDDLE_AISLE, positions, 20)
+                  for letter in 'ACD']
+        self.assertEqual(groups, [2, 4, 4])
+
+    def test_plan_flight(self):
+        departure = utc(2026, 10, 20, 10, 0)
+        passes = [self.boarding_pass('2A'), self.boarding_pass('1A', 'Business'),
+                  self.boarding_pass('20F'), self.boarding_pass('20A')]
+        with mock.patch.object(boarding, 'get_layout', return_value=self.layout):
+            planned = boarding.plan_flight(passes, '773', departure, boarding.BACK_TO_FRONT)
+        self.assertEqual([bp.seat.seat_no for bp in planned], ['1A', '20A', '20F', '2A'])
+        self.assertEqual([bp.boarding_no for bp in planned], [1, 2, 3, 4])
+        self.assertEqual([bp.boarding_group for bp in planned], [1, 2, 2, 5])
+        self.assertEqual(planned[0].boarding_time, departure - boarding.BOARDING_START)
+        self.assertEqual(planned[3].boarding_time, departure - boarding.BOARDING_START + 4 * boarding.GROUP_INTERVAL)
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            boarding.plan_boarding([1], strategy='random')
+
+
+class BoardingPassPayloadTests(SimpleTestCase):
+    data = {
+        'passenger_name': 'Иванов Иван', 'book_ref': '00A1B2', 'route_no': 'PG0403',
+        'departure_code': 'SVO', 'arrival_code': 'LED', 'departure_day_of_year': 45,
+        'fare_conditions': 'Business', 'seat_no': '2A', 'boarding_no': 5,
+    }
+
+    def test_name(self):
+        self.assertEqual(bcbp_name('Щукина Алёна Юрьевна'), 'SHCHUKINA/ALENA IUREVNA')
+        self.assertEqual(bcbp_name('IVANOV'), 'IVANOV')
+
+    def test_payload(self):
+        payload = bcbp_payload(self.data)
+        self.assertEqual(len(payload), 60)
+        self.assertEqual(
+            payload,
+            'M1' 'IVANOV/IVAN         ' 'E' '00A1B2 ' 'SVO' 'LED' 'PG ' '0403 ' '045' 'J' '002A' '0005 ' '1' '00',
+        )
+
+    def test_payload_without_boarding_number(self):
+        payload = bcbp_payload({**self.data, 'boarding_no': None, 'seat_no': '12C', 'fare_conditions': 'Economy'})
+        self.assertEqual(payload[47:58], 'Y012C0000 1')
+
+
+class FlightLocalDateTests(SimpleTestCase):
+    def setUp(self):
+        for target, attribute in ((db_models.Model, 'save'), (models.transaction, 'atomic'), (OutboxEvent, 'record')):
+            patcher = mock.patch.object(target, attribute)
+            self.addCleanup(patcher.stop)
+            patcher.start()
+        patcher = mock.patch.object(models, 'local_date', wraps=models.local_date)
+        self.addCleanup(patcher.stop)
+        self.local_date = patcher.start()
+
+    def loaded(self):
+        departure = utc(2026, 10, 20, 22, 30)
+        fields = [field.attname for field in Flight._meta.concrete_fields]
+        values = {'flight_id': 1, 'route_id': 'PG0001', 'status': Flight.SCHEDULED, 'scheduled_departure': departure,
+                  'scheduled_arrival': departure + timedelta(hours=2), 'departure_local_date': departure.date()}
+        flight = Flight.from_db('default', fields, [values.get(name) for name in fields])
+        flight.route = Route(route_no='PG0001', departure_airport=models.Airport(airport_code='SVO',
+                                                                                 timezone='Europe/Moscow'))
+        return flight
+
+    def test_status_change_keeps_local_date(self):
+        flight = self.loaded()
+        flight.status = Flight.DELAYED
+        flight.save(update_fields=['status'])
+        flight.save()
+        self.local_date.assert_not_called()
+        db_models.Model.save.assert_called_with()
+
+    def test_reschedule_recomputes_local_date(self):
+        flight = self.loaded()
+        flight.save(update_fields=['scheduled_departure'])
+        # 22:30 UTC — уже следующий день в Москве
+        self.assertEqual(flight.departure_local_date, date(2026, 10, 21))
+        self.assertEqual(db_models.Model.save.call_args.kwargs['update_fields'],
+                         ['scheduled_departure', 'departure_local_date'])
+
+        flight.scheduled_departure -= timedelta(hours=3)
+        flight.save()
+        self.assertEqual(flight.departure_local_date, date(2026, 10, 20))
+        self.assertEqual(self.local_date.call_count, 2)
+
+
+class TicketSearchTests(SimpleTestCase):
+    def lookups(self, query):
+        return [(child.lhs.target.name, child.rhs) for child in search_queryset(query).query.where.children[0].children]
+
+    def test_document_case_kept(self):
+        self.assertEqual(normalize_query('  ab\t 12c  '), 'ab 12c')
+        lookups = self.lookups('ab12c')
+        # Документ — как введён и в верхнем регистре, номера билета и брони — в верхнем
+        self.assertIn(('passenger_id', 'ab12c'), lookups)
+        self.assertIn(('passenger_id', 'AB12C'), lookups)
+        self.assertIn(('ticket_no', 'AB12C'), lookups)
+        self.assertNotIn(('ticket_no', 'ab12c'), lookups)
+
+
+class RestoreBackupTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        # Самый новый бэкап без манифеста: выгрузка манифеста не удалась
+        for name in ('2026-10-01.backup', '2026-10-01.manifest.json', '2026-10-02.backup',
+                     '2026-10-03.backup', '2026-10-03.manifest.json', '2026-10-04.backup'):
+            open(os.path.join(self.root, name), 'w').close()
+        self.storage = LocalBackupStorage(self.root)
+
+    def restore(self, **options):
+        with mock.patch('airline_app.management.commands.restore_backup.backup_storage', return_value=self.storage):
+            call_command('restore_backup', **options)
+
+    def test_verified_backups(self):
+        self.assertEqual(verified_backups(self.storage), ['2026-10-01.backup', '2026-10-03.backup'])
+
+    def test_latest_with_manifest(self):
+        with mock.patch.object(self.storage, 'fetch', side_effect=CommandError('stop')) as fetch:
+            with self.assertRaises(CommandError):
+                self.restore(stdout=io.StringIO())
+        fetch.assert_called_once_with('2026-10-03.backup', mock.ANY)
+
+    def test_no_manifest(self):
+        with self.assertRaisesMessage(CommandError, 'нет манифеста'):
+            self.restore(backup='2026-10-04.backup')
+        for name in os.listdir(self.root):
+            if name.endswith('.manifest.json'):
+                os.remove(os.path.join(self.root, name))
+        with self.assertRaisesMessage(CommandError, 'Бэкапы с манифестом не найдены'):
+            self.restore()
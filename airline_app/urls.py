@@ -9,13 +9,31 @@ urlpatterns = [
     path('register/', views.register, name='register'),
     path('profile/', views.profile, name='profile'),
     path('export/', views.export_page, name='export_page'),
+    path('export/jobs/', views.export_job_create, name='export_job_create'),
+    path('export/jobs/<int:job_id>/status/', views.export_job_status, name='export_job_status'),
+    path('export/jobs/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
     path('export/flights/csv/', views.export_flights_csv, name='export_flights_csv'),
     path('export/flights/json/', views.export_flights_json, name='export_flights_json'),
     path('export/flights/upcoming/csv/', views.export_upcoming_flights_csv, name='export_upcoming_flights_csv'),
     path('export/flights/upcoming/json/', views.export_upcoming_flights_json, name='export_upcoming_flights_json'),
+    path('manager/search/', views.manager_search, name='manager_search'),
+    path('manager/profiles/', views.request_profiles, name='request_profiles'),
+    path('manager/profiles/<str:profile_id>/', views.request_profile_detail, name='request_profile_detail'),
     path('flights/', views.flight_search, name='flight_search'),
     path('book/<int:flight_id>/', views.book_flight, name='book_flight'),
+    path('book/itinerary/', views.book_itinerary_view, name='book_itinerary'),
+    path('boarding-pass/<str:ticket_no>/', views.ticket_boarding_pass, name='ticket_boarding_pass'),
+    path('flights/<int:flight_id>/boarding-passes/', views.flight_boarding_passes, name='flight_boarding_passes'),
     path('payment/<str:book_ref>/', views.payment_page, name='payment_page'),
     path('payment/success/<str:book_ref>/', views.payment_success, name='payment_success'),
+    path('api/flights/<int:flight_id>/seats/', views.flight_seat_map, name='flight_seat_map'),
+    path('api/flights/<int:flight_id>/disruption/', views.flight_disruption, name='flight_disruption'),
+    path('api/flights/<int:flight_id>/forecast/', views.flight_booking_forecast, name='flight_booking_forecast'),
+    path('api/flights/<int:flight_id>/inventory/', views.flight_inventory, name='flight_inventory'),
+    path('api/fare-calendar/', views.fare_calendar_view, name='fare_calendar'),
     path('api/airports/', views.airport_autocomplete, name='airport_autocomplete'),
+    path('api/manager/search/', views.manager_search_api, name='manager_search_api'),
+    path('api/ratelimit/metrics/', views.rate_limit_metrics, name='rate_limit_metrics'),
+    path('api/jobs/metrics/', views.job_metrics, name='job_metrics'),
+    path('api/changes/', views.change_feed, name='change_feed'),
 ]
\ No newline at end of file
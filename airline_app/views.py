@@ -1,22 +1,44 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
+from django.core.cache import cache
+from django.conf import settings
 from django.contrib.auth import logout
-from django.contrib.auth.models import Group
 from django.utils import timezone
-from django.db import transaction
-from django.db import models
-from datetime import timedelta
+from django.utils.cache import get_conditional_response
+from django.db import transaction, IntegrityError
+from datetime import date, timedelta
 from django.db.models import Q
 import csv
+import hashlib
 import json
-from django.http import HttpResponse, JsonResponse
-from .models import Flight, Booking, Ticket, Segment, Airport, Payment, Seat, BoardingPass
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404, StreamingHttpResponse
+from django.urls import reverse
+from .models import (Flight, Booking, Ticket, Airport, Payment, ExportJob, OutboxEvent, BookingCurve, BookingForecast,
+                     FlightInventory)
+from .geo import nearby_airports
+from .seatmap import seat_map
+from .roles import CLIENTS_GROUP, group_id, is_manager_or_staff
+from .boarding_docs import render_flight_manifest, render_ticket_passes
+from . import ratelimit
+from . import jobs as job_queue
+from .ratelimit import rate_limited
+from . import httpcache
+from .httpcache import conditional
+from .pricing import FARE_BUCKETS, fare_price
+from .fares import fare_calendar, month_bounds
+from .flightsearch import cached_search, record_search, search_queryset
+from .search import MIN_QUERY_LENGTH, search_tickets
+from .itinerary import MAX_LEGS, ItineraryError, book_itinerary
+from .disruption import disruption_impact
+from . import profiling
+from . import changefeed
+from . import inventory
+import os
 import re
 import uuid
-import random
-import string
 
 def custom_logout(request):
     logout(request)
@@ -30,8 +52,7 @@ def register(request):
         form = UserCreationForm(request.POST)
         if form.is_valid():
             user = form.save()
-            clients_group = Group.objects.get(name='Clients')
-            user.groups.add(clients_group)
+            user.groups.add(group_id(CLIENTS_GROUP))
             messages.success(request, 'Регистрация успешна!')
             return redirect('login')
     else:
@@ -40,17 +61,80 @@ def register(request):
 
 @login_required
 def profile(request):
-    if request.user.is_staff or request.user.groups.filter(name='Managers').exists():
+    if is_manager_or_staff(request.user):
         return redirect('/admin/')
     return render(request, 'profile.html')
 
-def is_manager_or_staff(user):
-    return user.is_staff or user.groups.filter(name='Managers').exists()
-
 @login_required
 @user_passes_test(is_manager_or_staff)
 def export_page(request):
-    return render(request, 'export.html')
+    jobs = ExportJob.objects.filter(user=request.user).order_by('-created_at')[:20]
+    return render(request, 'export.html', {
+        'jobs': jobs,
+        'datasets': ExportJob.DATASET_CHOICES,
+        'formats': ExportJob.FORMAT_CHOICES,
+        'flight_statuses': Flight.STATUS_CHOICES,
+    })
+
+@login_required
+@user_passes_test(is_manager_or_staff)
+def export_job_create(request):
+    if request.method != 'POST':
+        return redirect('export_page')
+
+    dataset = request.POST.get('dataset')
+    file_format = request.POST.get('file_format', 'csv')
+    if dataset not in dict(ExportJob.DATASET_CHOICES) or file_format not in dict(ExportJob.FORMAT_CHOICES):
+        messages.error(request, 'Неверные параметры экспорта.')
+        return redirect('export_page')
+
+    filters = {}
+    for key in ('date_from', 'date_to'):
+        value = request.POST.get(key, '').strip()
+        if value:
+            try:
+                filters[key] = date.fromisoformat(value).isoformat()
+            except ValueError:
+                messages.error(request, f'Неверная дата: {value}')
+                return redirect('export_page')
+    if dataset == 'flights' and request.POST.get('status') in dict(Flight.STATUS_CHOICES):
+        filters['status'] = request.POST['status']
+    if dataset == 'bookings' and request.POST.get('is_paid') in ('0', '1'):
+        filters['is_paid'] = request.POST['is_paid']
+
+    job = ExportJob.objects.create(
+        user=request.user,
+        dataset=dataset,
+        file_format=file_format,
+        compress=bool(request.POST.get('compress')),
+        filters=filters,
+    )
+    job_queue.enqueue('run_export', {'job_id': job.pk})
+    messages.success(request, f'Задание экспорта #{job.pk} поставлено в очередь.')
+    return redirect('export_page')
+
+@login_required
+@user_passes_test(is_manager_or_staff)
+def export_job_status(request, job_id):
+    job = get_object_or_404(ExportJob, pk=job_id, user=request.user)
+    return JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'rows_total': job.rows_total,
+        'rows_written': job.rows_written,
+        'progress': job.progress,
+        'error': job.error,
+        'download_url': reverse('export_job_download', args=[job.pk]) if job.status == ExportJob.DONE else None,
+    })
+
+@login_required
+@user_passes_test(is_manager_or_staff)
+def export_job_download(request, job_id):
+    job = get_object_or_404(ExportJob, pk=job_id, user=request.user, status=ExportJob.DONE)
+    if not os.path.exists(job.file_path):
+        raise Http404('Файл экспорта не найден')
+    return FileResponse(open(job.file_path, 'rb'), as_attachment=True, filename=job.filename)
 
 @login_required
 @user_passes_test(is_manager_or_staff)
@@ -100,13 +184,11 @@ def export_flights_json(request):
 @login_required
 @user_passes_test(is_manager_or_staff)
 def export_upcoming_flights_csv(request):
-    from datetime import date, timedelta
-
-    today = date.today()
+    today = timezone.localdate()
     seven_days_later = today + timedelta(days=7)
 
     flights = Flight.objects.filter(
-        scheduled_departure__date__range=[today, seven_days_later]
+        departure_local_date__range=[today, seven_days_later]
     ).select_related('route__departure_airport', 'route__arrival_airport')
 
     response = HttpResponse(content_type='text/csv')
@@ -117,7 +199,7 @@ def export_upcoming_flights_csv(request):
                      'Вылет', 'Прилет', 'Статус', 'Дней до вылета'])
 
     for flight in flights:
-        days_until = (flight.scheduled_departure.date() - today).days
+        days_until = (flight.departure_local_date - today).days
         writer.writerow([
             flight.flight_id,
             flight.route.route_no,
@@ -134,18 +216,16 @@ def export_upcoming_flights_csv(request):
 @login_required
 @user_passes_test(is_manager_or_staff)
 def export_upcoming_flights_json(request):
-    from datetime import date, timedelta
-
-    today = date.today()
+    today = timezone.localdate()
     seven_days_later = today + timedelta(days=7)
 
     flights = Flight.objects.filter(
-        scheduled_departure__date__range=[today, seven_days_later]
+        departure_local_date__range=[today, seven_days_later]
     ).select_related('route__departure_airport', 'route__arrival_airport')
 
     data = []
     for flight in flights:
-        days_until = (flight.scheduled_departure.date() - today).days
+        days_until = (flight.departure_local_date - today).days
         data.append({
             'flight_id': flight.flight_id,
             'route_no': flight.route.route_no,
@@ -165,45 +245,78 @@ def export_upcoming_flights_json(request):
         'flights': data
     }, safe=False, json_dumps_params={'ensure_ascii': False, 'indent': 2})
 
-def flight_search(request):
-    flights = Flight.objects.select_related(
-        'route__departure_airport',
-        'route__arrival_airport',
-        'route__airplane'
-    ).filter(scheduled_departure__gte=timezone.now())
-
+MAX_SEARCH_RADIUS_KM = 500
+
+def extract_code(query):
+    match = re.search(r'\(([A-Z0-9]{3})\)$', query)
+    if match:
+        return match.group(1)
+    return query
+
+def get_search_radius(request):
+    try:
+        radius = int(request.GET.get('radius') or 0)
+    except ValueError:
+        return 0
+    return max(0, min(radius, MAX_SEARCH_RADIUS_KM))
+
+AIRPORT_CODES_TIMEOUT = 60 * 60
+
+def resolve_airport_codes(query, radius=0):
+    # Зависит только от справочника аэропортов; ETag-функции вызывают это до view, поэтому кэш
+    key = 'airport_codes:{}:{}:{}'.format(
+        httpcache.data_versions(httpcache.AIRPORTS)[0], radius, hashlib.sha1(query.encode()).hexdigest()[:16],
+    )
+    codes = cache.get(key)
+    if codes is None:
+        codes = set(Airport.objects.search(extract_code(query)).values_list('airport_code', flat=True))
+        if radius and codes:
+            codes.update(nearby_airports(codes, radius))
+        cache.set(key, codes, AIRPORT_CODES_TIMEOUT)
+    return codes
+
+def route_domains(request):
+    """Версии данных для поиска по паре городов; занятость мест — по парам аэропортов запроса.
+
+    Без обеих точек общей версии занятости бронирования не меняют: такой ответ
+    обновляется по time_bucket.
+    """
+    domains = [httpcache.FLIGHTS, httpcache.AIRPORTS, httpcache.SEATS, httpcache.INVENTORY]
     departure_query = request.GET.get('departure', '').strip()
     arrival_query = request.GET.get('arrival', '').strip()
-    date_str = request.GET.get('date')
-
-    def extract_code(query):
-        match = re.search(r'\(([A-Z0-9]{3})\)$', query)
-        if match:
-            return match.group(1)
-        return query
-
-    if departure_query:
-        clean_dep = extract_code(departure_query)
-        flights = flights.filter(
-            Q(route__departure_airport__airport_code__icontains=clean_dep) |
-            Q(route__departure_airport__city__icontains=clean_dep)
+    if departure_query and arrival_query:
+        radius = get_search_radius(request)
+        domains += httpcache.route_scopes(
+            httpcache.SEATS, resolve_airport_codes(departure_query, radius), resolve_airport_codes(arrival_query, radius),
         )
+    return domains
 
-    if arrival_query:
-        clean_arr = extract_code(arrival_query)
-        flights = flights.filter(
-            Q(route__arrival_airport__airport_code__icontains=clean_arr) |
-            Q(route__arrival_airport__city__icontains=clean_arr)
-        )
-
-    if date_str:
-        try:
-            # Тут фильтруем конкретно по дню
-            flights = flights.filter(scheduled_departure__date=date_str)
-        except ValueError:
-            pass
+@rate_limited('flight_search')
+@conditional('flight_search', route_domains, per_user=True, time_bucket=60)
+def flight_search(request):
+    departure_query = request.GET.get('departure', '').strip()
+    arrival_query = request.GET.get('arrival', '').strip()
+    date_str = request.GET.get('date')
+    radius = get_search_radius(request)
+
+    departure_codes = resolve_airport_codes(departure_query, radius) if departure_query else None
+    arrival_codes = resolve_airport_codes(arrival_query, radius) if arrival_query else None
+    try:
+        day = date.fromisoformat(date_str) if date_str else None
+    except ValueError:
+        day = None
+
+    if departure_codes is not None and arrival_codes is not None and day is not None:
+        # Основной сценарий: результаты кэшируются и прогреваются (см. warmup)
+        flights = cached_search(departure_codes, arrival_codes, day)
+        record_search(departure_codes, arrival_codes, day)
+    else:
+        flights = list(search_queryset(departure_codes, arrival_codes, day))
 
-    flights = flights.order_by('scheduled_departure')
+    # Места и цена по квотам — те же, что разрешит book_itinerary
+    offers = inventory.flight_offers([flight.flight_id for flight in flights])
+    for flight in flights:
+        flight.available_seats, flight.min_price = offers.get(flight.flight_id, (0, None))
 
     return render(request, 'flight_search.html', {'flights': flights})
 
@@ -211,77 +324,83 @@ def flight_search(request):
 @login_required
 def book_flight(request, flight_id):
     flight = get_object_or_404(Flight, pk=flight_id)
-    base_price = 5500
 
     if request.method == 'POST':
         try:
-            with transaction.atomic():
-                passenger_name = request.POST.get('passenger_name')
-                passenger_id = request.POST.get('passenger_id')
-                fare_conditions = request.POST.get('fare_conditions')
-
-                price = base_price
-                if fare_conditions == 'Business':
-                    price = int(base_price * 3)
-                elif fare_conditions == 'Comfort':
-                    price = int(base_price * 1.5)
-
-                book_ref = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-                booking = Booking.objects.create(
-                    book_ref=book_ref,
-                    book_date=timezone.now(),
-                    total_amount=price,
-                    user=request.user,
-                    is_paid=False
-                )
-
-                ticket_no = ''.join(random.choices(string.digits, k=13))
-                ticket = Ticket.objects.create(
-                    ticket_no=ticket_no,
-                    booking=booking,
-                    passenger_id=passenger_id,
-                    passenger_name=passenger_name,
-                    outbound=True
-                )
-
-                Segment.objects.create(
-                    ticket=ticket,
-                    flight=flight,
-                    fare_conditions=fare_conditions,
-                    price=price
-                )
-
-                airplane = flight.route.airplane
-
-                occupied_seat_ids = BoardingPass.objects.filter(flight=flight).values_list('seat_id', flat=True)
-
-                available_seats_qs = Seat.objects.filter(
-                    airplane=airplane,
-                    fare_conditions=fare_conditions
-                ).exclude(id__in=occupied_seat_ids)
-
-                if not available_seats_qs.exists():
-                    raise Exception(f"Нет свободных мест класса {fare_conditions}!")
-
-                assigned_seat = random.choice(list(available_seats_qs))
-
-                b_time = flight.scheduled_departure - timedelta(minutes=40)
-
-                BoardingPass.objects.create(
-                    ticket=ticket,
-                    flight=flight,
-                    seat=assigned_seat,
-                    boarding_no=random.randint(1, 200),
-                    boarding_time=b_time
-                )
-
-                return redirect('payment_page', book_ref=book_ref)
-
+            booking = book_itinerary(
+                request.user,
+                request.POST.get('passenger_name'),
+                request.POST.get('passenger_id'),
+                [{
+                    'flight_id': flight.flight_id,
+                    'fare_conditions': request.POST.get('fare_conditions'),
+                    'seat_no': request.POST.get('seat', 'Auto'),
+                }],
+            )
+            return redirect('payment_page', book_ref=booking.book_ref)
+
+        except IntegrityError:
+            messages.error(request, "Ошибка при бронировании: место уже занято, выберите другое.")
+            return redirect('book_flight', flight_id=flight_id)
         except Exception as e:
             messages.error(request, f"Ошибка при бронировании: {e}")
             return redirect('book_flight', flight_id=flight_id)
 
-    return render(request, 'book_flight.html', {'flight': flight, 'base_price': base_price})
+    return render(request, 'book_flight.html', {'flight': flight, 'fares': inventory.class_prices([flight.flight_id])})
+
+def itinerary_directions(flights):
+    # Перелёт считается обратным, если он возвращает в аэропорт, откуда уже вылетали
+    directions = []
+    departed_from = set()
+    returning = False
+    for flight in flights:
+        returning = returning or flight.route.arrival_airport_id in departed_from
+        departed_from.add(flight.route.departure_airport_id)
+        directions.append(not returning)
+    return directions
+
+@login_required
+def book_itinerary_view(request):
+    try:
+        flight_ids = [int(part) for part in request.GET.get('flights', '').split(',') if part.strip()]
+    except ValueError:
+        flight_ids = []
+    flights = Flight.objects.select_related(
+        'route__departure_airport', 'route__arrival_airport', 'route__airplane'
+    ).in_bulk(flight_ids[:MAX_LEGS])
+    flights = sorted((flights[pk] for pk in set(flight_ids) if pk in flights), key=lambda f: f.scheduled_departure)
+    if not flights:
+        messages.error(request, "Выберите рейсы маршрута в поиске.")
+        return redirect('flight_search')
+
+    legs = [{'flight': flight, 'outbound': outbound} for flight, outbound in zip(flights, itinerary_directions(flights))]
+
+    if request.method == 'POST':
+        fare_conditions = request.POST.get('fare_conditions')
+        try:
+            booking = book_itinerary(
+                request.user,
+                request.POST.get('passenger_name'),
+                request.POST.get('passenger_id'),
+                [{
+                    'flight_id': leg['flight'].flight_id,
+                    'fare_conditions': fare_conditions,
+                    'seat_no': request.POST.get(f"seat_{leg['flight'].flight_id}", 'Auto'),
+                    'outbound': leg['outbound'],
+                } for leg in legs],
+            )
+            return redirect('payment_page', book_ref=booking.book_ref)
+        except IntegrityError:
+            messages.error(request, "Ошибка при бронировании: одно из мест уже занято, выберите другое.")
+        except ItineraryError as e:
+            messages.error(request, f"Ошибка при бронировании: {e}")
+        return redirect(f"{reverse('book_itinerary')}?flights={','.join(str(f.flight_id) for f in flights)}")
+
+    return render(request, 'book_itinerary.html', {
+        'legs': legs,
+        'fares': inventory.class_prices([flight.flight_id for flight in flights]),
+    })
+
 def payment_page(request, book_ref):
     booking = get_object_or_404(Booking, book_ref=book_ref, user=request.user)
     return render(request, 'payment.html', {'booking': booking})
@@ -291,17 +410,24 @@ def payment_success(request, book_ref):
     booking = get_object_or_404(Booking, book_ref=book_ref)
 
     if not booking.is_paid:
-        booking.is_paid = True
-        booking.save()
-
         transaction_id = str(uuid.uuid4()).replace('-', '')[:16].upper()
 
-        Payment.objects.create(
-            payment_id=transaction_id,
-            booking=booking,
-            amount=booking.total_amount,
-            payment_method='Bank Card (Test)'
-        )
+        with transaction.atomic():
+            booking.is_paid = True
+            booking.save()
+
+            payment = Payment.objects.create(
+                payment_id=transaction_id,
+                booking=booking,
+                amount=booking.total_amount,
+                payment_method='Bank Card (Test)'
+            )
+
+            OutboxEvent.record('payment.succeeded', 'payment', transaction_id, {
+                'book_ref': booking.book_ref,
+                'amount': str(payment.amount),
+                'payment_method': payment.payment_method,
+            })
 
         messages.success(request, f'Оплата прошла успешно! Транзакция №{transaction_id}')
     else:
@@ -309,23 +435,237 @@ def payment_success(request, book_ref):
 
     return redirect('profile')
 
+@login_required
+def ticket_boarding_pass(request, ticket_no):
+    ticket = get_object_or_404(Ticket.objects.select_related('booking'), ticket_no=ticket_no)
+    if ticket.booking.user_id != request.user.pk and not is_manager_or_staff(request.user):
+        raise Http404('Билет не найден')
+    return render(request, 'boarding_passes.html', {
+        'title': f'Посадочный талон — билет {ticket_no}',
+        'docs': render_ticket_passes(ticket_no),
+    })
+
+@login_required
+@user_passes_test(is_manager_or_staff)
+def flight_boarding_passes(request, flight_id):
+    flight = get_object_or_404(Flight.objects.select_related('route'), pk=flight_id)
+    return render(request, 'boarding_passes.html', {
+        'title': f'Посадочные талоны рейса {flight.route.route_no} ({flight.scheduled_departure:%d.%m.%Y})',
+        'docs': render_flight_manifest(flight_id),
+    })
+
+@rate_limited('fare_calendar')
+@conditional('fare_calendar', route_domains, time_bucket=300)
+def fare_calendar_view(request):
+    departure_query = request.GET.get('departure', '').strip()
+    arrival_query = request.GET.get('arrival', '').strip()
+    month = request.GET.get('month') or timezone.localdate().strftime('%Y-%m')
+    if not departure_query or not arrival_query:
+        return JsonResponse({'error': 'Укажите departure и arrival'}, status=400)
+    try:
+        month_bounds(month)
+    except ValueError:
+        return JsonResponse({'error': 'Месяц в формате ГГГГ-ММ'}, status=400)
+
+    radius = get_search_radius(request)
+    departure_codes = resolve_airport_codes(departure_query, radius)
+    arrival_codes = resolve_airport_codes(arrival_query, radius)
+    days = fare_calendar(departure_codes, arrival_codes, month) if departure_codes and arrival_codes else []
+
+    return JsonResponse({
+        'departure': sorted(departure_codes),
+        'arrival': sorted(arrival_codes),
+        'month': month,
+        'days': days,
+    }, json_dumps_params={'ensure_ascii': False})
+
+def flight_seat_map(request, flight_id):
+    data, etag = seat_map(flight_id)
+    if data is None:
+        raise Http404('Рейс не найден')
+
+    # Разбор If-None-Match по RFC 9110: списки, * и слабые W/ ETag
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(data)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@rate_limited('airport_autocomplete')
+@conditional('airport_autocomplete', [httpcache.AIRPORTS])
 def airport_autocomplete(request):
     term = request.GET.get('term', '').lower()
     if len(term) < 2:
         return JsonResponse([], safe=False)
 
-    airports = Airport.objects.filter(
-        models.Q(airport_code__icontains=term) |
-        models.Q(city__icontains=term)
-    )[:10]
+    airports = list(Airport.objects.search(term).order_by_city()[:10])
 
     results = []
     for airport in airports:
-        city_name = airport.city.get('ru', airport.city.get('en', ''))
         results.append({
-            'label': f"{city_name} ({airport.airport_code})",
+            'label': f"{airport.city_name} ({airport.airport_code})",
             'value': airport.airport_code
         })
 
+    radius = get_search_radius(request)
+    if radius and airports and len(airports) < 10:
+        matched = {airport.airport_code for airport in airports}
+        nearby = nearby_airports(matched, radius)
+        extra_codes = sorted((code for code in nearby if code not in matched), key=nearby.get)[:10 - len(airports)]
+        extra = Airport.objects.in_bulk(extra_codes)
+        for code in extra_codes:
+            results.append({
+                'label': f"{extra[code].city_name}, {nearby[code]:.0f} км ({code})",
+                'value': code,
+                'distance_km': round(nearby[code]),
+            })
+
     return JsonResponse(results, safe=False)
 
+@login_required
+@user_passes_test(is_manager_or_staff)
+def flight_disruption(request, flight_id):
+    flight = get_object_or_404(Flight.objects.select_related('route'), pk=flight_id)
+    try:
+        delay = timedelta(minutes=int(request.GET.get('delay', 0)))
+    except ValueError:
+        return JsonResponse({'error': 'delay — целое число минут'}, status=400)
+
+    impact = disruption_impact(flight, delay)
+    return JsonResponse({
+        'flight_id': flight.flight_id,
+        'status': flight.status,
+        'expected_arrival': impact['expected_arrival'].isoformat(),
+        'tickets': [segment.ticket_id for segment in impact['segments']],
+        'broken_connections': [
+            {'ticket_no': segment.ticket_id, 'flight_id': segment.flight_id,
+             'scheduled_departure': segment.flight.scheduled_departure.isoformat()}
+            for segment in impact['broken_connections']
+        ],
+        'invalid_seats': [
+            {'ticket_no': bp.ticket_id, 'seat_no': bp.seat.seat_no} for bp in impact['invalid_passes']
+        ],
+    })
+
+@login_required
+@user_passes_test(is_manager_or_staff)
+def flight_booking_forecast(request, flight_id):
+    flight = get_object_or_404(Flight.objects.select_related('route'), pk=flight_id)
+    curves = {
+        curve.fare_conditions: curve for curve in BookingCurve.objects.filter(route_id=flight.route_id)
+    }
+    classes = []
+    for forecast in BookingForecast.objects.filter(flight=flight).order_by('fare_conditions'):
+        curve = curves.get(forecast.fare_conditions)
+        classes.append({
+            'fare_conditions': forecast.fare_conditions,
+            'capacity': forecast.capacity,
+            'booked': forecast.booked,
+            'forecast_booked': forecast.forecast_booked,
+            'forecast_load_factor': round(forecast.load_factor, 3),
+            'days_to_departure': forecast.days_to_departure,
+            # Сколько мест обычно продано к этому дню на маршруте — для сравнения темпа продаж
+            'typical_booked': round(curve.load[forecast.days_to_departure] * forecast.capacity, 1) if curve else None,
+            'curve': curve.load if curve else None,
+            'curve_flights': curve.flights if curve else 0,
+            'computed_at': forecast.computed_at.isoformat(),
+        })
+    return JsonResponse({'flight_id': flight.flight_id, 'route_no': flight.route_id, 'classes': classes})
+
+@login_required
+@user_passes_test(is_manager_or_staff)
+def flight_inventory(request, flight_id):
+    flight = get_object_or_404(Flight, pk=flight_id)
+    quotes = inventory.quote([flight.flight_id])
+    classes = []
+    for row in FlightInventory.objects.filter(flight=flight).order_by('fare_conditions'):
+        buckets = FARE_BUCKETS[row.fare_conditions]
+        classes.append({
+            'fare_conditions': row.fare_conditions,
+            'capacity': row.capacity,
+            'authorized': row.authorized,
+            'sold': row.sold,
+            'available': row.available,
+            'overbooked': row.overbooked,
+            'no_show_rate': row.no_show_rate,
+            'buckets': [
+                {'code': code, 'price': fare_price(row.fare_conditions, bucket=code), 'limit': limit,
+                 'open': row.sold < limit}
+                for (code, _, _), limit in zip(buckets, row.bucket_limits)
+            ],
+            'open_bucket': quotes[flight.flight_id, row.fare_conditions]['bucket'],
+            'optimized_at': row.optimized_at.isoformat(),
+        })
+    return JsonResponse({'flight_id': flight.flight_id, 'route_no': flight.route_id, 'classes': classes})
+
+@login_required
+@user_passes_test(is_manager_or_staff)
+def manager_search(request):
+    query = request.GET.get('q', '').strip()
+    return render(request, 'manager_search.html', {
+        'query': query,
+        'results': search_tickets(query) if query else [],
+        'min_length': MIN_QUERY_LENGTH,
+    })
+
+@login_required
+@user_passes_test(is_manager_or_staff)
+def manager_search_api(request):
+    query = request.GET.get('q', '').strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        return JsonResponse({'error': f'Минимум {MIN_QUERY_LENGTH} символа'}, status=400)
+    return JsonResponse({'query': query, 'results': search_tickets(query)}, json_dumps_params={'ensure_ascii': False})
+
+@login_required
+@user_passes_test(is_manager_or_staff)
+def change_feed(request):
+    entities = [e for e in request.GET.get('entities', '').split(',') if e] or list(changefeed.ENTITIES)
+    unknown = set(entities) - set(changefeed.ENTITIES)
+    if unknown:
+        return JsonResponse({'error': f"Неизвестные сущности: {', '.join(sorted(unknown))}"}, status=400)
+    try:
+        since = request.GET.get('since') or changefeed.INITIAL_CURSOR
+        changefeed.parse_cursor(since)
+        limit = min(int(request.GET.get('limit', changefeed.MAX_LIMIT)), changefeed.MAX_LIMIT)
+    except (changefeed.CursorError, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return StreamingHttpResponse(
+        changefeed.ndjson_stream(since, entities, limit), content_type='application/x-ndjson; charset=utf-8',
+    )
+
+@login_required
+@user_passes_test(is_manager_or_staff)
+def rate_limit_metrics(request):
+    return JsonResponse(ratelimit.metrics())
+
+@login_required
+@user_passes_test(is_manager_or_staff)
+def job_metrics(request):
+    return JsonResponse(job_queue.metrics())
+
+@staff_member_required
+def request_profiles(request):
+    return render(request, 'request_profiles.html', {
+        'profiles': profiling.list_profiles(),
+        'sample_rate': getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0),
+        'enabled': getattr(settings, 'PROFILING_ENABLED', True),
+    })
+
+@staff_member_required
+def request_profile_detail(request, profile_id):
+    record = profiling.load(profile_id)
+    if record is None:
+        raise Http404('Профиль не найден')
+    if request.GET.get('format') == 'folded':
+        response = HttpResponse(profiling.folded_stacks(record['stacks']), content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile_{profile_id}.folded"'
+        return response
+    scale = max(record['duration_ms'], 1)
+    for span in record['spans']:
+        span['left'] = round(span['start_ms'] / scale * 100, 2)
+        span['width'] = max(round(span['duration_ms'] / scale * 100, 2), 0.2)
+    return render(request, 'request_profile_detail.html', {
+        'profile': record,
+        'functions': profiling.top_functions(record['stacks']),
+    })
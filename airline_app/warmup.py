@@ -0,0 +1,144 @@
+"""Прогрев кэшей после деплоя и по расписанию.
+
+Самые востребованные пары «направление + дата» берутся из статистики поиска
+(search_activity) и свежих бронирований. Для каждой в пуле потоков заполняются
+кэш результатов поиска, схемы мест и занятость найденных рейсов и календарь цен
+на месяц; отдельно загружается матрица расстояний аэропортов с сеткой.
+
+Прогрев из другого процесса (run_jobs, manage.py warm_caches) нужен только с общим
+кэшем (SHARED_CACHE, например Redis): locmem заполнится у него самого, а не у
+веб-воркеров. Без общего кэша каждый веб-процесс прогревает себя при старте.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .fares import fare_calendar
+from .flightsearch import cached_search
+from .geo import distance_matrix
+from .models import Airport, SearchActivity, Segment
+from .seatmap import seat_map
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_DAYS = 7
+ACTIVITY_RETENTION_DAYS = 30
+# Одно бронирование весит как несколько поисков: за ним стоит реальный спрос
+BOOKING_WEIGHT = 5
+# Прогрев из нескольких процессов (воркеры gunicorn, планировщик) не должен идти одновременно
+LOCK_KEY = 'warmup:lock'
+LOCK_TIMEOUT = 10 * 60
+
+
+def hot_targets(limit, now=None):
+    """До limit пар ((аэропорты вылета), (аэропорты прилёта), дата) по убыванию спроса."""
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    scores = Counter()
+
+    for departure, arrival, flight_date, hits in (
+        SearchActivity.objects.filter(day__gte=today - timedelta(days=ACTIVITY_DAYS), flight_date__gte=today)
+        .values('departure', 'arrival', 'flight_date').annotate(total=Sum('hits'))
+        .order_by('-total').values_list('departure', 'arrival', 'flight_date', 'total')[:limit]
+    ):
+        scores[tuple(departure.split(',')), tuple(arrival.split(',')), flight_date] += hits
+
+    for departure, arrival, flight_date, booked in (
+        Segment.objects.filter(ticket__booking__book_date__gte=now - timedelta(days=ACTIVITY_DAYS),
+                               flight__scheduled_departure__gte=now,
+                               flight__departure_local_date__isnull=False)
+        .values('flight__route__departure_airport_id', 'flight__route__arrival_airport_id',
+                'flight__departure_local_date')
+        .annotate(booked=Count('pk')).order_by('-booked')
+        .values_list('flight__route__departure_airport_id', 'flight__route__arrival_airport_id',
+                     'flight__departure_local_date', 'booked')[:limit]
+    ):
+        scores[(departure,), (arrival,), flight_date] += booked * BOOKING_WEIGHT
+
+    return [target for target, _ in scores.most_common(limit)]
+
+
+def warm_target(target):
+    departure_codes, arrival_codes, day = target
+    try:
+        flights = cached_search(set(departure_codes), set(arrival_codes), day)
+        for flight in flights:
+            seat_map(flight.flight_id)
+        fare_calendar(set(departure_codes), set(arrival_codes), day.strftime('%Y-%m'))
+        return len(flights)
+    finally:
+        # Потоки пула не проходят через request_finished: соединение закрываем сами
+        connection.close()
+
+
+def warm_airports():
+    try:
+        # Сетка для поиска аэропортов рядом строится лениво при первом обращении
+        distance_matrix().grid
+        return Airport.objects.count()
+    finally:
+        connection.close()
+
+
+def warm_caches(top_n=None, threads=None):
+    top_n = top_n or getattr(settings, 'WARMUP_TOP_N', 50)
+    threads = threads or getattr(settings, 'WARMUP_THREADS', 4)
+    if not cache.add(LOCK_KEY, True, LOCK_TIMEOUT):
+        return {'skipped': True}
+    started = time.perf_counter()
+    try:
+        SearchActivity.objects.filter(
+            day__lt=timezone.localdate() - timedelta(days=ACTIVITY_RETENTION_DAYS)
+        ).delete()
+        targets = hot_targets(top_n)
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='warmup') as pool:
+            airports = pool.submit(warm_airports)
+            flights = sum(pool.map(warm_target, targets))
+            airports = airports.result()
+    finally:
+        cache.delete(LOCK_KEY)
+    return {
+        'skipped': False,
+        'targets': len(targets),
+        'flights': flights,
+        'airports': airports,
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+_startup = {'thread': None}
+_startup_lock = threading.Lock()
+
+
+def start_background_warmup():
+    """Прогрев в фоне при старте процесса, чтобы не задерживать приём запросов.
+
+    Вызывается из wsgi.py и asgi.py; повторный вызов в том же процессе ничего не делает.
+    """
+    if not getattr(settings, 'WARMUP_ON_STARTUP', False):
+        return None
+
+    def run():
+        try:
+            stats = warm_caches()
+            logger.info('Прогрев кэшей: %s', stats)
+        except Exception:
+            logger.exception('Прогрев кэшей при старте не удался')
+        finally:
+            connection.close()
+
+    with _startup_lock:
+        if _startup['thread'] is not None:
+            return None
+        _startup['thread'] = threading.Thread(target=run, name='warmup-startup', daemon=True)
+        _startup['thread'].start()
+    return _startup['thread']
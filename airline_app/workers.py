@@ -0,0 +1,21 @@
+"""Пул процессов для тяжёлых задач (экспорт, посадочные талоны, фоновые задания).
+
+Дочерний процесс spawn импортирует этот модуль, чтобы распаковать initializer, ещё до
+django.setup(). Поэтому здесь нельзя импортировать модели и всё, что их тянет.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def process_pool(max_workers=None):
+    # spawn: дочерние процессы не наследуют соединения с БД родителя (и работает на Windows)
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=init_worker,
+                               initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'airline_project.settings'),))
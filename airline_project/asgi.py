@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'airline_project.settings')
+# Пул соединений с БД по умолчанию (см. DB_POOL в settings)
+os.environ.setdefault('DJANGO_ASGI', '1')
 
 application = get_asgi_application()
+
+# Прогрев кэшей популярных направлений в фоне (WARMUP_ON_STARTUP)
+from airline_app.warmup import start_background_warmup  # noqa: E402
+
+start_background_warmup()
@@ -33,10 +33,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'airline_app.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -45,7 +47,8 @@ ROOT_URLCONF = 'airline_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, отмечающий время отрисовки шаблонов в профиле запроса
+        'BACKEND': 'airline_app.profiling.ProfilingDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -64,6 +67,10 @@ WSGI_APPLICATION = 'airline_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Выставляется в asgi.py: под ASGI постоянные соединения не переиспользуются между
+# запросами корректно, поэтому по умолчанию там пул соединений
+ASGI = env.bool('DJANGO_ASGI', default=False)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -72,9 +79,39 @@ DATABASES = {
         'PASSWORD': env('DB_PASSWORD', default=''),
         'HOST': env('DB_HOST', default='localhost'),
         'PORT': env('DB_PORT', default='5432'),
+        # Постоянные соединения (WSGI): живут DB_CONN_MAX_AGE секунд, перед повторным использованием проверяются
+        'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=0 if ASGI else 60),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Пул соединений psycopg 3 (DB_POOL=1, под ASGI включён по умолчанию): подходит и для WSGI,
+# и для ASGI, соединение возвращается в пул в конце каждого запроса.
+if env.bool('DB_POOL', default=ASGI):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+            'max_size': env.int('DB_POOL_MAX_SIZE', default=10),
+            'max_lifetime': env.float('DB_POOL_MAX_LIFETIME', default=1800.0),
+            'max_idle': env.float('DB_POOL_MAX_IDLE', default=300.0),
+            'timeout': env.float('DB_POOL_TIMEOUT', default=10.0),
+        },
+    }
+
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+# locmem у каждого процесса свой: выход из системы или снятие роли в одном воркере
+# другие бы не увидели, поэтому без общего кэша сессии и роли читаются только из БД,
+# а ETag по версиям данных (httpcache.conditional) не выдаются
+SHARED_CACHE = not CACHES['default']['BACKEND'].endswith(('.LocMemCache', '.DummyCache'))
+
+# Сессии читаются из кэша, в БД только запись (cache-through)
+SESSION_ENGINE = env('SESSION_ENGINE', default='django.contrib.sessions.backends.cached_db' if SHARED_CACHE
+                     else 'django.contrib.sessions.backends.db')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -112,12 +149,87 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic создаёт имена с хэшем содержимого и готовые .gz/.br копии;
+# WhiteNoise отдаёт их с Cache-Control: immutable
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+EXPORT_ROOT = env('EXPORT_ROOT', default=str(BASE_DIR / 'exports'))
+
+GEO_CACHE_DIR = env('GEO_CACHE_DIR', default=str(BASE_DIR / 'cache'))
+
+# Приёмники событий outbox (manage.py dispatch_outbox)
+OUTBOX_SINKS = [
+    {'BACKEND': 'airline_app.outbox.FileSink', 'OPTIONS': {'path': str(BASE_DIR / 'outbox' / 'events.ndjson')}},
+]
+if env('OUTBOX_WEBHOOK_URL', default=''):
+    OUTBOX_SINKS.append({'BACKEND': 'airline_app.outbox.WebhookSink', 'OPTIONS': {'url': env('OUTBOX_WEBHOOK_URL')}})
+
+# Фоновые задачи (manage.py run_jobs): расписания в формате cron, местное время TIME_ZONE
+JOB_SCHEDULES = {
+    'backup': {'task': 'backup_to_yandex', 'cron': env('BACKUP_CRON', default='0 3 * * *')},
+    'plan_boarding': {'task': 'plan_boarding', 'cron': '*/5 * * * *'},
+    'purge_jobs': {'task': 'purge_jobs', 'cron': '30 4 * * *'},
+    'booking_forecasts': {'task': 'refresh_booking_forecasts', 'cron': '10 * * * *'},
+    # После прогнозов: лимиты дешёвых корзин зависят от ожидаемого спроса
+    'inventory': {'task': 'optimize_inventory', 'cron': '40 * * * *'},
+    'purge_change_deletions': {'task': 'purge_change_deletions', 'cron': '45 4 * * *'},
+    # Прогрев из run_jobs полезен веб-воркерам только через общий кэш (SHARED_CACHE)
+    'warm_caches': {'task': 'warm_caches', 'cron': env('WARMUP_CRON', default='*/10 * * * *'),
+                    'enabled': SHARED_CACHE},
+    # Учебное восстановление последнего бэкапа (manage.py restore_backup)
+    'restore_drill': {'task': 'restore_drill', 'cron': env('RESTORE_DRILL_CRON', default='0 5 * * 0'),
+                      'enabled': env.bool('RESTORE_DRILL_ENABLED', default=False)},
+}
+JOB_RETENTION_DAYS = env.int('JOB_RETENTION_DAYS', default=14)
+# Сколько хранить записи об удалениях для ленты изменений (api/changes/)
+CHANGEFEED_DELETIONS_RETENTION_DAYS = env.int('CHANGEFEED_DELETIONS_RETENTION_DAYS', default=30)
+
+# Прогрев кэшей поиска, схем мест и календаря цен для самых востребованных направлений
+WARMUP_ON_STARTUP = env.bool('WARMUP_ON_STARTUP', default=True)
+WARMUP_TOP_N = env.int('WARMUP_TOP_N', default=50)
+WARMUP_THREADS = env.int('WARMUP_THREADS', default=4)
+
+# Перебронирование по исторической неявке: не больше этой доли мест салона сверх ёмкости
+INVENTORY_MAX_OVERBOOKING = env.float('INVENTORY_MAX_OVERBOOKING', default=0.1)
+
+# Профилирование запросов: сотрудник передаёт X-Profile: 1 или ?_profile=1,
+# остальной трафик попадает в профиль с вероятностью PROFILING_SAMPLE_RATE
+PROFILING_ENABLED = env.bool('PROFILING_ENABLED', default=True)
+PROFILING_SAMPLE_RATE = env.float('PROFILING_SAMPLE_RATE', default=0.0)
+PROFILING_INTERVAL = env.float('PROFILING_INTERVAL', default=0.005)
+PROFILING_DIR = env('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_MAX_FILES = env.int('PROFILING_MAX_FILES', default=200)
+
+# Ограничение частоты запросов: корзины токенов в кэше, (ёмкость, токенов в секунду).
+# Корзина IP списывается всегда (на один адрес может приходиться несколько пользователей),
+# корзина пользователя — дополнительно для вошедших
+RATELIMIT_ENABLED = env.bool('RATELIMIT_ENABLED', default=True)
+RATELIMIT_TRUST_X_FORWARDED_FOR = env.bool('RATELIMIT_TRUST_X_FORWARDED_FOR', default=False)
+RATELIMIT_BUDGETS = {
+    'airport_autocomplete': {'ip': (120, 20.0), 'user': (60, 10.0)},
+    'flight_search': {'ip': (60, 1.5), 'user': (40, 1.0)},
+    'fare_calendar': {'ip': (60, 1.5), 'user': (40, 1.0)},
+}
+
+# Политики Cache-Control по view (дополняют airline_app.httpcache.DEFAULT_POLICIES)
+HTTP_CACHE_POLICIES = {
+    'airport_autocomplete': {'public': True, 'max_age': env.int('AUTOCOMPLETE_MAX_AGE', default=300)},
+}
+
 LOGIN_REDIRECT_URL = '/profile'
 LOGOUT_REDIRECT_URL = '/'
 LOGIN_URL = '/login'
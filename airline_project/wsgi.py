@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'airline_project.settings')
 
 application = get_wsgi_application()
+
+# Прогрев кэшей популярных направлений в фоне (WARMUP_ON_STARTUP)
+from airline_app.warmup import start_background_warmup  # noqa: E402
+
+start_background_warmup()